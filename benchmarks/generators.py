@@ -0,0 +1,122 @@
+"""Synthetic data generators for the naptools benchmarks.
+
+The generated data mimics ParaView CSV exports (field columns first, followed
+by "Points:0", "Points:1" and "Points:2") and the error tables written by
+convergence studies (one row per mesh size "h").
+"""
+import os
+import numpy as np
+import pandas as pd
+
+
+def convex_mesh(num_nodes, seed=0):
+    """Returns the (x, y) coordinates of an unstructured mesh of roughly
+    num_nodes nodes on the square [-1, 1]^2, made from a jittered grid"""
+    rng = np.random.default_rng(seed)
+    num_side = max(2, int(round(np.sqrt(num_nodes))))
+    spacing = 2.0 / (num_side - 1)
+
+    x, y = np.meshgrid(np.linspace(-1.0, 1.0, num_side), np.linspace(-1.0, 1.0, num_side))
+    x = x.ravel()
+    y = y.ravel()
+
+    # Jitter the interior nodes only, so that the boundary stays straight
+    interior = (np.abs(x) < 1.0) & (np.abs(y) < 1.0)
+    x[interior] += rng.uniform(-0.3, 0.3, interior.sum()) * spacing
+    y[interior] += rng.uniform(-0.3, 0.3, interior.sum()) * spacing
+
+    return x, y
+
+
+def mesh_with_holes(num_nodes, holes=((-0.4, -0.3, 0.25), (0.45, 0.35, 0.2)), seed=0):
+    """Returns the (x, y) coordinates of a mesh of roughly num_nodes nodes on
+    the square with circular holes (centre_x, centre_y, radius), and the mask
+    conditions selecting the triangles outside the holes"""
+    hole_area = sum(np.pi * radius**2 for centre_x, centre_y, radius in holes) / 4.0
+    x, y = convex_mesh(int(num_nodes / (1.0 - hole_area)), seed=seed)
+    keep = np.ones(x.shape, dtype=bool)
+    mask_conditions = []
+
+    for centre_x, centre_y, radius in holes:
+        keep &= (x - centre_x)**2 + (y - centre_y)**2 >= radius**2
+        mask_conditions.append(f"((x - {centre_x})**2 + (y - {centre_y})**2 > {radius**2})")
+
+    return x[keep], y[keep], " & ".join(mask_conditions)
+
+
+def scalar_series(x, y, num_timestamps, variable="u"):
+    """Returns a dictionary of DataFrames of a travelling scalar wave"""
+    frames = {}
+
+    for time_index in range(num_timestamps):
+        time = 0.1 * time_index
+        frames[f"{time_index:04d}"] = pd.DataFrame({
+            variable: np.sin(np.pi * (x - time)) * np.cos(np.pi * y) * np.exp(-time),
+            "Points:0": x,
+            "Points:1": y,
+            "Points:2": np.zeros_like(x),
+        })
+
+    return frames
+
+
+def vector_series(x, y, num_timestamps, variable="u"):
+    """Returns a dictionary of DataFrames of a rotating vortex velocity field"""
+    frames = {}
+
+    for time_index in range(num_timestamps):
+        time = 0.1 * time_index
+        swirl = np.exp(-(x**2 + y**2)) * (1.0 + 0.5 * np.sin(time))
+        frames[f"{time_index:04d}"] = pd.DataFrame({
+            variable + ":0": -y * swirl,
+            variable + ":1": x * swirl,
+            variable + ":2": np.zeros_like(x),
+            "Points:0": x,
+            "Points:1": y,
+            "Points:2": np.zeros_like(x),
+        })
+
+    return frames
+
+
+def error_tables(num_degrees, num_refinements=5, variables=("u", "p"), norms=("L2", "H1"), seed=0):
+    """Returns a dictionary of error tables (one per degree, keyed "p1",
+    "p2", ...) with optimal convergence rates plus some noise"""
+    rng = np.random.default_rng(seed)
+    h = 0.5**np.arange(1, num_refinements + 1)
+    tables = {}
+
+    for degree in range(1, num_degrees + 1):
+        table = {"h": h}
+
+        for variable in variables:
+            for norm_index, norm in enumerate(norms):
+                rate = degree + 1 - norm_index
+                noise = np.exp(rng.normal(0.0, 0.05, h.shape))
+                table[f"{variable} {norm}"] = rng.uniform(0.5, 2.0) * h**rate * noise
+
+        table["Time taken"] = rng.uniform(0.1, 10.0, h.shape)
+        tables[f"p{degree}"] = pd.DataFrame(table)
+
+    return tables
+
+
+def long_format_table(tables):
+    """Returns a single long-format table with a "degree" column from a
+    dictionary of error tables"""
+    return pd.concat([table.assign(degree=int(degree_id[1:]))
+                      for degree_id, table in tables.items()], ignore_index=True)
+
+
+def write_series(frames, directory, prefix="data"):
+    """Write a dictionary of DataFrames to CSV files and return the matching
+    data file dictionary"""
+    os.makedirs(directory, exist_ok=True)
+    data_file_dict = {}
+
+    for frame_id, frame_df in frames.items():
+        data_file = os.path.join(directory, f"{prefix}_{frame_id}.csv")
+        frame_df.to_csv(data_file, index=False)
+        data_file_dict[frame_id] = data_file
+
+    return data_file_dict
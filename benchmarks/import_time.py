@@ -0,0 +1,80 @@
+"""Guard against regressions in the time taken by "import naptools".
+
+Each import is timed in a fresh interpreter and the best of several runs is
+compared to a time budget. The import must also not load any of the heavy
+plotting dependencies, which are only needed once something is plotted.
+
+Usage: python benchmarks/import_time.py [--repeat N] [--budget SECONDS]
+"""
+import argparse
+import subprocess
+import sys
+
+# Modules which must not be imported by "import naptools" alone
+HEAVY_MODULES = ["matplotlib", "pandas", "scipy", "mpl_toolkits", "numpy"]
+
+# Statements to time, with the heavy modules each one is allowed to import
+IMPORT_STATEMENTS = {
+    "import naptools": [],
+    "from naptools import ErrorData": ["pandas", "numpy"],
+}
+
+TIMING_SCRIPT = """
+import sys, time
+start_time = time.perf_counter()
+{statement}
+import_time = time.perf_counter() - start_time
+loaded = sorted({{name.split(".")[0] for name in sys.modules}})
+print(import_time)
+print(" ".join(loaded))
+"""
+
+
+def time_import(statement):
+    """Returns the import time and top-level modules loaded by a statement"""
+    result = subprocess.run([sys.executable, "-c", TIMING_SCRIPT.format(statement=statement)],
+                            capture_output=True, text=True, check=True)
+    import_time, loaded = result.stdout.splitlines()
+
+    return float(import_time), set(loaded.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=0.1,
+                        help="maximum time in seconds for 'import naptools'")
+    args = parser.parse_args()
+
+    failures = []
+    best_times = {}
+
+    for statement, allowed_modules in IMPORT_STATEMENTS.items():
+        timings = []
+
+        for i in range(args.repeat):
+            import_time, loaded = time_import(statement)
+            timings.append(import_time)
+
+        best_times[statement] = min(timings)
+        print(f"{statement:35} best {min(timings) * 1e3:8.1f} ms  "
+              f"median {sorted(timings)[len(timings) // 2] * 1e3:8.1f} ms")
+
+        unexpected_modules = [module for module in HEAVY_MODULES
+                              if module in loaded and module not in allowed_modules]
+
+        if unexpected_modules:
+            failures.append(f"'{statement}' imported {', '.join(unexpected_modules)}")
+
+    if best_times["import naptools"] > args.budget:
+        failures.append(f"'import naptools' took {best_times['import naptools']:.3f} s "
+                        f"(budget {args.budget:.3f} s)")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Benchmark the naptools plot pipeline stage by stage.
+
+Each benchmark generates synthetic data (see generators.py), writes it to CSV
+and times ContourPlot, StreamPlot, ContourStreamPlot or ErrorPlot from loading
+to saving. The time spent in each stage (load, limits, triangulate/mask, fill,
+lines, quiver, colour bar, save) is reported separately and the results are
+stored as JSON so that runs can be compared across commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 --output results.json
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import generators  # noqa: E402
+
+# Stages which are timed by wrapping the functions that implement them, as
+# (module, class name, method name, stage)
+STAGE_TARGETS = [
+    ("naptools.plot_2d", "Data2D", "get_data_limits", "limits"),
+    ("naptools.plot_2d", "FrameContext", "triangulate", "triangulate/mask"),
+    ("matplotlib.axes", "Axes", "tricontourf", "fill"),
+    ("matplotlib.axes", "Axes", "tricontour", "lines"),
+    ("matplotlib.axes", "Axes", "plot", "lines"),
+    ("matplotlib.axes", "Axes", "quiver", "quiver"),
+    ("matplotlib.axes", "Axes", "streamplot", "streamlines"),
+    ("naptools.plot_2d", "Plot2D", "make_colour_bar", "colour bar"),
+    ("naptools.plot_2d", "Plot2D", "make_separate_colour_bar", "colour bar"),
+    ("matplotlib.figure", "Figure", "savefig", "save"),
+]
+
+
+class StageTimer:
+    """Context manager which wraps the stage functions and accumulates the
+    exclusive time spent in each stage (time in nested stages is only
+    counted once, in the innermost stage). Each thread keeps its own stack
+    of nested stages."""
+
+    def __init__(self):
+        self.stages = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.originals = []
+
+    def wrap(self, function, stage):
+        def timed(*args, **kwargs):
+            stack = self.local.__dict__.setdefault("stack", [])
+            start_time = time.perf_counter()
+            stack.append(0.0)
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start_time
+                nested = stack.pop()
+
+                with self.lock:
+                    self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - nested
+
+                if stack:
+                    stack[-1] += elapsed
+
+        return timed
+
+    def __enter__(self):
+        import importlib
+
+        for module_name, class_name, method_name, stage in STAGE_TARGETS:
+            owner = getattr(importlib.import_module(module_name), class_name)
+            original = owner.__dict__[method_name]
+            self.originals.append((owner, method_name, original))
+            setattr(owner, method_name, self.wrap(original, stage))
+
+        return self
+
+    def __exit__(self, *exc_info):
+        for owner, method_name, original in reversed(self.originals):
+            setattr(owner, method_name, original)
+
+        self.originals = []
+
+
+def make_mesh(mesh, num_nodes):
+    """Returns mesh coordinates and mask conditions for a mesh type"""
+    if mesh == "holes":
+        return generators.mesh_with_holes(num_nodes)
+
+    x, y = generators.convex_mesh(num_nodes)
+
+    return x, y, None
+
+
+def time_plot(data_class, plot_class, data_file_dict, variable, output_filename, parameters):
+    """Returns the stage timings of loading data and creating a series of plots.
+    The frames are drawn one after another, without reading ahead or saving
+    in the background, so that the stage times add up to the total."""
+    import naptools
+
+    with StageTimer() as timer:
+        start_time = time.perf_counter()
+        data = getattr(naptools, data_class)(data_file_dict)
+        load_time = time.perf_counter() - start_time
+
+        plot = getattr(naptools, plot_class)(data)
+        plot.plot(variable, list(data_file_dict), output_filename,
+                  parameters=dict(parameters, force=True, num_threads=1, prefetch_frames=0))
+        total_time = time.perf_counter() - start_time
+
+    stages = {"load": load_time}
+    stages.update(timer.stages)
+    stages["other"] = max(0.0, total_time - sum(stages.values()))
+
+    return stages, total_time
+
+
+def run_field_benchmarks(args, work_dir):
+    """Benchmark the two-dimensional plot classes on every mesh size and type"""
+    results = []
+
+    for mesh in args.meshes:
+        for num_nodes in args.sizes:
+            x, y, mask_conditions = make_mesh(mesh, num_nodes)
+            case_dir = os.path.join(work_dir, f"{mesh}_{num_nodes}")
+            scalar_files = generators.write_series(
+                generators.scalar_series(x, y, args.timestamps), case_dir, "scalar")
+            vector_files = generators.write_series(
+                generators.vector_series(x, y, args.timestamps), case_dir, "vector")
+            parameters = {"mask_conditions": mask_conditions}
+            arrow_sparsity = max(1, len(x) // 2000)
+
+            cases = [
+                ("ContourPlot", "ContourData", scalar_files, "u", parameters),
+                ("StreamPlot", "StreamData", vector_files, "u",
+                 {"arrow_sparsity": arrow_sparsity}),
+                ("ContourStreamPlot", "ContourStreamData", vector_files, "u:0",
+                 dict(parameters, arrow_sparsity=arrow_sparsity)),
+            ]
+
+            for plot_class, data_class, data_file_dict, variable, case_parameters in cases:
+                if args.classes and plot_class not in args.classes:
+                    continue
+
+                stages, total_time = time_plot(
+                    data_class, plot_class, data_file_dict, variable,
+                    os.path.join(case_dir, "plots", f"{plot_class}.{args.format}"),
+                    case_parameters,
+                )
+                results.append({
+                    "benchmark": plot_class,
+                    "mesh": mesh,
+                    "num_nodes": len(x),
+                    "num_timestamps": args.timestamps,
+                    "stages": stages,
+                    "total": total_time,
+                })
+                print_result(results[-1])
+
+    return results
+
+
+def run_error_benchmarks(args, work_dir):
+    """Benchmark error plots for an increasing number of degrees"""
+    results = []
+
+    if args.classes and "ErrorPlot" not in args.classes:
+        return results
+
+    for num_degrees in args.degrees:
+        tables = generators.error_tables(num_degrees)
+        case_dir = os.path.join(work_dir, f"errors_{num_degrees}")
+        data_file_dict = generators.write_series(tables, case_dir, "errors")
+
+        import naptools
+
+        with StageTimer() as timer:
+            start_time = time.perf_counter()
+            error_data = naptools.ErrorData(data_file_dict)
+            error_data.update_norms({"u L2": "$L^2$", "u H1": "$H^1$"})
+            load_time = time.perf_counter() - start_time
+
+            naptools.ErrorPlot(error_data).plot(
+                "u", list(data_file_dict),
+                os.path.join(case_dir, "plots", f"ErrorPlot.{args.format}"),
+                parameters={"force": True},
+            )
+            total_time = time.perf_counter() - start_time
+
+        stages = {"load": load_time}
+        stages.update(timer.stages)
+        stages["other"] = max(0.0, total_time - sum(stages.values()))
+        results.append({
+            "benchmark": "ErrorPlot",
+            "mesh": None,
+            "num_nodes": num_degrees,
+            "num_timestamps": 1,
+            "stages": stages,
+            "total": total_time,
+        })
+        print_result(results[-1])
+
+    return results
+
+
+def print_result(result):
+    stages = "  ".join(f"{stage} {stage_time:.3f}" for stage, stage_time in result["stages"].items())
+    print(f"{result['benchmark']:18} {str(result['mesh']):7} {result['num_nodes']:>9}  "
+          f"total {result['total']:8.3f} s  |  {stages}")
+
+
+def get_metadata():
+    """Returns the environment and commit the benchmarks were run on"""
+    import matplotlib
+    import numpy
+    import pandas
+    import naptools
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "naptools": naptools.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "matplotlib": matplotlib.__version__,
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+    }
+
+
+def compare(old_filename, new_filename):
+    """Print the per-stage speed-up between two result files"""
+    with open(old_filename) as old_file, open(new_filename) as new_file:
+        old_results, new_results = json.load(old_file), json.load(new_file)
+
+    print(f"old: {old_results['metadata']['commit']}  new: {new_results['metadata']['commit']}")
+
+    def key(result):
+        return (result["benchmark"], result["mesh"], result["num_nodes"], result["num_timestamps"])
+
+    old_by_key = {key(result): result for result in old_results["results"]}
+
+    for new_result in new_results["results"]:
+        old_result = old_by_key.get(key(new_result))
+
+        if old_result is None:
+            continue
+
+        print(f"{new_result['benchmark']:18} {str(new_result['mesh']):7} {new_result['num_nodes']:>9}  "
+              f"total {old_result['total']:8.3f} -> {new_result['total']:8.3f} s "
+              f"(x{old_result['total'] / max(new_result['total'], 1e-12):.2f})")
+
+        for stage, new_time in new_result["stages"].items():
+            old_time = old_result["stages"].get(stage)
+
+            if old_time is not None:
+                print(f"    {stage:18} {old_time:8.3f} -> {new_time:8.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000],
+                        help="number of mesh nodes (10k to 5M)")
+    parser.add_argument("--meshes", nargs="+", default=["convex", "holes"],
+                        choices=["convex", "holes"])
+    parser.add_argument("--timestamps", type=int, default=2)
+    parser.add_argument("--degrees", type=int, nargs="+", default=[4, 12])
+    parser.add_argument("--classes", nargs="+", default=None,
+                        help="only run these plot classes")
+    parser.add_argument("--format", default="png")
+    parser.add_argument("--work-dir", default=None,
+                        help="directory for the generated data (default: a temporary directory)")
+    parser.add_argument("--output", default=None, help="JSON file to store the results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    # Import the plotting dependencies up front so that one-off import costs
+    # are not attributed to the first benchmark
+    import matplotlib.figure
+    import matplotlib.tri
+    import mpl_toolkits.axes_grid1
+    import scipy.stats
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        work_dir = args.work_dir or temporary_dir
+        results = run_field_benchmarks(args, work_dir) + run_error_benchmarks(args, work_dir)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"metadata": get_metadata(), "results": results}, output_file, indent=1)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,56 @@
-from .plot import *
-from .line_styles import *
-from .error_plot import *
-from .contour_plot import *
-from .stream_plot import *
-from .contour_stream_plot import *
+from importlib import metadata
+
+# The version is that of the installed package (as given in pyproject.toml)
+try:
+    __version__ = metadata.version("naptools")
+except metadata.PackageNotFoundError:  # Running from a source tree
+    __version__ = "unknown"
+
+del metadata
+
+# The public classes are only imported from their submodules when first
+# accessed (PEP 562), so "import naptools" does not pull in matplotlib,
+# pandas or scipy until they are actually needed.
+lazy_attributes = {
+    "BaseData": "plot",
+    "BasePlot": "plot",
+    "LazyDataDict": "plot",
+    "LineStyles": "line_styles",
+    "ErrorData": "error_plot",
+    "ErrorPlot": "error_plot",
+    "Data2D": "plot_2d",
+    "Plot2D": "plot_2d",
+    "ComparisonData": "comparison",
+    "SlicedData": "slicing",
+    "InterpolatedData": "temporal",
+    "ContourData": "contour_plot",
+    "ContourPlot": "contour_plot",
+    "StreamData": "stream_plot",
+    "StreamPlot": "stream_plot",
+    "ContourStreamData": "contour_stream_plot",
+    "ContourStreamPlot": "contour_stream_plot",
+    "MultiPlot": "multi_plot",
+    "InSituRenderer": "in_situ",
+    "FileTarget": "outputs",
+    "BytesSink": "outputs",
+    "StreamSink": "outputs",
+}
+
+__all__ = list(lazy_attributes)
+
+
+def __getattr__(name):
+    if name in lazy_attributes:
+        import importlib
+
+        module = importlib.import_module("." + lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(lazy_attributes))
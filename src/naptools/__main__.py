@@ -0,0 +1,4 @@
+import sys
+from naptools.cli import main
+
+sys.exit(main())
@@ -0,0 +1,294 @@
+import concurrent.futures
+import json
+import logging
+import os
+import time
+import traceback
+
+
+def load_spec(spec_filename):
+    """Read a JSON or TOML batch job specification. Relative paths in the spec
+    are resolved against the directory containing the spec file."""
+    if os.path.splitext(spec_filename)[1] == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib
+
+        with open(spec_filename, "rb") as spec_file:
+            spec = tomllib.load(spec_file)
+
+    else:
+        with open(spec_filename) as spec_file:
+            spec = json.load(spec_file)
+
+    spec.setdefault("data", {})
+    spec.setdefault("plots", [])
+    spec["base_dir"] = os.path.dirname(os.path.abspath(spec_filename))
+
+    return spec
+
+
+def resolve_path(base_dir, path):
+    """Returns the path relative to the spec directory (unless absolute)"""
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(base_dir, path))
+
+
+def resolve_output(base_dir, output):
+    """Returns the output of a plot spec with its file paths resolved. The
+    output is a filename, a table of FileTarget arguments (e.g. {filename =
+    "u.png", dpi = 300}) or a list of these."""
+    if isinstance(output, list):
+        return [resolve_output(base_dir, target) for target in output]
+
+    if isinstance(output, dict):
+        return dict(output, filename=resolve_path(base_dir, output["filename"]))
+
+    return resolve_path(base_dir, output)
+
+
+def schedule(spec):
+    """Group the plots of a spec into jobs. Plots sharing a data source are put
+    in the same job so that each data source is loaded only once, and the
+    plots within a job reuse everything cached on the loaded data. The plots
+    of an unknown data source are put in a job of their own (with no data),
+    where they fail."""
+    jobs = {}
+
+    for plot_index, plot_spec in enumerate(spec["plots"]):
+        data_id = plot_spec.get("data")
+
+        if data_id not in jobs:
+            jobs[data_id] = {
+                "data_id": data_id,
+                "data": spec["data"].get(data_id),
+                "plots": [],
+                "base_dir": spec["base_dir"],
+            }
+
+        jobs[data_id]["plots"].append(dict(plot_spec, index=plot_index))
+
+    # Run the largest jobs first for better packing on the pool
+    return sorted(jobs.values(), key=lambda job: len(job["plots"]), reverse=True)
+
+
+def load_data(data_spec, base_dir):
+    """Create the data object described by a data source spec"""
+    import naptools
+
+    data_class = getattr(naptools, data_spec.get("class", "BaseData"))
+
+    if "long_format" in data_spec:
+        data = data_class.from_long_format(
+            resolve_path(base_dir, data_spec["long_format"]),
+            degree_columns=data_spec.get("degree_columns", "degree"),
+            columns=data_spec.get("columns"),
+            degree_id_format=data_spec.get("degree_id_format"),
+        )
+
+    else:
+        data_file_dict = {data_file_id: resolve_path(base_dir, data_file)
+                          for data_file_id, data_file in data_spec["files"].items()}
+        # Files larger than memory are read in chunks (see ChunkedReader)
+        reader = None
+
+        if "chunked" in data_spec:
+            from naptools.chunked import ChunkedReader
+
+            chunked_spec = dict(data_spec["chunked"])
+
+            if "memmap_dir" in chunked_spec:
+                chunked_spec["memmap_dir"] = resolve_path(base_dir, chunked_spec["memmap_dir"])
+
+            reader = ChunkedReader(**chunked_spec)
+
+        # Lazy loading means data for frames that are up to date is never read
+        data = data_class(data_file_dict, lazy=data_spec.get("lazy", True), reader=reader)
+
+    if "norms" in data_spec:
+        data.update_norms(data_spec["norms"])
+
+    return data
+
+
+def configure_logging(level=logging.INFO):
+    """Show the naptools log messages (e.g. the plotted files) on stderr"""
+    logging.basicConfig(level=level, format="%(message)s")
+
+
+def is_series(plot_spec):
+    """Returns True if the plot of a spec is a series of frames which can be
+    split into shards (a two-dimensional plot)"""
+    import naptools
+
+    plot_class = getattr(naptools, plot_spec.get("class", ""), None)
+
+    return isinstance(plot_class, type) and issubclass(plot_class, naptools.Plot2D)
+
+
+def run_job(job, force=False, profile=None, shard=None):
+    """Load the data source of a job once and create each of its plots in turn.
+    Returns a dictionary of timings and any failures. Plots are only redrawn
+    if their outputs are out of date, unless force is True.
+
+    If profile is a dictionary (with optional "trace" and "track_memory"
+    entries) the plot stages are instrumented and their summary is returned
+    under "stages".
+
+    If shard is a (shard, num_shards) pair only that share of the frames of
+    each series is drawn, and the other plots only by the first shard."""
+    import naptools
+    from naptools import instrumentation
+
+    job_result = {"data_id": job["data_id"], "load_time": 0.0, "plots": []}
+
+    # Plots other than series are only drawn by the first shard
+    plot_specs = [plot_spec for plot_spec in job["plots"]
+                  if shard is None or shard[0] == 0 or is_series(plot_spec)]
+
+    if not plot_specs:
+        return job_result
+
+    if profile is not None:
+        sinks = [instrumentation.JSONLinesSink(profile["trace"])] if profile.get("trace") else []
+        active_instrumentation = instrumentation.enable(sinks, profile.get("track_memory", False))
+
+    start_time = time.perf_counter()
+
+    try:
+        if job["data"] is None:
+            raise KeyError(f"Unknown data source '{job['data_id']}'")
+
+        data = load_data(job["data"], job["base_dir"])
+        load_error = None
+    except Exception:
+        data = None
+        load_error = traceback.format_exc(limit=-1).strip()
+
+    job_result["load_time"] = time.perf_counter() - start_time
+
+    for plot_spec in plot_specs:
+        plot_result = {
+            "index": plot_spec["index"],
+            "class": plot_spec.get("class"),
+            "output": plot_spec.get("output"),
+            "time": 0.0,
+            "error": load_error,
+        }
+        start_time = time.perf_counter()
+
+        # A plot spec which is incomplete fails like any other plot
+        try:
+            missing_keys = [key for key in ("class", "output") if key not in plot_spec]
+
+            if missing_keys:
+                raise KeyError(f"Plot {plot_spec['index']} has no {' or '.join(missing_keys)}")
+
+            output_filename = resolve_output(job["base_dir"], plot_spec["output"])
+            plot_result["output"] = output_filename
+        except Exception:
+            plot_result["error"] = traceback.format_exc(limit=-1).strip()
+            output_filename = None
+
+        if data is not None and output_filename is not None:
+            try:
+                parameters = dict(plot_spec.get("parameters", {}))
+
+                if force:
+                    parameters["force"] = True
+
+                if shard is not None and is_series(plot_spec):
+                    parameters["shard"], parameters["num_shards"] = shard
+
+                plot = getattr(naptools, plot_spec["class"])(data)
+                plot.plot(plot_spec["variable"],
+                          plot_spec["timestamps"],
+                          output_filename,
+                          parameters=parameters)
+            except Exception:
+                plot_result["error"] = traceback.format_exc(limit=-1).strip()
+
+        plot_result["time"] = time.perf_counter() - start_time
+        job_result["plots"].append(plot_result)
+
+    if profile is not None:
+        instrumentation.disable()
+        job_result["stages"] = active_instrumentation.summary()
+
+    return job_result
+
+
+def run_batch(spec, workers=None, force=False, profile=None, shard=None):
+    """Run all jobs of a spec, on a process pool if more than one worker is
+    requested, optionally as one (shard, num_shards) shard of the series.
+    Returns the list of job results."""
+    jobs = schedule(spec)
+
+    if workers is None:
+        workers = spec.get("workers", os.cpu_count())
+
+    workers = max(1, min(workers, len(jobs)))
+
+    if workers == 1:
+        return [run_job(job, force, profile, shard) for job in jobs]
+
+    # The workers log at the same level as this process
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                initializer=configure_logging,
+                                                initargs=(logging.getLogger().level,)) as executor:
+        return list(executor.map(run_job, jobs, [force] * len(jobs), [profile] * len(jobs),
+                                 [shard] * len(jobs)))
+
+
+def merge_batch(spec, num_shards):
+    """Check that num_shards shards have drawn every frame of every series of
+    a spec, writing the merged manifest of each. Returns the problems found
+    (an empty list if every series is complete)."""
+    from naptools import shards
+
+    problems = []
+
+    for plot_index, plot_spec in enumerate(spec["plots"]):
+        if is_series(plot_spec):
+            if "output" not in plot_spec:
+                problems.append(f"Plot {plot_index} has no output")
+                continue
+
+            try:
+                shards.merge_manifests(resolve_output(spec["base_dir"], plot_spec["output"]), num_shards)
+            except ValueError as error:
+                problems.append(str(error))
+
+    return problems
+
+
+def print_summary(job_results, total_time):
+    """Print the timings of every data source and plot, followed by failures"""
+    plot_results = sorted((plot_result for job_result in job_results
+                           for plot_result in job_result["plots"]),
+                          key=lambda plot_result: plot_result["index"])
+    failures = [plot_result for plot_result in plot_results if plot_result["error"]]
+
+    print(f"\nBatch summary: {len(plot_results)} plot(s) from {len(job_results)} data "
+          f"source(s), {len(plot_results) - len(failures)} succeeded, "
+          f"{len(failures)} failed ({total_time:.2f} s)")
+
+    for job_result in job_results:
+        print(f"  data   {job_result['load_time']:8.2f} s  {job_result['data_id']}")
+
+    for plot_result in plot_results:
+        status = "FAILED" if plot_result["error"] else "ok"
+        print(f"  {status:6} {plot_result['time']:8.2f} s  "
+              f"{plot_result['class']} -> {plot_result['output']}")
+
+    stage_summaries = [job_result["stages"] for job_result in job_results if "stages" in job_result]
+
+    if stage_summaries:
+        from naptools import instrumentation
+
+        print("\nStage summary:")
+        print(instrumentation.format_summary(instrumentation.merge_summaries(stage_summaries)))
+
+    for plot_result in failures:
+        print(f"\nFailure in plot {plot_result['index']} ({plot_result['output']}):")
+        print(plot_result["error"])
@@ -0,0 +1,213 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+from naptools.frame import Frame, get_coordinate_columns
+
+
+class ColumnStats:
+    """Running count, minimum, maximum, sum and sum of squares of a column,
+    updated one chunk at a time (NaNs are skipped)"""
+    def __init__(self):
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sum = 0.0
+        self.sum_of_squares = 0.0
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+
+        if len(values):
+            self.count += len(values)
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self.sum += float(values.sum())
+            self.sum_of_squares += float(np.dot(values, values))
+
+    def as_dict(self):
+        mean = self.sum / self.count if self.count else np.nan
+        variance = self.sum_of_squares / self.count - mean**2 if self.count else np.nan
+
+        return {
+            "count": self.count,
+            "min": self.min if self.count else np.nan,
+            "max": self.max if self.count else np.nan,
+            "mean": mean,
+            "std": float(np.sqrt(max(variance, 0.0))),
+        }
+
+
+class ChunkedReader:
+    """Reader of csv files too large to be read at once, for the reader
+    argument of the data classes. The file is streamed in blocks of
+    chunk_rows rows, so reading takes a fixed amount of memory however large
+    the file is. Only the given columns (by default all) are kept, and only
+    every decimation-th row of them, as arrays of dtype: in memory, or with
+    memmap_dir written to files there and mapped back (read only), so the
+    data itself need not fit in memory either.
+
+    The statistics (count, min, max, mean and std) of every kept column are
+    computed over all rows in the same pass. They are held in the attrs
+    of the returned Frame (frame.attrs["stats"]), where
+    Data2D.get_data_limits() finds them, and in stats by data file."""
+    def __init__(self, columns=None, decimation=1, chunk_rows=1000000, memmap_dir=None, dtype="float64"):
+        self.columns = None if columns is None else list(columns)
+        self.decimation = decimation
+        self.chunk_rows = chunk_rows
+        self.memmap_dir = memmap_dir
+        self.dtype = np.dtype(dtype)
+        self.stats = {}
+
+    def get_fingerprint_arguments(self):
+        """Returns the settings which change the data read (the columns,
+        decimation and dtype), which are recorded in the fingerprints of plots"""
+        return {"columns": self.columns, "decimation": self.decimation, "dtype": self.dtype.str}
+
+    def read_columns(self, data_file, columns, num_rows=None):
+        """Returns a DataFrame of only the given columns (and, if given, the
+        first num_rows rows) of the rows kept from the file, i.e. the rows of
+        the frames this reader returns, without streaming the whole file"""
+        import pandas as pd
+
+        if self.columns is not None and not set(columns) <= set(self.columns):
+            raise ValueError(f"Columns {', '.join(sorted(set(columns) - set(self.columns)))} are not read")
+
+        # The last row kept is (num_rows - 1) * decimation rows into the file
+        num_file_rows = None
+
+        if num_rows is not None:
+            num_file_rows = (num_rows - 1) * self.decimation + 1 if num_rows else 0
+
+        data_df = pd.read_csv(data_file, usecols=columns, nrows=num_file_rows).iloc[::self.decimation]
+
+        return data_df.astype(self.dtype).reset_index(drop=True)
+
+    def __call__(self, data_file):
+        """Returns a Frame of the kept columns and rows of the file"""
+        import pandas as pd
+
+        column_stats = None
+        chunks = None
+        num_rows = 0
+
+        for chunk_df in pd.read_csv(data_file, usecols=self.columns, chunksize=self.chunk_rows):
+            if column_stats is None:
+                columns = [name for name in chunk_df.columns if pd.api.types.is_numeric_dtype(chunk_df[name])]
+                column_stats = {name: ColumnStats() for name in columns}
+                chunks = self.open_storage(data_file, columns)
+
+            # The rows kept are those at multiples of decimation in the file
+            first_row = -num_rows % self.decimation
+
+            for name, stats in column_stats.items():
+                values = chunk_df[name].to_numpy(dtype=float)
+                stats.update(values)
+                kept_values = values[first_row::self.decimation].astype(self.dtype)
+
+                if isinstance(chunks[name], list):
+                    chunks[name].append(kept_values)
+                else:
+                    chunks[name][0].write(kept_values.tobytes())
+
+            num_rows += len(chunk_df)
+
+        if column_stats is None:
+            return pd.read_csv(data_file, usecols=self.columns)
+
+        num_kept = len(range(0, num_rows, self.decimation))
+        stats = {name: column_stats[name].as_dict() for name in column_stats}
+        self.stats[os.fspath(data_file)] = stats
+
+        coordinate_columns = get_coordinate_columns(column_stats)
+        coordinates = self.close_coordinates([chunks[name] for name in coordinate_columns], num_kept)
+        fields = {name: self.close_storage(chunks[name], num_kept)
+                  for name in column_stats if name not in coordinate_columns}
+
+        return Frame(coordinates, fields, list(column_stats), {"stats": stats})
+
+    def open_storage(self, data_file, columns):
+        """Returns where the kept values of each column are collected: lists
+        of arrays, or files in memmap_dir (with the names they take once
+        complete)"""
+        if self.memmap_dir is None:
+            return {name: [] for name in columns}
+
+        os.makedirs(self.memmap_dir, exist_ok=True)
+
+        # Data files of the same name in different directories, or read with
+        # other settings, are told apart by a digest of the full path and
+        # settings
+        stem = os.path.splitext(os.path.basename(data_file))[0]
+        key = [os.path.abspath(data_file), self.get_fingerprint_arguments()]
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+        base_filename = os.path.join(self.memmap_dir, f"{stem}-{digest}")
+        storage = {}
+
+        # Column names are made safe for file names. The coordinates end up
+        # in one file (see close_coordinates()).
+        for index, name in enumerate(columns):
+            file_descriptor, temporary_filename = tempfile.mkstemp(suffix=".tmp", dir=self.memmap_dir)
+
+            if name in get_coordinate_columns(columns):
+                filename = f"{base_filename}.Points.bin"
+            else:
+                filename = f"{base_filename}.{index}.{re.sub(r'[^0-9A-Za-z.-]', '_', name)}.bin"
+
+            storage[name] = (os.fdopen(file_descriptor, "wb"), temporary_filename, filename)
+
+        return storage
+
+    def close_storage(self, chunks, num_kept):
+        """Returns the array of the kept values of a column"""
+        if isinstance(chunks, list):
+            return np.concatenate(chunks) if chunks else np.empty(0, dtype=self.dtype)
+
+        # The file is only renamed into place once complete, so a file still
+        # mapped by an earlier read (e.g. before a lazy release) is replaced,
+        # not truncated
+        storage_file, temporary_filename, filename = chunks
+        storage_file.close()
+        os.replace(temporary_filename, filename)
+
+        if num_kept == 0:
+            return np.empty(0, dtype=self.dtype)
+
+        return np.memmap(filename, dtype=self.dtype, mode="r", shape=(num_kept,))
+
+    def close_coordinates(self, coordinate_chunks, num_kept):
+        """Returns the kept coordinates as the columns of one (N, D) array in
+        column-major order (see naptools.frame.Frame), of the reader's dtype"""
+        if self.memmap_dir is None:
+            coordinates = np.empty((num_kept, len(coordinate_chunks)), dtype=self.dtype, order="F")
+
+            for index, chunks in enumerate(coordinate_chunks):
+                if chunks:
+                    np.concatenate(chunks, out=coordinates[:, index])
+
+            return coordinates
+
+        if not coordinate_chunks:
+            return np.empty((num_kept, 0), dtype=self.dtype, order="F")
+
+        # The column files are joined one after another (a block at a time),
+        # which lays them out as a column-major array
+        file_descriptor, temporary_filename = tempfile.mkstemp(suffix=".tmp", dir=self.memmap_dir)
+
+        with os.fdopen(file_descriptor, "wb") as coordinates_file:
+            for storage_file, column_filename, filename in coordinate_chunks:
+                storage_file.close()
+
+                with open(column_filename, "rb") as column_file:
+                    shutil.copyfileobj(column_file, coordinates_file)
+
+                os.remove(column_filename)
+
+        os.replace(temporary_filename, filename)
+
+        if num_kept == 0:
+            return np.empty((0, len(coordinate_chunks)), dtype=self.dtype, order="F")
+
+        return np.memmap(filename, dtype=self.dtype, mode="r", shape=(num_kept, len(coordinate_chunks)), order="F")
@@ -0,0 +1,82 @@
+import argparse
+import logging
+import sys
+import time
+from naptools import batch
+
+
+def main(argv=None):
+    """Entry point for the naptools command"""
+    parser = argparse.ArgumentParser(
+        prog="naptools",
+        description="Create plots from a declarative job specification.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run a JSON or TOML job spec")
+    run_parser.add_argument("spec", help="path to the job spec")
+    run_parser.add_argument("-j", "--workers", type=int, default=None,
+                            help="number of worker processes (default: from spec or CPU count)")
+    run_parser.add_argument("-f", "--force", action="store_true",
+                            help="redraw every plot, even if its output is up to date")
+    run_parser.add_argument("-q", "--quiet", action="store_true",
+                            help="only log warnings and errors")
+    run_parser.add_argument("--profile", action="store_true",
+                            help="time each plot stage and print a per-stage summary")
+    run_parser.add_argument("--trace", default=None, metavar="FILE",
+                            help="append a JSON line per plot stage to FILE (implies --profile)")
+    run_parser.add_argument("--track-memory", action="store_true",
+                            help="record the peak memory of each stage (implies --profile)")
+    run_parser.add_argument("--shard", type=int, default=None, metavar="I",
+                            help="only draw shard I (from 0) of the frames of each series")
+    run_parser.add_argument("--num-shards", type=int, default=1, metavar="N",
+                            help="number of shards the series are split into (with --shard)")
+
+    merge_parser = subparsers.add_parser("merge", help="check that all shards of a job spec are complete")
+    merge_parser.add_argument("spec", help="path to the job spec")
+    merge_parser.add_argument("--num-shards", type=int, required=True, metavar="N",
+                              help="number of shards the series were split into")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        batch.configure_logging(logging.WARNING if args.quiet else logging.INFO)
+
+        if args.profile or args.trace or args.track_memory:
+            profile = {"trace": args.trace, "track_memory": args.track_memory}
+        else:
+            profile = None
+
+        if args.shard is not None:
+            if not 0 <= args.shard < args.num_shards:
+                parser.error("--shard must be between 0 and --num-shards - 1")
+
+            shard = (args.shard, args.num_shards)
+        else:
+            shard = None
+
+        start_time = time.perf_counter()
+        spec = batch.load_spec(args.spec)
+        job_results = batch.run_batch(spec, workers=args.workers, force=args.force, profile=profile,
+                                      shard=shard)
+        batch.print_summary(job_results, time.perf_counter() - start_time)
+
+        failed = any(plot_result["error"] for job_result in job_results
+                     for plot_result in job_result["plots"])
+
+        return 1 if failed else 0
+
+    if args.command == "merge":
+        problems = batch.merge_batch(batch.load_spec(args.spec), args.num_shards)
+
+        for problem in problems:
+            print(problem)
+
+        if not problems:
+            print(f"All series are complete ({args.num_shards} shards)")
+
+        return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+class ColourScale:
+    """Colour limits, levels and norm shared by the filled contours and the
+    colour bars of a plot. Colour bars are drawn from a ScalarMappable of the
+    norm and levels, so no data needs to be contoured to make them."""
+    def __init__(self, plot, data_limits):
+        self.colour_bar_min, self.colour_bar_max, self.vmin, self.vmax = plot.get_colour_limits(data_limits)
+        self.colour_map = plot.parameters["colour_map"]
+
+        self.linear_width = plot.parameters["symlognorm_linear_width"] * (
+            self.colour_bar_max - self.colour_bar_min
+        )
+        self.norm = self.new_norm()
+
+        # Discrete colour values
+        self.colour_levels = plot.compute_levels(plot.parameters["num_colour_levels"],
+                                                 self.colour_bar_min, self.colour_bar_max)  # , logarithmic=True)
+
+        # Values defining the contour lines
+        self.contour_levels = plot.compute_levels(plot.parameters["num_contours"],
+                                                  self.colour_bar_min, self.colour_bar_max)  # , logarithmic=True)
+        self.thick_contour_levels = self.contour_levels[
+            :: plot.parameters["num_thin_lines"]
+        ]
+
+        # May have to hard code these to get them to look good, or at
+        # least format them properly.
+        self.ticks = [float(self.colour_bar_min), float(self.colour_bar_max)]
+
+        c_bar_format = plot.parameters["colour_bar_format"]
+        self.labels = [f"{float(self.colour_bar_min):{c_bar_format}}",
+                       f"{float(self.colour_bar_max):{c_bar_format}}"]
+
+    def new_norm(self):
+        """Returns a new norm of the colour limits"""
+        from matplotlib import colors
+
+        # return colors.LogNorm()
+        return colors.SymLogNorm(linthresh=self.linear_width, vmin=self.vmin, vmax=self.vmax)
+
+    def get_mappable(self):
+        """Returns a ScalarMappable with the norm and colour map of the scale.
+        Each colour bar gets its own norm: colour bars reset their ticks when
+        their norm changes, so one norm shared by the colour bars of frames
+        which are still to be saved would undo their tick labels."""
+        from matplotlib import cm
+
+        return cm.ScalarMappable(norm=self.new_norm(), cmap=self.colour_map)
+
+    def get_colour_bar_arguments(self):
+        """Returns the colour bar keyword arguments which draw the discrete
+        colour levels (as for a colour bar of the filled contours)"""
+        return {
+            "boundaries": self.colour_levels,
+            "values": 0.5 * (self.colour_levels[:-1] + self.colour_levels[1:]),
+        }
+
+
+def get_colour_bar_orientation(location):
+    """Returns the orientation of a colour bar at the given location"""
+    if location in ["top", "bottom"]:
+        return "horizontal"
+    else:
+        return "vertical"
+
+
+def make_colour_bar(fig, colour_scale, label, parameters, cax=None, ax=None):
+    """Add a colour bar of the colour scale to the figure, either in the given
+    colour bar axes (cax) or next to the given axes (ax)"""
+    location = parameters["colour_bar_location"]
+
+    if cax is not None:
+        colour_bar_arguments = {"cax": cax}
+    else:
+        colour_bar_arguments = {"ax": ax, "location": location, "fraction": 0.05, "pad": 0.02}
+
+    cbar = fig.colorbar(colour_scale.get_mappable(),
+                        label=label,
+                        orientation=get_colour_bar_orientation(location),
+                        # spacing="proportional",
+                        **colour_bar_arguments,
+                        **colour_scale.get_colour_bar_arguments(),
+                        )
+    cbar.set_ticks(ticks=colour_scale.ticks, labels=colour_scale.labels)  # labels=labels prevents pretty scientific notation
+    # cbar.formatter.set_powerlimits((-2, 2))
+    # cbar.formatter.set_useMathText(True)
+    cbar.ax.tick_params(labelsize=parameters["colour_bar_font_size"])
+
+    if location in ["top", "bottom"]:
+        cbar.ax.xaxis.set_ticks_position(location)
+        cbar.ax.get_xticklabels()[0].set_horizontalalignment("left")
+        cbar.ax.get_xticklabels()[1].set_horizontalalignment("right")
+    else:
+        cbar.ax.yaxis.set_ticks_position(location)
+
+    return cbar
+
+
+def make_separate_colour_bar(fig, axs, colour_scale, label, parameters):
+    """Draw a colour bar of the colour scale on its own in the figure (the
+    given axes only position the colour bar and are removed)"""
+    from matplotlib import ticker
+
+    cbar = fig.colorbar(colour_scale.get_mappable(),
+                        ax=axs,
+                        label=label,
+                        aspect=50,
+                        location=parameters["colour_bar_location"],
+                        **colour_scale.get_colour_bar_arguments(),
+                        )
+    cbar.ax.tick_params(labelsize=parameters["colour_bar_font_size"])
+    tick_locator = ticker.MaxNLocator(nbins=5)
+    cbar.locator = tick_locator
+    cbar.update_ticks()
+    axs.remove()
+
+    return cbar
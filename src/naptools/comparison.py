@@ -0,0 +1,170 @@
+from collections.abc import Mapping
+import numpy as np
+from naptools.plot_2d import Data2D
+from naptools.probes import Probe
+
+# Comparisons of the fields a (of the first source) and b (of the second),
+# given b with its small values replaced by the floor
+comparison_modes = {
+    "difference": lambda a, b, safe_b: a - b,
+    "relative_error": lambda a, b, safe_b: (a - b) / np.abs(safe_b),
+    "ratio": lambda a, b, safe_b: a / safe_b,
+}
+
+
+class Remap:
+    """Interpolation of nodal fields from one mesh onto the nodes of another.
+    Nodes inside the source mesh are interpolated with the barycentric
+    weights of their triangle (see Probe), and nodes outside it take the value
+    of the nearest source node, so the remapped field is finite everywhere."""
+    def __init__(self, triangulation, x, y):
+        from scipy import sparse
+        from scipy.spatial import cKDTree
+
+        probe = Probe(triangulation, np.column_stack([x, y]))
+        outside = np.nonzero(~probe.inside)[0]
+        self.weights = probe.weights
+
+        if len(outside):
+            tree = cKDTree(np.column_stack([triangulation.x, triangulation.y]))
+            nearest = tree.query(np.column_stack([probe.x[outside], probe.y[outside]]))[1]
+            self.weights = self.weights + sparse.csr_matrix((np.ones(len(outside)), (outside, nearest)),
+                                                            shape=self.weights.shape)
+
+    def __call__(self, values):
+        """Returns the values of a nodal field of the source mesh at the nodes"""
+        return self.weights @ np.asarray(values, dtype=float)
+
+
+class ComparisonFrames(Mapping):
+    """The frames of the first source behind each frame of a comparison,
+    which give the mesh the comparison is drawn on"""
+    def __init__(self, comparison_data):
+        self.comparison_data = comparison_data
+
+    def __getitem__(self, timestamp):
+        return self.comparison_data.data_a.data_df_dict[self.comparison_data.pairs[timestamp][0]]
+
+    def __iter__(self):
+        return iter(self.comparison_data.pairs)
+
+    def __len__(self):
+        return len(self.comparison_data.pairs)
+
+
+class ComparisonData(Data2D):
+    """Comparison of the fields of two 2D data sources (e.g. two solver
+    versions), drawn on the mesh of the first: the difference a - b, the
+    relative error (a - b) / |b| or the ratio a / b, as given by mode.
+
+    Each timestamp of the comparison compares a timestamp of data_a with one
+    of data_b, given by pairs ({timestamp: (timestamp_a, timestamp_b)}), by
+    default the timestamps the two sources share. Fields on identical meshes
+    are compared node by node. Otherwise the fields of data_b are remapped
+    onto the nodes of data_a (see Remap), with the weights computed once for
+    each pair of meshes and reused by every frame on them. Where |b| is
+    below floor (by default 1e-10 of the largest |b| of the frame) it is
+    taken as floor for the relative error and ratio."""
+    def __init__(self, data_a, data_b, mode="difference", pairs=None, floor=None):
+        super().__init__()
+
+        if mode not in comparison_modes:
+            raise ValueError(f"Unknown comparison mode {mode!r} (expected one of {', '.join(comparison_modes)})")
+
+        if pairs is None:
+            pairs = {timestamp: (timestamp, timestamp)
+                     for timestamp in data_a.data_df_dict if timestamp in data_b.data_df_dict}
+
+        self.data_a = data_a
+        self.data_b = data_b
+        self.mode = mode
+        self.pairs = dict(pairs)
+        self.floor = floor
+        self.data_df_dict = ComparisonFrames(self)
+        self.fields = {}
+
+    def get_data_files(self, data_df_ids=None):
+        """Returns the files of the first source (which give the mesh)"""
+        if data_df_ids is None:
+            data_df_ids = self.pairs.keys()
+
+        return self.data_a.get_data_files([self.pairs[data_df_id][0] for data_df_id in data_df_ids])
+
+    def get_input_files(self, data_df_ids=None):
+        """Returns the files of both sources"""
+        if data_df_ids is None:
+            data_df_ids = self.pairs.keys()
+
+        return (self.data_a.get_input_files([self.pairs[data_df_id][0] for data_df_id in data_df_ids])
+                + self.data_b.get_input_files([self.pairs[data_df_id][1] for data_df_id in data_df_ids]))
+
+    def get_fingerprint_arguments(self, data_df_ids=None):
+        """Returns the mode, floor and pairs of timestamps of the comparison
+        (and the settings of both sources)"""
+        if data_df_ids is None:
+            data_df_ids = self.pairs.keys()
+
+        return {
+            "mode": self.mode,
+            "floor": self.floor,
+            "pairs": [list(self.pairs[data_df_id]) for data_df_id in data_df_ids],
+            "data_a": self.data_a.get_fingerprint_arguments([self.pairs[data_df_id][0] for data_df_id in data_df_ids]),
+            "data_b": self.data_b.get_fingerprint_arguments([self.pairs[data_df_id][1] for data_df_id in data_df_ids]),
+        }
+
+    def get_field(self, data_df_id, variable):
+        """Returns the comparison of a column or derived field of the two
+        sources at the nodes of the first. Each is computed at most once."""
+        timestamp_a, timestamp_b = self.pairs[data_df_id]
+        data_df_a = self.data_a.data_df_dict[timestamp_a]
+        data_df_b = self.data_b.data_df_dict[timestamp_b]
+        cached = self.fields.get((data_df_id, variable))
+
+        # The comparison is kept alongside the frames it was computed from
+        if cached is not None and cached[0] is data_df_a and cached[1] is data_df_b:
+            return cached[2]
+
+        values_a = np.asarray(self.data_a.get_field(timestamp_a, variable), dtype=float)
+        values_b = np.asarray(self.data_b.get_field(timestamp_b, variable), dtype=float)
+        x_a, y_a = self.data_a.get_coordinates(data_df_a)
+        x_b, y_b = self.data_b.get_coordinates(data_df_b)
+
+        if not (np.array_equal(x_a, x_b) and np.array_equal(y_a, y_b)):
+            values_b = self.get_remap(data_df_a, data_df_b)(values_b)
+
+        floor = self.floor
+
+        if floor is None:
+            floor = 1.0e-10 * np.max(np.abs(values_b), initial=0.0) or np.finfo(float).tiny
+
+        safe_values_b = np.where(np.abs(values_b) < floor, np.where(values_b < 0.0, -floor, floor), values_b)
+        values = comparison_modes[self.mode](values_a, values_b, safe_values_b)
+        self.fields[(data_df_id, variable)] = (data_df_a, data_df_b, values)
+
+        return values
+
+    def get_remap(self, data_df_a, data_df_b):
+        """Returns the remap of the fields of the mesh of data_df_b onto the
+        nodes of data_df_a, computed once for each pair of meshes"""
+        x_a, y_a = self.data_a.get_coordinates(data_df_a)
+        x_b, y_b = self.data_b.get_coordinates(data_df_b)
+        nodes_a = np.column_stack([x_a, y_a]).astype(float)
+
+        return self.data_b.triangulation_cache.get(
+            x_b, y_b, ("remap", nodes_a.tobytes()),
+            lambda: Remap(self.data_b.get_triangulation(data_df_b), x_a, y_a),
+        )
+
+    def get_column_stats(self, data_df_id, variable):
+        """Comparisons are computed from the fields of both sources, so have no
+        statistics of their own"""
+        return None
+
+    def release(self, data_df_id):
+        """Free the memory held for the frame (see BaseData.release())"""
+        timestamp_a, timestamp_b = self.pairs[data_df_id]
+        self.data_a.release(timestamp_a)
+        self.data_b.release(timestamp_b)
+
+        for key in [key for key in self.fields if key[0] == data_df_id]:
+            del self.fields[key]
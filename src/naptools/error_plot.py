@@ -1,18 +1,79 @@
-import matplotlib.pyplot as plt
 import pandas as pd
 import re
 import numpy as np
-from scipy import stats
 from naptools import BaseData, BasePlot, LineStyles
 
 
 class ErrorData(BaseData):
     """Class for holding and performing calculations on error data"""
-    def __init__(self, data_file_dict):
-        super().__init__(data_file_dict)
+    def __init__(self, data_file_dict=None, lazy=False, reader=None):
+        super().__init__(data_file_dict, lazy=lazy, reader=reader)
         self.error_df_dict = self.data_df_dict
         self.error_norms_dict = {}
 
+    def make_frame(self, data_df):
+        """Error tables are small and worked on with pandas, so are held as
+        DataFrames"""
+        return data_df.to_data_frame() if hasattr(data_df, "to_data_frame") else data_df
+
+    @classmethod
+    def from_long_format(cls, data_file, degree_columns="degree", columns=None,
+                         degree_id_format=None):
+        """Create error data from a single long-format table, i.e. one row per
+        (run, degree, h), which is split into one error table per degree"""
+        if type(degree_columns) is str:
+            degree_columns = [degree_columns]
+
+        # Only parse the columns that are actually needed
+        if columns is not None:
+            columns = list(dict.fromkeys(degree_columns + ["h"] + list(columns)))
+
+        long_df = pd.read_csv(data_file, usecols=columns)
+
+        error_data = cls({})
+        error_data.data_df_dict.update(
+            cls.split_long_format(long_df, degree_columns, degree_id_format)
+        )
+        error_data.data_file_dict = dict.fromkeys(error_data.data_df_dict, data_file)
+
+        return error_data
+
+    @staticmethod
+    def split_long_format(long_df, degree_columns="degree", degree_id_format=None):
+        """Returns a dictionary of per-degree views of a long-format DataFrame.
+        The rows are grouped once and, if they are not already contiguous,
+        reordered once, so each view is a slice sharing the underlying data."""
+        if type(degree_columns) is str:
+            degree_columns = [degree_columns]
+
+        grouper = long_df.groupby(degree_columns, sort=True)
+        group_codes = grouper.ngroup().to_numpy()
+        values_df = long_df.drop(columns=degree_columns)
+
+        # A stable sort keeps the rows of each degree in their original order
+        row_order = np.argsort(group_codes, kind="stable")
+
+        if np.any(row_order[1:] < row_order[:-1]):
+            values_df = values_df.take(row_order)
+            group_codes = group_codes[row_order]
+
+        group_bounds = np.searchsorted(group_codes, np.arange(grouper.ngroups + 1))
+        group_keys = long_df[degree_columns].to_numpy()[row_order[group_bounds[:-1]]]
+
+        error_df_dict = {}
+
+        for key, start, stop in zip(group_keys, group_bounds[:-1], group_bounds[1:]):
+            if degree_id_format is None:
+                degree_id = ", ".join(str(value) for value in key)
+            else:
+                degree_id = degree_id_format.format(*key)
+
+            error_df = values_df.iloc[start:stop]
+            error_df.index = pd.RangeIndex(stop - start)
+            error_df_dict[degree_id] = error_df
+
+        return error_df_dict
+
     def update_norms(self, error_norms_dict, custom_style_dict={}):
         """Update LaTeX norm notation."""
         self.error_norms_dict = error_norms_dict
@@ -21,9 +82,10 @@ class ErrorData(BaseData):
         """Returns a DataFrame of the convergence of the provided error data"""
         error_df = self.error_df_dict[degree_id]
         convergence_df = error_df.copy(deep=True)
-        
-        for i in range(error_df.shape[0] - 1):
-            convergence_df.loc[i] = np.log2((error_df.loc[i]) / (error_df.loc[i + 1]))
+
+        # Rates between consecutive rows (the final row keeps its error values)
+        error_values = error_df.to_numpy()
+        convergence_df.iloc[:-1] = np.log2(error_values[:-1] / error_values[1:])
 
         return convergence_df
 
@@ -62,72 +124,109 @@ class ErrorPlot(BasePlot):
         """Plot the errors for the given variables at the given polynomial degrees"""
         self.parameters.update(parameters)
         self.output_filename = output_filename
-        self.fig, self.axs = plt.subplots()
         
         if type(variables) is str:
             variables = [variables]
             
         if type(degree_ids) is str:
             degree_ids = [degree_ids]
-            
+
+        if self.is_up_to_date(output_filename,
+                              self.error_data.get_data_files(degree_ids),
+                              {"variables": variables,
+                               "degree_ids": degree_ids,
+                               "error_norms": self.error_data.error_norms_dict},
+                              degree_ids):
+            return
+
+        self.fig, self.axs = self.new_figure()
+        self.draw(self.axs, variables, degree_ids)
+        self.output(self.fig, self.axs, self.output_filename)
+
+    def draw(self, axs, variables, degree_ids):
+        """Draw the error lines of the given variables and degrees on the axes"""
+        from scipy import stats
+
+        if type(variables) is str:
+            variables = [variables]
+
+        if type(degree_ids) is str:
+            degree_ids = [degree_ids]
+
         relevant_error_dfs = [self.error_data.error_df_dict[degree_id] for degree_id in degree_ids]
         relevant_error_dfs_dict = dict(zip(degree_ids, relevant_error_dfs))
 
-        line_styles = LineStyles(self.data, variables, degree_ids,
-            drop=self.parameters["drop"],
-            norm_split=self.parameters["norm_split"],
-            custom_style_dict=self.parameters["custom_style_dict"])
-        styles = line_styles.line_styles_by_degree()
-        colours = line_styles.colours_by_degree()
+        with self.span("styles"):
+            line_styles = LineStyles(self.data, variables, degree_ids,
+                drop=self.parameters["drop"],
+                norm_split=self.parameters["norm_split"],
+                custom_style_dict=self.parameters["custom_style_dict"])
+            styles = line_styles.line_styles_by_degree()
+            colours = line_styles.colours_by_degree()
         style_degree_index = 0
         
-        for error_df_id, error_df in relevant_error_dfs_dict.items():
-            # Remove unnecessary columns from DataFrame
-            plotting_df = error_df.set_index("h")
-            columns_to_drop = []
-
-            for column in plotting_df.columns:
-                # Assuming the ID is of the form "variable norm"
-                variable = column.split(self.parameters["norm_split"])[0]
-                norm = column.split(self.parameters["norm_split"])[1]
+        with self.span("lines"):
+            for error_df_id, error_df in relevant_error_dfs_dict.items():
+                # Remove unnecessary columns from DataFrame
+                plotting_df = error_df.set_index("h")
+                columns_to_drop = []
+                unknown_columns = [column for column in self.parameters["drop"] if column not in plotting_df.columns]
+
+                if unknown_columns:
+                    raise ValueError(f"Cannot drop {', '.join(map(repr, unknown_columns))} from the errors of "
+                                     f"{error_df_id} (available: {', '.join(plotting_df.columns)})")
+
+                for column in plotting_df.columns:
+                    # Assuming the ID is of the form "variable norm"
+                    variable = column.split(self.parameters["norm_split"])[0]
+                    norm = column.split(self.parameters["norm_split"])[1]
                 
-                if variable not in variables:
-                    columns_to_drop.append(column)
+                    if variable not in variables:
+                        columns_to_drop.append(column)
                      
-            plotting_df.drop(
-                axis=1,
-                labels=["Time" + self.parameters["norm_split"] + "taken"] + columns_to_drop + self.parameters["drop"],
-                inplace=True,
-            )
-
-            renaming_columns = {}
+                plotting_df.drop(
+                    axis=1,
+                    labels=list(dict.fromkeys(columns_to_drop + self.parameters["drop"])),
+                    inplace=True,
+                )
+                # The time taken is dropped if the table has it
+                plotting_df.drop(
+                    axis=1,
+                    labels=["Time" + self.parameters["norm_split"] + "taken"],
+                    inplace=True,
+                    errors="ignore",
+                )
+
+                renaming_columns = {}
             
-            for error, error_norm in self.error_data.error_norms_dict.items():
-                # Calculate line slope for showing convergence rates on plot
-                slope = stats.linregress(np.log2(error_df["h"]), np.log2(error_df[error]))[0]
-
-                # Slope calculation using only the final two values
-                final_h_values = error_df["h"][-2:]
-                final_error_values = error_df[error][-2:]
-                slope_final = stats.linregress(np.log2(final_h_values), np.log2(final_error_values))[0]
+                for error, error_norm in self.error_data.error_norms_dict.items():
+                    # Calculate line slope for showing convergence rates on plot
+                    slope = stats.linregress(np.log2(error_df["h"]), np.log2(error_df[error]))[0]
+
+                    # Slope calculation using only the final two values
+                    final_h_values = error_df["h"][-2:]
+                    final_error_values = error_df[error][-2:]
+                    slope_final = stats.linregress(np.log2(final_h_values), np.log2(final_error_values))[0]
                 
-                # Relabel the columns to the correct LaTeX norm notation
-                renaming_columns[error] = f"{error_df_id}, " + fr"{error_norm}, " + f"EOC: {slope_final:.3f}"
+                    # Relabel the columns to the correct LaTeX norm notation
+                    renaming_columns[error] = f"{error_df_id}, " + fr"{error_norm}, " + f"EOC: {slope_final:.3f}"
                 
-            # Rename columns for correct plot labels
-            plotting_df.rename(
-                columns=renaming_columns,
-                inplace=True,
-            )
-
-            # Create plot
-            plotting_df.plot(ax=self.axs, style=list(styles[style_degree_index]), color=list(colours[style_degree_index]))
-            style_degree_index += 1
-
-        self.output()
+                # Rename columns for correct plot labels
+                plotting_df.rename(
+                    columns=renaming_columns,
+                    inplace=True,
+                )
+
+                # Create plot (one line per column, styled by degree)
+                for column, style, colour in zip(plotting_df.columns,
+                                                 styles[style_degree_index],
+                                                 colours[style_degree_index]):
+                    axs.plot(plotting_df.index, plotting_df[column], style, color=colour, label=column)
+
+                style_degree_index += 1
         
-    def output(self):
+    def output(self, fig, axs, output_filename):
         """Format and output plot to file"""
 
-        super().output()
+        super().output(fig, axs, output_filename)
 
@@ -0,0 +1,178 @@
+import re
+import numpy as np
+
+# Derived field functions by name. Each is called with the frame's
+# FieldEvaluator followed by the (unevaluated) arguments of the expression,
+# e.g. "grad_x(p)" calls derived_fields["grad_x"](evaluator, "p").
+derived_fields = {}
+
+derived_field_pattern = re.compile(r"^\s*(\w+)\s*\((.*)\)\s*$")
+
+
+def derived_field(name):
+    """Decorator registering a function as the derived field with the given name"""
+    def register(function):
+        derived_fields[name] = function
+        return function
+
+    return register
+
+
+def parse_expression(variable):
+    """Returns the name and argument strings of a derived field expression
+    such as "vorticity(u)", or None if the variable is not one"""
+    match = derived_field_pattern.match(variable)
+
+    if match is None or match.group(1) not in derived_fields:
+        return None
+
+    # Split the arguments on the commas outside any nested brackets
+    arguments = []
+    depth = 0
+    start = 0
+    argument_string = match.group(2)
+
+    for index, character in enumerate(argument_string):
+        if character == "(":
+            depth += 1
+        elif character == ")":
+            depth -= 1
+        elif character == "," and depth == 0:
+            arguments.append(argument_string[start:index].strip())
+            start = index + 1
+
+    arguments.append(argument_string[start:].strip())
+
+    return match.group(1), [argument for argument in arguments if argument]
+
+
+def nodal_gradient(triangulation, values):
+    """Returns the x and y derivatives of the piecewise linear interpolant of
+    the nodal values, averaged onto the nodes weighted by triangle area"""
+    triangles = triangulation.triangles
+    x = triangulation.x[triangles]
+    y = triangulation.y[triangles]
+    f = values[triangles]
+
+    x1, x2 = x[:, 1] - x[:, 0], x[:, 2] - x[:, 0]
+    y1, y2 = y[:, 1] - y[:, 0], y[:, 2] - y[:, 0]
+    f1, f2 = f[:, 1] - f[:, 0], f[:, 2] - f[:, 0]
+    determinant = x1 * y2 - x2 * y1  # Twice the signed area
+
+    # Degenerate triangles do not contribute
+    weights = np.abs(determinant)
+    safe_determinant = np.where(determinant == 0.0, 1.0, determinant)
+    triangle_grad_x = (f1 * y2 - f2 * y1) / safe_determinant * weights
+    triangle_grad_y = (x1 * f2 - x2 * f1) / safe_determinant * weights
+
+    num_nodes = len(triangulation.x)
+    node_indices = triangles.ravel()
+    node_weights = np.bincount(node_indices, np.repeat(weights, 3), minlength=num_nodes)
+    node_weights[node_weights == 0.0] = 1.0
+
+    grad_x = np.bincount(node_indices, np.repeat(triangle_grad_x, 3), minlength=num_nodes) / node_weights
+    grad_y = np.bincount(node_indices, np.repeat(triangle_grad_y, 3), minlength=num_nodes) / node_weights
+
+    return grad_x, grad_y
+
+
+class FieldEvaluator:
+    """Evaluates the columns and derived fields of one frame of data. Every
+    result is kept, so each field is computed at most once per frame however
+    many times it is used (for limits, filling, lines, ...)."""
+    def __init__(self, data_df, get_triangulation=None):
+        self.data_df = data_df
+        self.get_triangulation = get_triangulation
+        self.values = {}
+
+    def __call__(self, variable):
+        """Returns the values of a column or derived field as an array"""
+        if variable not in self.values:
+            self.values[variable] = self.evaluate(variable)
+
+        return self.values[variable]
+
+    def evaluate(self, variable):
+        if variable in self.data_df:
+            return np.asarray(self.data_df[variable])
+
+        expression = parse_expression(variable)
+
+        if expression is not None:
+            name, arguments = expression
+            return np.asarray(derived_fields[name](self, *arguments), dtype=float)
+
+        # Kept for compatibility: any other variable containing "magnitude"
+        # is the magnitude of the vector in the first three columns
+        if "magnitude" in variable:
+            return np.sqrt(sum(np.asarray(self.data_df[self.data_df.columns[index]])**2 for index in range(3)))
+
+        raise KeyError(f"'{variable}' is neither a column nor a derived field "
+                       f"(available: {', '.join(sorted(derived_fields))})")
+
+    def get_components(self, variable):
+        """Returns the components of a vector variable, e.g. the columns
+        "u:0", "u:1" (and "u:2" if present) for "u" or "u:0" """
+        raw_var = variable.split(":")[0]
+        components = [self(f"{raw_var}:{index}") for index in range(3)
+                      if index < 2 or f"{raw_var}:{index}" in self.data_df]
+
+        return components
+
+    def get_gradient(self, variable):
+        """Returns the x and y derivatives of a field on the mesh"""
+        if self.get_triangulation is None:
+            raise ValueError(f"The gradient of '{variable}' needs data on a two-dimensional mesh")
+
+        key = f"gradient({variable})"
+
+        if key not in self.values:
+            self.values[key] = nodal_gradient(self.get_triangulation(), self(variable))
+
+        return self.values[key]
+
+
+@derived_field("magnitude")
+def magnitude(evaluator, variable):
+    """Length of a vector variable"""
+    return np.sqrt(sum(component**2 for component in evaluator.get_components(variable)))
+
+
+@derived_field("component")
+def component(evaluator, variable, index):
+    """A single component of a vector variable"""
+    return evaluator(f"{variable.split(':')[0]}:{int(index)}")
+
+
+@derived_field("grad_x")
+def grad_x(evaluator, variable):
+    """Derivative in x of a field on the mesh"""
+    return evaluator.get_gradient(variable)[0]
+
+
+@derived_field("grad_y")
+def grad_y(evaluator, variable):
+    """Derivative in y of a field on the mesh"""
+    return evaluator.get_gradient(variable)[1]
+
+
+@derived_field("grad_magnitude")
+def grad_magnitude(evaluator, variable):
+    """Length of the gradient of a field on the mesh"""
+    return np.hypot(*evaluator.get_gradient(variable))
+
+
+@derived_field("vorticity")
+def vorticity(evaluator, variable):
+    """Vorticity (dv/dx - du/dy) of a two-dimensional vector field"""
+    raw_var = variable.split(":")[0]
+
+    return evaluator.get_gradient(raw_var + ":1")[0] - evaluator.get_gradient(raw_var + ":0")[1]
+
+
+@derived_field("divergence")
+def divergence(evaluator, variable):
+    """Divergence (du/dx + dv/dy) of a two-dimensional vector field"""
+    raw_var = variable.split(":")[0]
+
+    return evaluator.get_gradient(raw_var + ":0")[0] + evaluator.get_gradient(raw_var + ":1")[1]
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+
+# Fingerprints are stored next to each output file with this suffix
+FINGERPRINT_SUFFIX = ".naptools.json"
+
+# SHA-256 digests of the files read in this process, by path, size and
+# modification time, so that a file shared by many outputs (e.g. with global
+# colour limits) is only read once
+digest_cache = {}
+
+
+def fingerprint_filename(output_filename):
+    """Returns the path of the fingerprint recorded for the given output"""
+    return output_filename + FINGERPRINT_SUFFIX
+
+
+def file_digest(filename, previous_record=None):
+    """Returns a record of the size, modification time and SHA-256 digest of a
+    file. If the size and modification time match the previous record (or a
+    file already read by this process) its digest is reused instead of
+    reading the file again."""
+    file_stat = os.stat(filename)
+    record = {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns}
+    key = (os.path.abspath(filename), record["size"], record["mtime_ns"])
+
+    if (previous_record is not None
+            and previous_record.get("size") == record["size"]
+            and previous_record.get("mtime_ns") == record["mtime_ns"]):
+        record["sha256"] = previous_record["sha256"]
+        return record
+
+    if key in digest_cache:
+        record["sha256"] = digest_cache[key]
+        return record
+
+    digest = hashlib.sha256()
+
+    with open(filename, "rb") as data_file:
+        for block in iter(lambda: data_file.read(1 << 20), b""):
+            digest.update(block)
+
+    record["sha256"] = digest_cache[key] = digest.hexdigest()
+
+    return record
+
+
+def canonical_parameters(parameters):
+    """Returns a JSON-serialisable version of a parameters dictionary (colour
+    maps are replaced by their names and other objects by their repr)"""
+    def default(value):
+        if hasattr(value, "name") and hasattr(value, "N"):  # Colour map
+            return f"colour map {value.name}"
+        if hasattr(value, "tolist"):  # NumPy array or scalar
+            return value.tolist()
+        return repr(value)
+
+    return json.loads(json.dumps(parameters, sort_keys=True, default=default))
+
+
+def read_fingerprint(output_filename):
+    """Returns the fingerprint recorded for an output, or None"""
+    try:
+        with open(fingerprint_filename(output_filename)) as fingerprint_file:
+            return json.load(fingerprint_file)
+    except (OSError, ValueError):
+        return None
+
+
+def compute_fingerprint(input_files, parameters, arguments, version, style_file,
+                        previous=None):
+    """Returns the fingerprint of an output, made up of the contents of its input
+    files, the plot arguments and parameters, the naptools version and the
+    style file. Returns None if any of the inputs is not a file."""
+    previous_inputs = previous.get("inputs", {}) if previous else {}
+    inputs = {}
+
+    for input_file in sorted(set(input_files), key=str):
+        if not isinstance(input_file, (str, os.PathLike)) or not os.path.isfile(input_file):
+            return None
+
+        input_file = os.path.abspath(input_file)
+        inputs[input_file] = file_digest(input_file, previous_inputs.get(input_file))
+
+    style_records = previous.get("style", {}) if previous else {}
+
+    return {
+        "version": version,
+        "style": file_digest(style_file, style_records),
+        "arguments": canonical_parameters(arguments),
+        "parameters": canonical_parameters(parameters),
+        "inputs": inputs,
+    }
+
+
+def matches(fingerprint, previous):
+    """Returns True if two fingerprints describe the same output (modification
+    times are ignored, only the content digests are compared)"""
+    def content(fingerprint):
+        return {
+            "version": fingerprint["version"],
+            "style": fingerprint["style"]["sha256"],
+            "arguments": fingerprint["arguments"],
+            "parameters": fingerprint["parameters"],
+            "inputs": {path: record["sha256"] for path, record in fingerprint["inputs"].items()},
+        }
+
+    try:
+        return content(fingerprint) == content(previous)
+    except (KeyError, TypeError):
+        return False
+
+
+def record_fingerprint(output_filename, fingerprint):
+    """Write the fingerprint next to the output file"""
+    with open(fingerprint_filename(output_filename), "w") as fingerprint_file:
+        json.dump(fingerprint, fingerprint_file, indent=1, sort_keys=True)
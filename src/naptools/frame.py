@@ -0,0 +1,106 @@
+import re
+import numpy as np
+
+# The columns of the coordinates of the nodes, as exported by paraview
+coordinate_pattern = re.compile(r"Points:(\d+)")
+
+
+def get_coordinate_columns(columns):
+    """Returns the names of the coordinate columns among the given ones:
+    "Points:0", "Points:1", ... for as long as they are present"""
+    coordinate_columns = []
+
+    while f"Points:{len(coordinate_columns)}" in columns:
+        coordinate_columns.append(f"Points:{len(coordinate_columns)}")
+
+    return coordinate_columns
+
+
+class Frame:
+    """One frame (e.g. timestamp) of data held as NumPy arrays, which the data
+    classes hold in data_df_dict in place of a pandas DataFrame. The
+    coordinates "Points:0", "Points:1", ... are the columns of a single
+    (N, D) array in column-major order, so the x and y of the nodes are
+    contiguous arrays without copies, and every other column is a contiguous
+    array in fields (numeric columns as floats). frame[name] returns a column
+    as an array, and to_data_frame() builds a DataFrame when one is wanted
+    (e.g. to print or for further analysis)."""
+    __slots__ = ("coordinates", "fields", "columns", "attrs")
+
+    def __init__(self, coordinates, fields=None, columns=None, attrs=None):
+        self.coordinates = coordinates
+        self.fields = fields if fields is not None else {}
+        self.columns = columns if columns is not None else (
+            list(self.fields) + [f"Points:{index}" for index in range(coordinates.shape[1])])
+        self.attrs = attrs if attrs is not None else {}
+
+    @classmethod
+    def from_columns(cls, columns, attrs=None):
+        """Returns the frame of a dictionary of equally long arrays by column
+        name. The coordinates are gathered into one new array (of their own
+        float dtype), and the other columns are only copied if they are not
+        contiguous or not floats. Readers which can build the coordinate
+        array in place (see naptools.chunked) pass it to Frame() instead."""
+        columns = {name: np.asarray(values) for name, values in columns.items()}
+        num_rows = len(next(iter(columns.values()))) if columns else 0
+        coordinate_columns = get_coordinate_columns(columns)
+        dtype = np.result_type(*[columns[name].dtype for name in coordinate_columns]) if coordinate_columns else float
+
+        if not np.issubdtype(dtype, np.floating):
+            dtype = float
+
+        coordinates = np.empty((num_rows, len(coordinate_columns)), dtype=dtype, order="F")
+
+        for index, name in enumerate(coordinate_columns):
+            coordinates[:, index] = columns[name]
+
+        fields = {}
+
+        for name, values in columns.items():
+            if name in coordinate_columns:
+                continue
+
+            if np.issubdtype(values.dtype, np.number) and not np.issubdtype(values.dtype, np.floating):
+                values = values.astype(float)
+
+            fields[name] = np.ascontiguousarray(values)
+
+        return cls(coordinates, fields, list(columns), attrs)
+
+    @classmethod
+    def from_data_frame(cls, data_df):
+        """Returns the frame of a DataFrame (with its attrs)"""
+        return cls.from_columns({name: data_df[name].to_numpy() for name in data_df.columns},
+                                dict(data_df.attrs))
+
+    def to_data_frame(self):
+        """Returns a DataFrame of the columns of the frame, in their order"""
+        import pandas as pd
+
+        data_df = pd.DataFrame({name: self[name] for name in self.columns}, copy=False)
+        data_df.attrs.update(self.attrs)
+
+        return data_df
+
+    def __getitem__(self, name):
+        """Returns a column of the frame as an array"""
+        values = self.fields.get(name)
+
+        if values is not None:
+            return values
+
+        match = coordinate_pattern.fullmatch(name)
+
+        if match is not None and int(match[1]) < self.coordinates.shape[1]:
+            return self.coordinates[:, int(match[1])]
+
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self.fields or name in self.columns
+
+    def __len__(self):
+        return self.coordinates.shape[0]
+
+    def __repr__(self):
+        return f"<Frame of {len(self)} rows: {', '.join(self.columns)}>"
@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InSituRenderer:
+    """Hook handing each new timestep of a running simulation to a plot (e.g.
+    a ContourPlot or StreamPlot of in-memory data), without writing or reading
+    data files. Call it with (timestamp, coords, fields) as for
+    Data2D.add_frame(); the frame is drawn and saved, then dropped unless
+    keep_frames is set. Each frame is coloured by its own data limits.
+
+    With background=True frames are rendered on a separate thread while the
+    simulation carries on, with at most max_pending frames waiting, so the
+    arrays of a frame must not be changed in place until it is rendered (pass
+    copies if the solver reuses them). Call close(), or use the renderer as a
+    context manager, to wait for the last frames."""
+    def __init__(self, plot, variable, output_filename, parameters={},
+                 background=False, max_pending=2, keep_frames=False):
+        self.plot = plot
+        self.variable = variable
+        self.output_filename = output_filename
+        self.parameters = dict(parameters, individual_colour_bar=True, prefetch_frames=0)
+        self.keep_frames = keep_frames
+        self.futures = []
+
+        if background:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="naptools-in-situ")
+            self.pending = threading.BoundedSemaphore(max_pending)
+        else:
+            self.executor = None
+
+    def __call__(self, timestamp, coords, fields=None):
+        """Add the data of a timestep and render (or queue) its frame"""
+        if self.executor is None:
+            return self.render(timestamp, coords, fields)
+
+        # Wait (blocking the simulation) while too many frames are pending.
+        # The slot is given back if an earlier error is raised instead.
+        self.pending.acquire()
+
+        try:
+            self.raise_errors()
+            self.futures.append(self.executor.submit(self.render_pending, timestamp, coords, fields))
+        except BaseException:
+            self.pending.release()
+            raise
+
+    def render(self, timestamp, coords, fields):
+        """Draw and save the frame of a timestep"""
+        self.plot.data.add_frame(timestamp, coords, fields)
+
+        try:
+            self.plot.plot(self.variable, [timestamp], self.output_filename, self.parameters)
+        finally:
+            if not self.keep_frames:
+                del self.plot.data.data_df_dict[timestamp]
+                self.plot.data.field_evaluators.pop(timestamp, None)
+
+    def render_pending(self, timestamp, coords, fields):
+        try:
+            self.render(timestamp, coords, fields)
+        finally:
+            self.pending.release()
+
+    def raise_errors(self):
+        """Raise the first error of the frames rendered so far"""
+        finished = [future for future in self.futures if future.done()]
+        self.futures = [future for future in self.futures if not future.done()]
+
+        for future in finished:
+            future.result()
+
+    def close(self):
+        """Wait for any frames still being rendered"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.raise_errors()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+        return False
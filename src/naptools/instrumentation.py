@@ -0,0 +1,281 @@
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# The active instrumentation (None when disabled)
+active_instrumentation = None
+
+
+class NullSpan:
+    """Span that does nothing, returned when instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(stage, **attributes):
+    """Returns a context manager timing the named stage of the plot pipeline.
+    When instrumentation is disabled this is a shared no-op object."""
+    if active_instrumentation is None:
+        return NULL_SPAN
+
+    return Span(active_instrumentation, stage, attributes)
+
+
+def enable(sinks=(), track_memory=False):
+    """Enable instrumentation for all data and plot classes (in place of any
+    enabled before) and return it"""
+    global active_instrumentation
+
+    disable()
+    active_instrumentation = Instrumentation(sinks, track_memory)
+
+    return active_instrumentation
+
+
+def disable():
+    """Disable instrumentation and return the instrumentation that was active"""
+    global active_instrumentation
+
+    instrumentation = active_instrumentation
+    active_instrumentation = None
+
+    if instrumentation is not None:
+        instrumentation.close()
+
+    return instrumentation
+
+
+def reset_peak_memory():
+    """Reset the traced memory peak (only available from Python 3.9)"""
+    import tracemalloc
+
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+
+class Span:
+    """Context manager recording the duration (and optionally the peak traced
+    memory) of one stage and passing the record to the sinks"""
+
+    __slots__ = ("instrumentation", "stage", "attributes", "start_time", "start_memory", "tracks_memory")
+
+    def __init__(self, instrumentation, stage, attributes):
+        self.instrumentation = instrumentation
+        self.stage = stage
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.tracks_memory = self.instrumentation.open_span(self)
+        self.start_time = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start_time
+        record = {"stage": self.stage, "duration": duration}
+        peak_memory = self.instrumentation.close_span(self)
+
+        if peak_memory is not None:
+            record["peak_memory"] = peak_memory
+
+        record.update(self.attributes)
+        self.instrumentation.emit(record)
+
+        return False
+
+
+class Instrumentation:
+    """Collection of stage spans from the plot pipeline. Each finished span is
+    passed to every sink as a dictionary record and added to a summary.
+
+    With track_memory each span also records the peak traced memory above
+    its start. The traced peak is process-wide, so it is only measured by
+    spans opened while no other thread has a span open (e.g. not by the
+    frames drawn concurrently with "num_threads", or read ahead by a frame
+    pipeline), and includes memory allocated by other threads meanwhile."""
+
+    def __init__(self, sinks=(), track_memory=False):
+        self.sinks = list(sinks)
+        self.track_memory = track_memory
+        self.stage_summary = {}
+        self.lock = threading.Lock()
+        self.memory_stack = threading.local()
+
+        # The number of open spans of each thread
+        self.open_spans = {}
+
+        # Tracing started here is stopped again by close()
+        self.started_tracing = False
+
+        if track_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+
+    def open_span(self, span):
+        """Count an opened span. Returns True if it measures the peak memory,
+        which is then reset so that it only covers this span."""
+        thread = threading.get_ident()
+
+        with self.lock:
+            tracks_memory = self.track_memory and all(other == thread for other in self.open_spans)
+            self.open_spans[thread] = self.open_spans.get(thread, 0) + 1
+
+            if tracks_memory:
+                import tracemalloc
+
+                # Keep track of the peak reached so far by the enclosing spans
+                span.start_memory, outer_peak = tracemalloc.get_traced_memory()
+                self.memory_stack.__dict__.setdefault("peaks", []).append(outer_peak)
+                reset_peak_memory()
+
+        return tracks_memory
+
+    def close_span(self, span):
+        """Count a closed span. Returns the peak memory above its start, or
+        None if it was not measured."""
+        thread = threading.get_ident()
+
+        with self.lock:
+            self.open_spans[thread] -= 1
+
+            if not self.open_spans[thread]:
+                del self.open_spans[thread]
+
+            if not span.tracks_memory:
+                return None
+
+            import tracemalloc
+
+            # The peak of the enclosing span is the larger of its peak before
+            # this span started and the peak during this span
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            stack = self.memory_stack.peaks
+            outer_peak = max(stack.pop(), peak_memory)
+
+            if stack:
+                stack[-1] = max(stack[-1], outer_peak)
+
+            reset_peak_memory()
+
+        return peak_memory - span.start_memory
+
+    def emit(self, record):
+        """Add a span record to the summary and pass it to the sinks"""
+        with self.lock:
+            stage_summary = self.stage_summary.setdefault(
+                record["stage"], {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            stage_summary["count"] += 1
+            stage_summary["total"] += record["duration"]
+            stage_summary["max"] = max(stage_summary["max"], record["duration"])
+
+            if "peak_memory" in record:
+                stage_summary["peak_memory"] = max(stage_summary.get("peak_memory", 0),
+                                                   record["peak_memory"])
+
+            for sink in self.sinks:
+                sink(record)
+
+    def summary(self):
+        """Returns a dictionary of the count, total and maximum duration (and
+        peak memory) of each stage"""
+        with self.lock:
+            return {stage: dict(stage_summary) for stage, stage_summary in self.stage_summary.items()}
+
+    def format_summary(self):
+        """Returns the summary as a human-readable table"""
+        return format_summary(self.summary())
+
+    def close(self):
+        """Close the sinks, and stop tracing memory if it was started here (so
+        that disabled instrumentation costs nothing)"""
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+        if self.started_tracing:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self.started_tracing = False
+
+
+def merge_summaries(summaries):
+    """Combine the summaries of several runs (e.g. from worker processes)"""
+    merged = {}
+
+    for summary in summaries:
+        for stage, stage_summary in summary.items():
+            merged_stage = merged.setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0})
+            merged_stage["count"] += stage_summary["count"]
+            merged_stage["total"] += stage_summary["total"]
+            merged_stage["max"] = max(merged_stage["max"], stage_summary["max"])
+
+            if "peak_memory" in stage_summary:
+                merged_stage["peak_memory"] = max(merged_stage.get("peak_memory", 0),
+                                                  stage_summary["peak_memory"])
+
+    return merged
+
+
+def format_summary(summary):
+    """Returns a summary as a human-readable table, slowest stages first"""
+    lines = [f"{'stage':20} {'count':>6} {'total (s)':>10} {'max (s)':>10} {'peak (MiB)':>11}"]
+
+    for stage, stage_summary in sorted(summary.items(),
+                                       key=lambda item: item[1]["total"], reverse=True):
+        peak = stage_summary.get("peak_memory")
+        peak = f"{peak / 2**20:11.1f}" if peak is not None else f"{'-':>11}"
+        lines.append(f"{stage:20} {stage_summary['count']:6d} {stage_summary['total']:10.3f} "
+                     f"{stage_summary['max']:10.3f} {peak}")
+
+    return "\n".join(lines)
+
+
+class LoggingSink:
+    """Sink writing each span to the naptools logger"""
+
+    def __init__(self, level=logging.DEBUG):
+        self.level = level
+
+    def __call__(self, record):
+        attributes = ", ".join(f"{key}={value}" for key, value in record.items()
+                               if key not in ("stage", "duration"))
+        logger.log(self.level, "%s took %.4f s (%s)", record["stage"], record["duration"], attributes)
+
+
+class JSONLinesSink:
+    """Sink writing each span as a line of JSON to a file. The file is
+    appended to one line at a time, so several processes can share it."""
+
+    def __init__(self, filename):
+        self.file = open(filename, "a", buffering=1)
+
+    def __call__(self, record):
+        self.file.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class CallbackSink:
+    """Sink passing each span record to a function"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, record):
+        self.callback(record)
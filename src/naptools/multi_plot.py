@@ -1,11 +1,277 @@
+from naptools import BasePlot, colour_bar, outputs
+from naptools.plot_2d import Plot2D, TriangulationCache
 
-class MultiPlot:
+
+class MultiPlot(BasePlot):
     """This class is a custom holder for multiple individual plots (useful if
-    a single image with multiple plots, e.g. for making a video, is needed)"""
+    a single image with multiple plots, e.g. for making a video, is needed).
+    Each element of the grid is drawn by a two-dimensional plot (ContourPlot,
+    ContourStreamPlot, StreamPlot, ...), ErrorPlot or BasePlot into its own
+    axes of a single figure, which is saved once per frame."""
     def __init__(self, num_rows, num_columns):
+        super().__init__(None)
         self.num_rows = num_rows
         self.num_columns = num_columns
-        
-    def plot(self, row_index, column_index, plot_type, data):
-        """Creates an instance of Plot to populate the given MultiPlot element"""
-        pass
+        self.panels = []
+
+        # Triangulations are shared by all panels (and frames) on the same mesh
+        self.triangulation_cache = TriangulationCache()
+
+        self.set_plotting_parameters()
+
+    def set_plotting_parameters(self):
+        """Set the default multi-plot parameters"""
+        # Default parameters (alphabetical order)
+        self.parameters["colour_bar_location"] = "right"
+        self.parameters["individual_colour_bar"] = True
+        self.parameters["panel_height"] = 6.0
+        self.parameters["panel_width"] = 6.0
+        self.parameters["shared_colour_bar"] = True
+
+    def plot(self, timestamps, output_filename, parameters={}):
+        """Create a single or series of multi-plot(s). Each timestamp gives one
+        frame, in which the contour and stream panels show that timestamp of
+        their data. Without timestamps a single figure is created."""
+        self.parameters.update(parameters)
+        self.series_output = outputs.get_output(output_filename)
+
+        # The colour scales of the panels are made afresh for each call, so
+        # they follow any change to the panels' parameters
+        for panel in self.panels:
+            if panel["coloured"]:
+                panel["plot"].colour_scales = {}
+
+        arguments = {"panels": [self.describe_panel(panel) for panel in self.panels]}
+        coloured_panels = [panel for panel in self.panels if panel["coloured"]]
+
+        if timestamps is None:
+            if any(panel["series"] and panel["keys"] is None for panel in self.panels):
+                raise ValueError("Contour and stream panels need keys (their timestamp) "
+                                 "when the multi-plot has no timestamps")
+
+            if self.is_up_to_date(output_filename, self.get_input_files(None), arguments):
+                return
+
+            self.data_limits = self.get_group_data_limits(None)
+            self.plot_frame(None, output_filename)
+            return
+
+        # Global colour limits make every frame depend on the whole series
+        all_timestamps = list(timestamps)
+        self.timestamp_indices = {timestamp: index for index, timestamp in enumerate(all_timestamps)}
+        timestamps = self.get_stale_timestamps(
+            arguments,
+            all_timestamps,
+            shared_inputs=bool(coloured_panels) and not self.parameters["individual_colour_bar"],
+        )
+
+        if not timestamps:
+            return
+
+        with self.span("limits"):
+            if self.parameters["individual_colour_bar"]:
+                self.data_limits = self.get_group_data_limits(timestamps)
+            else:
+                self.data_limits = self.get_group_data_limits(all_timestamps)
+
+        self.plot_frames(lambda timestamp: self.plot_frame(timestamp, self.get_frame_filename(timestamp)),
+                         timestamps)
+
+    def add_plot(self, row_index, column_index, plot_type, data, variable, keys=None,
+                 parameters={}, colour_group=None, title=None):
+        """Creates an instance of Plot to populate the given MultiPlot element.
+
+        For contour and stream plots the variable is drawn at each timestamp of
+        the multi-plot, or at the matching entry of keys (a list of this data's
+        timestamps, in the same order). For error plots and basic plots keys are
+        the degree IDs or dependent variables, drawn in every frame. Contour
+        panels in the same colour group (by default, those showing the same
+        variable) share their colour limits and colour bar. Returns the plot."""
+        plot = plot_type(data)
+        plot.parameters.update(parameters)
+
+        series = isinstance(plot, Plot2D)
+        coloured = series and plot.is_coloured()
+
+        if series:
+            plot.triangulation_cache = self.triangulation_cache
+
+        self.panels.append({
+            "row": row_index,
+            "column": column_index,
+            "plot": plot,
+            "variable": variable,
+            "keys": keys,
+            "series": series,
+            "coloured": coloured,
+            "colour_group": (colour_group if colour_group is not None else variable) if coloured else None,
+            "title": title,
+        })
+
+        return plot
+
+    def describe_panel(self, panel):
+        """Returns the arguments of a panel that determine its appearance"""
+        plot = panel["plot"]
+
+        return {
+            "row": panel["row"],
+            "column": panel["column"],
+            "plot": type(plot).__name__,
+            "variable": panel["variable"],
+            "keys": panel["keys"],
+            "colour_group": panel["colour_group"],
+            "title": panel["title"],
+            "parameters": {key: value for key, value in plot.parameters.items()
+                           if key not in plot.non_output_parameters},
+        }
+
+    def get_panel_timestamp(self, panel, timestamp):
+        """Returns the timestamp of a contour or stream panel's data shown in
+        the given frame (the first of its keys without frames)"""
+        if timestamp is None:
+            return panel["keys"][0]
+
+        if panel["keys"] is None:
+            return timestamp
+
+        return panel["keys"][self.timestamp_indices[timestamp]]
+
+    def get_panel_timestamps(self, panel, timestamps):
+        """Returns the timestamps of a contour or stream panel's data shown in
+        the given frames"""
+        if timestamps is None:
+            timestamps = [None]
+
+        return [self.get_panel_timestamp(panel, timestamp) for timestamp in timestamps]
+
+    def get_input_files(self, timestamps):
+        """Returns the data files read by every panel of the given frames"""
+        input_files = []
+
+        for panel in self.panels:
+            if panel["series"]:
+                input_files += panel["plot"].data.get_input_files(self.get_panel_timestamps(panel, timestamps))
+            else:
+                input_files += panel["plot"].data.get_input_files()
+
+        return input_files
+
+    def get_fingerprint_arguments(self, timestamps):
+        """Returns the settings of the data of every panel of the given frames
+        (see BaseData.get_fingerprint_arguments()), if any panel has some"""
+        data_arguments = []
+
+        for panel in self.panels:
+            if panel["series"]:
+                data_arguments.append(panel["plot"].data.get_fingerprint_arguments(
+                    self.get_panel_timestamps(panel, timestamps)))
+            else:
+                data_arguments.append(panel["plot"].data.get_fingerprint_arguments())
+
+        return data_arguments if any(data_arguments) else {}
+
+    def get_group_data_limits(self, timestamps):
+        """Returns the data limits of each colour group, per frame. The limits
+        of every panel in a group are combined."""
+        group_data_limits = {}
+
+        for panel in self.panels:
+            if not panel["coloured"]:
+                continue
+
+            panel_data_limits = panel["plot"].get_data_limits(
+                panel["variable"], self.get_panel_timestamps(panel, timestamps)
+            )
+            data_limits = group_data_limits.setdefault(panel["colour_group"], {})
+
+            for timestamp in (timestamps if timestamps is not None else [None]):
+                limits = panel_data_limits[self.get_panel_timestamp(panel, timestamp)]
+
+                if timestamp in data_limits:
+                    limits = [min(data_limits[timestamp][0], limits[0]),
+                              max(data_limits[timestamp][1], limits[1])]
+
+                data_limits[timestamp] = limits
+
+        return group_data_limits
+
+    def get_frame_data_limits(self, colour_group, timestamp):
+        """Returns the data limits used for colouring a group in a frame"""
+        data_limits = self.data_limits[colour_group]
+
+        if self.parameters["individual_colour_bar"] or timestamp is None:
+            return data_limits[timestamp]
+        else:
+            return [min(limits[0] for limits in data_limits.values()),
+                    max(limits[1] for limits in data_limits.values())]
+
+    def new_figure(self):
+        """Returns a new figure and its grid of axes"""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=(self.num_columns * self.parameters["panel_width"],
+                              self.num_rows * self.parameters["panel_height"]))
+        FigureCanvasAgg(fig)
+        axs = fig.subplots(self.num_rows, self.num_columns, squeeze=False)
+
+        return fig, axs
+
+    def plot_frame(self, timestamp, output_filename):
+        """Draw every panel of a single frame into one figure and output it"""
+        fig, axs = self.new_figure()
+        used_axes = set()
+        colour_group_panels = {}
+
+        for panel in self.panels:
+            plot = panel["plot"]
+            panel_axs = axs[panel["row"], panel["column"]]
+            used_axes.add((panel["row"], panel["column"]))
+
+            if panel["coloured"]:
+                panel_timestamp = self.get_panel_timestamp(panel, timestamp)
+                colour_scale = plot.get_colour_scale(self.get_frame_data_limits(panel["colour_group"], timestamp))
+                plot.draw(panel_axs, panel["variable"], panel_timestamp, colour_scale)
+                colour_group_panels.setdefault(panel["colour_group"], []).append((panel, panel_axs, colour_scale))
+
+            elif panel["series"]:
+                plot.draw(panel_axs, panel["variable"], self.get_panel_timestamp(panel, timestamp))
+
+            else:
+                plot.draw(panel_axs, panel["variable"], panel["keys"])
+
+            plot.format_axes(panel_axs)
+
+            if panel["title"] is not None:
+                panel_axs.set_title(panel["title"])
+
+        # Grid elements without a plot are left empty
+        for row_index in range(self.num_rows):
+            for column_index in range(self.num_columns):
+                if (row_index, column_index) not in used_axes:
+                    axs[row_index, column_index].set_axis_off()
+
+        with self.span("colour bar", timestamp=timestamp):
+            for colour_group, group_panels in colour_group_panels.items():
+                if self.parameters["shared_colour_bar"]:
+                    self.make_shared_colour_bar(fig, colour_group, group_panels)
+
+                else:
+                    for panel, panel_axs, colour_scale in group_panels:
+                        panel["plot"].make_colour_bar(fig, panel_axs, panel["variable"], colour_scale)
+
+        self.save(fig, output_filename)
+
+    def make_shared_colour_bar(self, fig, colour_group, group_panels):
+        """Add a single colour bar (with the colour scale of the first panel)
+        next to all panels of a colour group"""
+        panel, panel_axs, colour_scale = group_panels[0]
+
+        colour_bar.make_colour_bar(
+            fig,
+            colour_scale,
+            rf"${colour_group}$",
+            dict(panel["plot"].parameters, colour_bar_location=self.parameters["colour_bar_location"]),
+            ax=[group_panel_axs for group_panel, group_panel_axs, group_colour_scale in group_panels],
+        )
@@ -0,0 +1,148 @@
+import io
+import json
+import os
+
+# The metadata key of each format that the output metadata is written to
+METADATA_KEYS = {"png": "Description", "svg": "Description", "pdf": "Subject"}
+
+
+class FileTarget:
+    """Output written to a file, in the format given by its extension (and at
+    the given dpi, or the figure's)"""
+    def __init__(self, filename, dpi=None):
+        self.filename = os.fspath(filename)
+        self.dpi = dpi
+        self.format = os.path.splitext(self.filename)[1][1:].lower() or None
+
+    def with_suffix(self, suffix):
+        """Returns the target of a figure of a series (e.g. "u.png" becomes
+        "u_0002.png" for the suffix "_0002")"""
+        base_filename, file_extension = os.path.splitext(self.filename)
+
+        return FileTarget(base_filename + suffix + file_extension, self.dpi)
+
+    def write(self, data):
+        if os.path.dirname(self.filename):
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+
+        with open(self.filename, "wb") as output_file:
+            output_file.write(data)
+
+    def __str__(self):
+        return self.filename
+
+
+class BytesSink:
+    """Output kept in memory. The encoded bytes of each figure are stored in
+    outputs by the figure's suffix ("" for a single plot, e.g. "_0002" for a
+    frame of a series or "_colour_bar")."""
+    def __init__(self, format="png", dpi=None):
+        self.format = format
+        self.dpi = dpi
+        self.suffix = ""
+        self.outputs = {}
+
+    def with_suffix(self, suffix):
+        sink = BytesSink(self.format, self.dpi)
+        sink.suffix = self.suffix + suffix
+        sink.outputs = self.outputs
+
+        return sink
+
+    def write(self, data):
+        self.outputs[self.suffix] = data
+
+    def getvalue(self):
+        """Returns the bytes of the single plot (or the last figure saved)"""
+        return list(self.outputs.values())[-1]
+
+    def __str__(self):
+        return f"<{self.format} bytes{self.suffix}>"
+
+
+class StreamSink:
+    """Output written to a file-like object (e.g. a web response), one figure
+    after another"""
+    def __init__(self, file, format="png", dpi=None):
+        self.file = file
+        self.format = format
+        self.dpi = dpi
+        self.suffix = ""
+
+    def with_suffix(self, suffix):
+        sink = StreamSink(self.file, self.format, self.dpi)
+        sink.suffix = self.suffix + suffix
+
+        return sink
+
+    def write(self, data):
+        self.file.write(data)
+
+    def __str__(self):
+        return f"<{self.format} stream{self.suffix}>"
+
+
+class Output:
+    """The targets a figure is saved to, from the output_filename argument of
+    the plot methods: a filename, a target (FileTarget, BytesSink or
+    StreamSink), a dictionary of FileTarget arguments (e.g. {"filename":
+    "u.png", "dpi": 300}) or a list of any of these. Every target is written
+    from the same drawn figure, and targets sharing a format and dpi are
+    encoded only once."""
+    def __init__(self, targets):
+        self.targets = targets
+
+    def with_suffix(self, suffix):
+        return Output([target.with_suffix(suffix) for target in self.targets])
+
+    def get_filenames(self):
+        """Returns the filenames of the targets written to files"""
+        return [target.filename for target in self.targets if isinstance(target, FileTarget)]
+
+    def has_sinks(self):
+        """Returns True if any target is not a file (so is always written)"""
+        return any(not isinstance(target, FileTarget) for target in self.targets)
+
+    def save(self, fig, metadata=None):
+        """Encode the figure (once for each format and dpi) to every target.
+        Any metadata is written as JSON to the formats which can hold it."""
+        encoded = {}
+
+        for target in self.targets:
+            key = (target.format, target.dpi)
+
+            if key not in encoded:
+                buffer = io.BytesIO()
+                arguments = {"dpi": target.dpi} if target.dpi is not None else {}
+
+                if metadata and target.format in METADATA_KEYS:
+                    arguments["metadata"] = {METADATA_KEYS[target.format]: json.dumps(metadata, sort_keys=True)}
+
+                fig.savefig(buffer, format=target.format, bbox_inches="tight", **arguments)
+                encoded[key] = buffer.getvalue()
+
+            target.write(encoded[key])
+
+    def __str__(self):
+        return ", ".join(str(target) for target in self.targets)
+
+
+def get_output(output_filename):
+    """Returns the Output of an output_filename argument (see Output)"""
+    if isinstance(output_filename, Output):
+        return output_filename
+
+    if not isinstance(output_filename, (list, tuple)):
+        output_filename = [output_filename]
+
+    targets = []
+
+    for target in output_filename:
+        if isinstance(target, dict):
+            target = FileTarget(**target)
+        elif isinstance(target, (str, os.PathLike)):
+            target = FileTarget(target)
+
+        targets.append(target)
+
+    return Output(targets)
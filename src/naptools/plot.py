@@ -1,30 +1,220 @@
-import matplotlib.pyplot as plt
-import pandas as pd
 import os
+import logging
+from collections.abc import MutableMapping
+import naptools
+from naptools import fingerprint, instrumentation, outputs
 
-# Default style parameters
+logger = logging.getLogger(__name__)
+
+# Default style parameters (applied when the first plot is created)
 naptools_dir_path = os.path.dirname(os.path.realpath(__file__))
-plt.style.use(naptools_dir_path + "/naptools_default.mplstyle")
+style_applied = False
+
+
+def apply_style():
+    """Apply the default naptools style to matplotlib, once per process"""
+    global style_applied
+
+    if not style_applied:
+        import matplotlib.style
+        matplotlib.style.use(naptools_dir_path + "/naptools_default.mplstyle")
+        style_applied = True
 
 
 # TODO -- Setup some default parameter choices for easily reading one, two, three, four
 #         plots next to each other in a LaTeX document.
 
 
-class BaseData:
-    """Base class for holding and performing calculations on data"""
+class LazyDataDict(MutableMapping):
+    """Dictionary of DataFrames which are only read from file on first access"""
 
-    def __init__(self, data_file_dict):
+    def __init__(self, data_file_dict, read_data_file):
         self.data_file_dict = data_file_dict
-        self.data_df_dict = {}
+        self.read_data_file = read_data_file
+        self.loaded_df_dict = {}
+
+    def __getitem__(self, data_df_id):
+        if data_df_id not in self.loaded_df_dict:
+            self.loaded_df_dict[data_df_id] = self.read_data_file(self.data_file_dict[data_df_id])
+
+        return self.loaded_df_dict[data_df_id]
+
+    def __setitem__(self, data_df_id, data_df):
+        self.loaded_df_dict[data_df_id] = data_df
+
+    def __delitem__(self, data_df_id):
+        self.loaded_df_dict.pop(data_df_id, None)
+        self.data_file_dict.pop(data_df_id, None)
+
+    def release(self, data_df_id):
+        """Forget a DataFrame read from file (it is read again if used)"""
+        if data_df_id in self.data_file_dict:
+            self.loaded_df_dict.pop(data_df_id, None)
+
+    def __iter__(self):
+        return iter(dict.fromkeys([*self.data_file_dict, *self.loaded_df_dict]))
+
+    def __len__(self):
+        return len(dict.fromkeys([*self.data_file_dict, *self.loaded_df_dict]))
+
+
+class BaseData:
+    """Base class for holding and performing calculations on data, read from
+    the files of data_file_dict or added in memory with add_frame(). Files
+    are read with pandas.read_csv, or with reader(data_file) if given (e.g.
+    a naptools.chunked.ChunkedReader for files larger than memory). Each is
+    held in data_df_dict as a Frame of arrays (see naptools.frame), and
+    get_data_frame() returns it as a DataFrame."""
+
+    def __init__(self, data_file_dict=None, lazy=False, reader=None):
+        self.data_file_dict = data_file_dict if data_file_dict is not None else {}
+        self.reader = reader
+        self.field_evaluators = {}
+
+        # With lazy loading each file is only read when its data is first used
+        if lazy:
+            self.data_df_dict = LazyDataDict(self.data_file_dict, self.load_data_file)
+
+        else:
+            self.data_df_dict = {}
+
+            # Populate dictionary of data
+            for data_file_id, data_file in self.data_file_dict.items():
+                self.data_df_dict[data_file_id] = self.load_data_file(data_file)
+
+    @classmethod
+    def from_data_frames(cls, data_df_dict):
+        """Returns data holding the given DataFrames (not read from file)"""
+        data = cls()
+
+        for data_df_id, data_df in data_df_dict.items():
+            data.add_frame(data_df_id, data_df)
+
+        return data
+
+    def add_frame(self, data_df_id, data_df):
+        """Add (or replace) data held in memory, given as a DataFrame or Frame.
+        Its float columns are not copied (the coordinates are, see Frame)."""
+        self.data_df_dict[data_df_id] = self.make_frame(data_df)
+        self.field_evaluators.pop(data_df_id, None)
+
+    def make_frame(self, data_df):
+        """Returns the Frame held for a DataFrame read or added"""
+        from naptools.frame import Frame
+
+        if isinstance(data_df, Frame):
+            return data_df
+
+        return Frame.from_data_frame(data_df)
+
+    def load_data_file(self, data_file):
+        """Read a data file, timed as the "load" stage"""
+        with instrumentation.span("load", data=type(self).__name__, data_file=str(data_file)):
+            return self.make_frame(self.read_data_file(data_file))
+
+    def read_data_file(self, data_file):
+        """Returns a DataFrame of the data in the given file"""
+        import pandas as pd
 
-        # Populate dictionary of data
-        for data_file_id, data_file in self.data_file_dict.items():
-            data_df = pd.read_csv(data_file)
-            self.data_df_dict[data_file_id] = data_df
+        if self.reader is not None:
+            return self.reader(data_file)
+
+        return pd.read_csv(data_file)
+
+    def read_data_columns(self, data_file, columns, num_rows=None):
+        """Returns a DataFrame of only the given columns (and, if given, the
+        first num_rows rows) of the data in the given file. With a reader the
+        rows are those it keeps: it reads the columns with its read_columns()
+        if it has one (see naptools.chunked.ChunkedReader), and otherwise the
+        whole file is read."""
+        import pandas as pd
+
+        if self.reader is not None:
+            read_columns = getattr(self.reader, "read_columns", None)
+
+            if read_columns is not None:
+                return read_columns(data_file, columns, num_rows)
+
+            data_df = self.make_frame(self.reader(data_file))
+            missing_columns = [column for column in columns if column not in data_df]
+
+            if missing_columns:
+                raise ValueError(f"Columns {', '.join(missing_columns)} are not in {data_file}")
+
+            return pd.DataFrame({column: data_df[column][:num_rows] for column in columns})
+
+        return pd.read_csv(data_file, usecols=columns, nrows=num_rows)
+
+    def is_loaded(self, data_df_id):
+        """Returns True if the given data is in memory (i.e. not still to be
+        read by lazy loading)"""
+        if isinstance(self.data_df_dict, LazyDataDict):
+            return (data_df_id in self.data_df_dict.loaded_df_dict
+                    or data_df_id not in self.data_file_dict)
+
+        return True
+
+    def get_data_files(self, data_df_ids=None):
+        """Returns the files the given data were read from (None if not from file)"""
+        if data_df_ids is None:
+            data_df_ids = self.data_df_dict.keys()
+
+        return [self.data_file_dict.get(data_df_id) for data_df_id in data_df_ids]
+
+    def get_input_files(self, data_df_ids=None):
+        """Returns every file the given data depend on (the files they were
+        read from, unless the data combines several files)"""
+        return self.get_data_files(data_df_ids)
+
+    def get_fingerprint_arguments(self, data_df_ids=None):
+        """Returns the settings of the given data which change what is drawn
+        from its input files (e.g. how they are combined), which are recorded
+        in the fingerprints of its plots: those of the reader, if any (see
+        naptools.chunked.ChunkedReader.get_fingerprint_arguments())."""
+        if self.reader is None:
+            return {}
+
+        get_reader_arguments = getattr(self.reader, "get_fingerprint_arguments", None)
+
+        if get_reader_arguments is None:
+            return {"reader": getattr(self.reader, "__qualname__", type(self.reader).__name__)}
+
+        return {"reader": dict(get_reader_arguments(), type=type(self.reader).__name__)}
+
+    def get_field(self, data_df_id, variable):
+        """Returns the values of a column or derived field (see naptools.fields)
+        of the given data as an array. Each field is computed at most once."""
+        data_df = self.data_df_dict[data_df_id]
+        field_evaluator = self.field_evaluators.get(data_df_id)
+
+        # The evaluator is kept alongside its DataFrame (and replaced with it)
+        if field_evaluator is None or field_evaluator.data_df is not data_df:
+            field_evaluator = self.new_field_evaluator(data_df)
+            self.field_evaluators[data_df_id] = field_evaluator
+
+        return field_evaluator(variable)
+
+    def new_field_evaluator(self, data_df):
+        """Returns an evaluator of the fields of a DataFrame"""
+        from naptools.fields import FieldEvaluator
+
+        return FieldEvaluator(data_df)
+
+    def release(self, data_df_id):
+        """Free the memory held for lazily loaded data once it has been
+        plotted. Data which is not lazily loaded is kept."""
+        if isinstance(self.data_df_dict, LazyDataDict):
+            self.data_df_dict.release(data_df_id)
+            self.field_evaluators.pop(data_df_id, None)
+
+    def get_data_frame(self, data_df_id):
+        """Returns the given data as a DataFrame (built on each call)"""
+        data_df = self.data_df_dict[data_df_id]
+
+        return data_df.to_data_frame() if hasattr(data_df, "to_data_frame") else data_df
 
     def print_data(self, data_df_id):
-        print(self.data_df_dict[data_df_id])
+        print(self.get_data_frame(data_df_id))
 
 
 class BasePlot:
@@ -33,13 +223,35 @@ class BasePlot:
     structure of: __init__(), draw(), output()."""
 
     def __init__(self, data):
+        apply_style()
+
+        # A single DataFrame (such as the result of a probe) or Frame is
+        # plotted as it is
+        if hasattr(data, "columns"):
+            data = BaseData.from_data_frames({"data": data})
+
         self.data = data
+        self.fingerprints = {}
+
+        # Queue of figures to be saved by the writer thread of a frame
+        # pipeline (None when figures are saved where they are drawn)
+        self.write_queue = None
+
+        # Recorded in every figure saved (and its fingerprint), e.g. the
+        # choices made to meet a frame time budget
+        self.output_metadata = {}
+
+        # Parameters which do not change the output (ignored by fingerprints)
+        self.non_output_parameters = {"force", "num_threads", "prefetch_frames"}
 
         # Default plotting parameters (alphabetical order)
         self.parameters = {
             "drop": [],
+            "force": False,
             "grid": False,
             "log-log": False,
+            "num_threads": 1,
+            "prefetch_frames": 2,
             "semilog-x": False,
             "semilog-y": False,
             "suppress_legend": False,
@@ -51,40 +263,277 @@ class BasePlot:
         """Plot the given independent and dependent variables"""
         self.parameters.update(parameters)
         self.output_filename = output_filename
-        self.fig, self.axs = plt.subplots()
 
-        for data_file, data_df in self.data.data_df_dict.items():
-            data_df.plot(independent_vars, dependent_vars, ax=self.axs)
+        if self.is_up_to_date(output_filename,
+                              self.data.get_input_files(),
+                              {"independent_vars": independent_vars,
+                               "dependent_vars": dependent_vars}):
+            return
+
+        self.fig, self.axs = self.new_figure()
+        self.draw(self.axs, independent_vars, dependent_vars)
+        self.output(self.fig, self.axs, self.output_filename)
+
+    def draw(self, axs, independent_vars, dependent_vars):
+        """Draw the dependent variables of every data file on the given axes"""
+        if type(dependent_vars) is str:
+            dependent_vars = [dependent_vars]
+
+        with self.span("lines"):
+            for data_file, data_df in self.data.data_df_dict.items():
+                for dependent_var in dependent_vars:
+                    axs.plot(self.data.get_field(data_file, independent_vars),
+                             self.data.get_field(data_file, dependent_var),
+                             label=dependent_var)
+
+    def new_figure(self):
+        """Returns a new figure and axes. The figure has its own Agg canvas and
+        is not registered with pyplot, so figures can be created and saved
+        from several threads at once and are freed once no longer used."""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-        self.output()
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        axs = fig.add_subplot()
 
-    def output(self):
+        return fig, axs
+
+    def output(self, fig, axs, output_filename):
         """Format and output plot to file"""
-        plt.xlabel(self.parameters["x_label"])
-        plt.ylabel(self.parameters["y_label"])
-        
-        self.resolve_parameters()
-        # self.fig.tight_layout() #INCLUDED IN SAVEFIG BELOW
-
-        os.makedirs(os.path.dirname(self.output_filename), exist_ok=True)
-        plt.savefig(self.output_filename, bbox_inches="tight")
-        plt.close()
-        print(f"Results plotted as: {self.output_filename}")
-
-    def resolve_parameters(self):
+        self.format_axes(axs)
+        self.save(fig, output_filename)
+
+    def format_axes(self, axs):
+        """Label the axes and apply the parameters (grid, scales, legend)"""
+        axs.set_xlabel(self.parameters["x_label"])
+        axs.set_ylabel(self.parameters["y_label"])
+
+        self.resolve_parameters(axs)
+
+    def save(self, fig, output_filename):
+        """Save the figure and record the fingerprint of the output. Within a
+        frame pipeline the figure is passed to the writer thread instead."""
+        if self.write_queue is not None:
+            self.write_queue.put((fig, output_filename))
+        else:
+            self.write_figure(fig, output_filename)
+
+    def write_figure(self, fig, output_filename):
+        """Encode and write the figure to every target of the output (see
+        naptools.outputs) and record the fingerprint of its files"""
+        output = outputs.get_output(output_filename)
+
+        # fig.tight_layout() #INCLUDED IN SAVEFIG BELOW
+        with self.span("save", output=str(output)):
+            output.save(fig, self.output_metadata)
+
+        logger.info("Results plotted as: %s", output)
+
+        output_fingerprint = self.fingerprints.pop(str(output), None)
+
+        if output_fingerprint is not None:
+            if self.output_metadata:
+                output_fingerprint = dict(output_fingerprint, metadata=self.output_metadata)
+
+            for filename in output.get_filenames():
+                fingerprint.record_fingerprint(filename, output_fingerprint)
+
+    def is_up_to_date(self, output_filename, input_files, arguments, data_df_ids=None):
+        """Returns True if the output files exist and their recorded fingerprint
+        (input files, arguments, parameters, version and style) is unchanged.
+        The settings of the given data (by default all of it, see
+        BaseData.get_fingerprint_arguments()) are among the arguments. Otherwise the new fingerprint is kept to be
+        recorded once the output is written. Outputs to sinks other than files
+        are never up to date."""
+        output = outputs.get_output(output_filename)
+        data_arguments = self.get_fingerprint_arguments(data_df_ids)
+
+        if data_arguments:
+            arguments = dict(arguments, data=data_arguments)
+
+        previous_fingerprints = [fingerprint.read_fingerprint(filename) if os.path.exists(filename) else None
+                                 for filename in output.get_filenames()]
+        previous_fingerprint = previous_fingerprints[0] if previous_fingerprints else None
+
+        output_fingerprint = fingerprint.compute_fingerprint(
+            input_files,
+            {key: value for key, value in self.parameters.items()
+             if key not in self.non_output_parameters},
+            dict(arguments, plot=type(self).__name__),
+            naptools.__version__,
+            naptools_dir_path + "/naptools_default.mplstyle",
+            previous=previous_fingerprint,
+        )
+        self.fingerprints[str(output)] = output_fingerprint
+
+        if (self.parameters["force"]
+                or output_fingerprint is None
+                or output.has_sinks()
+                or not previous_fingerprints
+                or not all(previous_fingerprint is not None
+                           and fingerprint.matches(output_fingerprint, previous_fingerprint)
+                           for previous_fingerprint in previous_fingerprints)):
+            return False
+
+        logger.info("Results up to date: %s", output)
+        return True
+
+    def span(self, stage, **attributes):
+        """Returns a context manager timing a stage of this plot (a no-op
+        unless instrumentation is enabled)"""
+        return instrumentation.span(stage, plot=type(self).__name__, **attributes)
+
+    def get_frame_filename(self, timestamp):
+        """Returns the output (filename) of a single frame of a series"""
+        return self.series_output.with_suffix("_" + timestamp)
+
+    def get_stale_timestamps(self, arguments, timestamps, shared_inputs=False, all_timestamps=None):
+        """Returns the timestamps whose frames are not up to date. With shared
+        inputs (e.g. global colour limits) every frame depends on the files of
+        the whole series (all_timestamps, by default the given timestamps)."""
+        stale_timestamps = []
+
+        if all_timestamps is None:
+            all_timestamps = timestamps
+
+        for timestamp in timestamps:
+            frame_timestamps = list(all_timestamps) if shared_inputs else [timestamp]
+
+            if not self.is_up_to_date(self.get_frame_filename(timestamp),
+                                      self.get_input_files(frame_timestamps),
+                                      dict(arguments, timestamps=frame_timestamps),
+                                      frame_timestamps):
+                stale_timestamps.append(timestamp)
+
+        return stale_timestamps
+
+    def get_input_files(self, timestamps):
+        """Returns the data files a frame drawn from the given timestamps reads"""
+        return self.data.get_input_files(timestamps)
+
+    def get_fingerprint_arguments(self, timestamps):
+        """Returns the settings of the data a frame drawn from the given
+        timestamps reads (see BaseData.get_fingerprint_arguments())"""
+        return self.data.get_fingerprint_arguments(timestamps)
+
+    def plot_frames(self, plot_frame, timestamps, prefetch_frame=None, release_frame=None):
+        """Call plot_frame for each timestamp of a series. With more than one
+        thread the frames are drawn and saved concurrently. Otherwise, unless
+        the "prefetch_frames" parameter is 0, the frames are drawn in order by
+        a pipeline which reads ahead and saves in the background."""
+        def timed_plot_frame(timestamp):
+            with self.span("frame", timestamp=timestamp):
+                plot_frame(timestamp)
+
+        if self.parameters["num_threads"] > 1 and len(timestamps) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=self.parameters["num_threads"]) as executor:
+                # Consume the results so that any exceptions are raised here
+                list(executor.map(timed_plot_frame, timestamps))
+
+        elif self.parameters["prefetch_frames"] > 0 and len(timestamps) > 1:
+            self.pipeline_frames(timed_plot_frame, timestamps, prefetch_frame, release_frame)
+
+        else:
+            for timestamp in timestamps:
+                timed_plot_frame(timestamp)
+
+    def pipeline_frames(self, plot_frame, timestamps, prefetch_frame=None, release_frame=None):
+        """Draw the frames in order while a reader thread prefetches (reads and
+        parses) the data of the next frames and a writer thread encodes and
+        writes the figures of the previous ones. Both queues hold at most
+        "prefetch_frames" frames, so only a few frames are in memory at once.
+        Once drawn, a frame is released with release_frame(timestamp)."""
+        import queue
+        import threading
+
+        queue_size = self.parameters["prefetch_frames"]
+        prefetched = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        write_errors = []
+
+        def read():
+            for timestamp in timestamps:
+                try:
+                    if prefetch_frame is not None:
+                        with self.span("prefetch", timestamp=timestamp):
+                            prefetch_frame(timestamp)
+                    error = None
+                except Exception as exception:
+                    error = exception
+
+                # Stop reading ahead if the frames are no longer being drawn
+                while not stop.is_set():
+                    try:
+                        prefetched.put((timestamp, error), timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+
+                if error is not None or stop.is_set():
+                    return
+
+        def write():
+            while True:
+                item = self.write_queue.get()
+
+                if item is None:
+                    return
+
+                # After an error keep emptying the queue so drawing is not blocked
+                if not write_errors:
+                    try:
+                        self.write_figure(*item)
+                    except Exception as exception:
+                        write_errors.append(exception)
+
+        reader = threading.Thread(target=read, name="naptools-reader", daemon=True)
+        writer = threading.Thread(target=write, name="naptools-writer", daemon=True)
+        reader.start()
+        writer.start()
+
+        try:
+            for _ in timestamps:
+                timestamp, error = prefetched.get()
+
+                if error is not None:
+                    raise error
+
+                if write_errors:
+                    break
+
+                plot_frame(timestamp)
+
+                if release_frame is not None:
+                    release_frame(timestamp)
+
+        finally:
+            stop.set()
+            self.write_queue.put(None)
+            writer.join()
+            reader.join()
+            self.write_queue = None
+
+        if write_errors:
+            raise write_errors[0]
+
+    def resolve_parameters(self, axs):
         """Act on parameter values to modify plot appearance"""
         if self.parameters["grid"]:
-            plt.grid(which="both", color="#cfcfcf")
+            axs.grid(which="both", color="#cfcfcf")
 
         if self.parameters["log-log"]:
-            plt.xscale("log")
-            plt.yscale("log")
+            axs.set_xscale("log")
+            axs.set_yscale("log")
 
         if self.parameters["semilog-x"]:
-            plt.xscale("log")
+            axs.set_xscale("log")
 
         if self.parameters["semilog-y"]:
-            plt.yscale("log")
+            axs.set_yscale("log")
 
         if not self.parameters["suppress_legend"]:
-            plt.legend()
+            axs.legend()
@@ -1,52 +1,562 @@
+import math
+import threading
+import time
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import cm, ticker
-from mpl_toolkits.axes_grid1 import make_axes_locatable
-from naptools import BaseData, BasePlot, ContourPlot
-import os
+from naptools import BaseData, BasePlot, colour_bar, outputs, shards
+from naptools.colour_bar import ColourScale
+from naptools.fields import FieldEvaluator
+from naptools.frame import Frame
+from naptools.preview import assemble_grid, colour_images, get_grid_shape, get_pixel_points
+from naptools.probes import Probe
+from naptools.spatial_index import UniformGrid
+
+# The parameters lowered to meet a frame time budget
+QUALITY_PARAMETERS = ["arrow_sparsity", "decimation", "dpi", "num_colour_levels", "num_contours"]
+
+
+def get_mask(triangulation, mask_conditions):
+    """Returns the mask of the triangles whose barycentre does not meet the
+    mask conditions (an expression in x and y, e.g. "x**2 + y**2 < 1.0")"""
+    # The x and y variables defined here are the coordinates that should
+    # be refered to in the mask conditions
+    x = np.asarray(triangulation.x)[triangulation.triangles].mean(axis=1)
+    y = np.asarray(triangulation.y)[triangulation.triangles].mean(axis=1)
+
+    return np.where(eval(mask_conditions), 0, 1)
 
 
 class Data2D(BaseData):
     """Class for holding and performing operations on two-dimensional data"""
-    def __init__(self, data_file_dict):
-        super().__init__(data_file_dict)
+    def __init__(self, data_file_dict=None, lazy=False, reader=None):
+        super().__init__(data_file_dict, lazy=lazy, reader=reader)
+        self.triangulation_cache = TriangulationCache()
+
+    def add_frame(self, timestamp, coords, fields=None):
+        """Add (or replace) the data of a timestamp held in memory, e.g. from a
+        running simulation. Either coords is a DataFrame (or Frame) with the
+        "Points:0" and "Points:1" columns, or the nodes' coordinates as an
+        (N, 2) or (N, 3) array (or a sequence of x, y and z arrays) and fields a
+        DataFrame or dictionary of arrays, in which an (N, k) array gives the
+        columns "name:0", ..., "name:k-1". Contiguous float arrays are not
+        copied, so they should not be changed in place while the frame is
+        still used (the coordinates are copied, see Frame)."""
+        if fields is None:
+            return super().add_frame(timestamp, coords)
+
+        columns = {}
+
+        for name, values in dict(fields).items():
+            values = np.asarray(values)
+
+            if values.ndim == 1:
+                columns[name] = values
+            else:
+                for index in range(values.shape[1]):
+                    columns[f"{name}:{index}"] = values[:, index]
+
+        # The coordinates come after the fields, as in the csv files
+        # exported by paraview
+        if isinstance(coords, np.ndarray) and coords.ndim == 2:
+            coords = [coords[:, index] for index in range(coords.shape[1])]
+
+        for index, values in enumerate(coords):
+            columns[f"Points:{index}"] = np.asarray(values)
+
+        super().add_frame(timestamp, Frame.from_columns(columns))
+
+    def new_field_evaluator(self, data_df):
+        """Returns an evaluator of the fields of a frame, including those
+        computed on the mesh (gradients, vorticity, ...)"""
+        return FieldEvaluator(data_df, lambda: self.get_triangulation(data_df))
+
+    def get_coordinates(self, data_df):
+        """Returns the x and y coordinates of the nodes of a frame, as
+        contiguous views of its coordinates"""
+        # Check in the csv file that paraview labels your x and y
+        # coordinates "Points:0" and "Points:1"
+        return data_df.coordinates[:, 0], data_df.coordinates[:, 1]
+
+    def get_triangles(self, data_df):
+        """Returns the triangles of the mesh of a frame, or None for the
+        Delaunay triangulation of its nodes"""
+        return None
+
+    def get_triangulation(self, data_df, mask_conditions=None):
+        """Returns the triangulation of the nodes of a frame, shared by all
+        frames on the same mesh, with the triangles outside mask_conditions
+        (if given, as for the "mask_conditions" parameter) masked"""
+        import matplotlib.tri as tri
+
+        x, y = self.get_coordinates(data_df)
+        triangulation = self.triangulation_cache.get(x, y, None,
+                                                     lambda: tri.Triangulation(x, y, self.get_triangles(data_df)))
+
+        if mask_conditions is None:
+            return triangulation
+
+        def mask_triangulation():
+            masked_triangulation = tri.Triangulation(x, y, triangulation.triangles)
+            masked_triangulation.set_mask(get_mask(masked_triangulation, mask_conditions))
+
+            return masked_triangulation
+
+        return self.triangulation_cache.get(x, y, ("masked", mask_conditions), mask_triangulation)
+
+    def get_probe(self, data_df, points, mask_conditions=None):
+        """Returns the probe of the (x, y) points on the mesh of a frame (with
+        the triangles outside mask_conditions masked), located once for each
+        mesh, mask and set of points"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x, y = self.get_coordinates(data_df)
+
+        return self.triangulation_cache.get(x, y, ("probe", points.tobytes(), mask_conditions),
+                                            lambda: Probe(self.get_triangulation(data_df, mask_conditions), points))
+
+    def probe(self, timestamp, variables, points, mask_conditions=None):
+        """Returns a DataFrame of the variables (columns or derived fields) at
+        the given timestamp, interpolated at the (x, y) points, whose
+        coordinates are the columns "x" and "y" (NaN outside the mesh, or
+        outside mask_conditions as for the plots with the same parameter)"""
+        import pandas as pd
+
+        if type(variables) is str:
+            variables = [variables]
+
+        probe = self.get_probe(self.data_df_dict[timestamp], points, mask_conditions)
+        probe_df = pd.DataFrame({"x": probe.x, "y": probe.y})
+
+        for variable in variables:
+            probe_df[variable] = probe(self.get_field(timestamp, variable))
+
+        return probe_df
+
+    def probe_line(self, timestamp, variables, start, end, num_points=100, mask_conditions=None):
+        """Returns a DataFrame of the variables at evenly spaced points on the
+        line from start to end, as for probe(), with the column "distance"
+        along the line"""
+        probe_df = self.probe(timestamp, variables, np.linspace(start, end, num_points), mask_conditions)
+        probe_df.insert(0, "distance", np.hypot(probe_df["x"] - start[0], probe_df["y"] - start[1]))
+
+        return probe_df
+
+    def get_time_history(self, variables, points, timestamps=None, num_threads=None, mask_conditions=None):
+        """Returns a DataFrame of the variables at the (x, y) points for each
+        timestamp (the index), with a column for each variable and point and
+        the column "time" (the timestamp as a number, or its position).
+
+        All timestamps are taken to share the mesh of the first, so the points
+        are located and weighted once. For data not yet read (lazy loading)
+        only the columns and leading rows holding the nodes around the points
+        are read, from num_threads files at a time (by default one per CPU).
+        Points outside the mesh, or outside mask_conditions, give NaN."""
+        import pandas as pd
+        from concurrent.futures import ThreadPoolExecutor
+
+        if type(variables) is str:
+            variables = [variables]
+
+        if timestamps is None:
+            timestamps = list(self.data_df_dict.keys())
+
+        probe = self.get_probe(self.data_df_dict[timestamps[0]], points, mask_conditions)
+
+        # Only the nodes of the triangles containing the points are needed
+        nodes = np.unique(probe.weights.indices)
+        weights = probe.weights[:, nodes]
+
+        def read_frame(timestamp):
+            if self.is_loaded(timestamp):
+                frame_values = [self.get_field(timestamp, variable)[nodes] for variable in variables]
+
+            else:
+                try:
+                    data_df = self.read_data_columns(self.data_file_dict[timestamp], variables,
+                                                     num_rows=nodes[-1] + 1 if len(nodes) else 0)
+                    frame_values = [data_df[variable].to_numpy()[nodes] for variable in variables]
+
+                except ValueError:
+                    # Derived fields are evaluated on the whole frame, which
+                    # is then released again
+                    frame_values = [self.get_field(timestamp, variable)[nodes] for variable in variables]
+                    self.release(timestamp)
+
+            return [weights @ np.asarray(values, dtype=float) for values in frame_values]
+
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            history = np.array(list(executor.map(read_frame, timestamps)))
+
+        # Points outside the mesh give NaN
+        history[:, :, ~probe.inside] = np.nan
+
+        try:
+            times = [float(timestamp) for timestamp in timestamps]
+        except (TypeError, ValueError):
+            times = list(range(len(timestamps)))
+
+        history_df = pd.DataFrame({"time": times}, index=list(timestamps))
+
+        for variable_index, variable in enumerate(variables):
+            for point_index, (x, y) in enumerate(zip(probe.x, probe.y)):
+                history_df[f"{variable} ({x:g}, {y:g})"] = history[:, variable_index, point_index]
+
+        return history_df
+
+    def compare(self, other_data, mode="difference", pairs=None, floor=None):
+        """Returns the comparison of this data with another (the difference,
+        relative error or ratio of their fields), see ComparisonData"""
+        from naptools.comparison import ComparisonData
+
+        return ComparisonData(self, other_data, mode, pairs, floor)
+
+    def interpolate_in_time(self, frames_per_interval=1, times=None, timestamps=None, snapshot_times=None):
+        """Returns frames interpolated in time between the timestamps of this
+        data, see InterpolatedData"""
+        from naptools.temporal import InterpolatedData
+
+        return InterpolatedData(self, frames_per_interval, times, timestamps, snapshot_times)
+
+    def get_data_limits(self, variable, timestamps=None, select_nodes=None):
+        """Returns an array containing the min and max of each data file (or
+        only of the given timestamps). If given, select_nodes(x, y) returns the
+        indices of the only nodes to include (e.g. those of a region)."""
+        data_limits_dict = {}
+
+        if timestamps is None:
+            timestamps = list(self.data_df_dict.keys())
+
+        for df_timestamp in timestamps:
+            # The limits of a column read in chunks were found while reading it
+            stats = self.get_column_stats(df_timestamp, variable) if select_nodes is None else None
+
+            if stats is not None:
+                data_limits_dict[df_timestamp] = [stats["min"], stats["max"]]
+                continue
+
+            values = self.get_field(df_timestamp, variable)
+
+            if select_nodes is not None:
+                values = values[select_nodes(*self.get_coordinates(self.data_df_dict[df_timestamp]))]
+
+            data_limits_dict[df_timestamp] = [np.nanmin(values), np.nanmax(values)]
+
+        return data_limits_dict
+
+    def get_column_stats(self, data_df_id, variable):
+        """Returns the statistics of a column of the given data found while
+        reading it (see naptools.chunked), or None"""
+        data_df = self.data_df_dict[data_df_id]
+
+        if variable not in data_df:
+            return None
 
-    def get_data_limits(self, variable):
-        """Returns an array containing the min and max of each data file"""
-        data_limits = np.zeros((len(self.data_df_dict), 2))
-        i = 0
+        return data_df.attrs.get("stats", {}).get(variable)
 
-        if "magnitude" in variable:
-            for df in self.data_df_dict.values():
-                df_magnitudes = np.sqrt(df.iloc[:, 0]**2 + df.iloc[:, 1]**2 + df.iloc[:, 2]**2)
-                data_limits[i] = [df_magnitudes.min(), df_magnitudes.max()]
-                i += 1
 
+class TriangulationCache:
+    """(Masked) triangulations of the meshes seen so far. A mesh with the same
+    coordinates and mask conditions as a cached one (e.g. the same mesh at
+    another timestamp, or in another panel) reuses its triangulation."""
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def get(self, x, y, key, build):
+        """Returns the triangulation(s) (or other mesh data, such as a spatial
+        index) of the coordinates with the given key (e.g. mask conditions),
+        calling build() if they are not cached"""
+        with self.lock:
+            for cached_x, cached_y, cached_key, triangulations in self.entries:
+                if (cached_key == key
+                        and np.array_equal(cached_x, x)
+                        and np.array_equal(cached_y, y)):
+                    return triangulations
+
+        triangulations = build()
+
+        # Only the most recent meshes are kept, in case the mesh changes
+        # between timestamps
+        with self.lock:
+            self.entries.append((x, y, key, triangulations))
+            del self.entries[:-self.max_size]
+
+        return triangulations
+
+
+class FrameContext:
+    """Everything the layers of a single frame draw from: the coordinates,
+    triangulation and mask, fields and colour scale. Each item is prepared on
+    first use only and then shared by all layers of the frame. With a region
+    of interest only the nodes in the region (and its halo) are drawn, and
+    with a decimation of n only every n-th of those."""
+    def __init__(self, plot, timestamp, colour_scale=None, triangulations=None):
+        self.plot = plot
+        self.timestamp = timestamp
+        self.colour_scale = colour_scale
+        self.data_df = plot.data.data_df_dict[timestamp]
+        self.triangulations = triangulations
+        self.fields = {}
+
+        self.x, self.y = plot.data.get_coordinates(self.data_df)
+
+        decimation = plot.parameters["decimation"]
+
+        if plot.parameters["region"] is None and decimation == 1:
+            self.nodes = None
         else:
-            for df in self.data_df_dict.values():
-                data_limits[i] = [df[variable].min(), df[variable].max()]
-                i += 1
+            if plot.parameters["region"] is None:
+                self.nodes = np.arange(len(self.x))
+            else:
+                with plot.span("region", timestamp=timestamp):
+                    self.nodes = plot.get_region_nodes(self.x, self.y)
 
-        return data_limits
+            self.nodes = self.nodes[::decimation]
+            self.x = self.x[self.nodes]
+            self.y = self.y[self.nodes]
+
+    def get_field(self, variable):
+        """Returns the values of a column or derived field at the mesh nodes
+        (computed once per frame, also for the data limits)"""
+        values = self.plot.data.get_field(self.timestamp, variable)
+
+        if self.nodes is None:
+            return values
+
+        if variable not in self.fields:
+            self.fields[variable] = values[self.nodes]
+
+        return self.fields[variable]
+
+    def get_vector_field(self, variable):
+        """Returns the first two components of a vector variable (e.g. "u"
+        or "u:0" both give the columns "u:0" and "u:1")"""
+        raw_var = variable.split(":")[0]
+
+        return self.get_field(raw_var + ":0"), self.get_field(raw_var + ":1")
+
+    def get_triangulations(self):
+        """Returns the masked and the unmasked triangulation of the mesh"""
+        if self.triangulations is None:
+            with self.plot.span("triangulate/mask", timestamp=self.timestamp):
+                self.triangulations = self.plot.triangulation_cache.get(
+                    self.x, self.y, ("mask", self.plot.parameters["mask_conditions"]), self.triangulate
+                )
+
+        return self.triangulations
+
+    def triangulate(self):
+        """Returns the masked triangulation of the mesh and an unmasked one
+        with the same triangles"""
+        import matplotlib.tri as tri
+
+        # When all of its nodes are drawn the mesh is triangulated by the
+        # data (once, also for the derived fields computed on it), and the
+        # contour lines cover the whole (unmasked) triangulation
+        if self.nodes is None:
+            line_triangulation = self.plot.data.get_triangulation(self.data_df)
+            triangulation = self.plot.generate_mask([self.x, self.y], self.plot.parameters["mask_conditions"],
+                                                    line_triangulation.triangles)
+
+            return triangulation, line_triangulation
+
+        # Otherwise the nodes drawn are triangulated, and the triangles are
+        # reused rather than triangulating the points again
+        triangulation = self.plot.generate_mask([self.x, self.y], self.plot.parameters["mask_conditions"])
+
+        return triangulation, tri.Triangulation(self.x, self.y, triangulation.triangles)
+
+    @property
+    def triangulation(self):
+        return self.get_triangulations()[0]
+
+    @property
+    def line_triangulation(self):
+        return self.get_triangulations()[1]
+
+
+class FillLayer:
+    """Filled contours of the variable, coloured by the colour scale"""
+    stage = "fill"
+    coloured = True
+
+    def draw(self, axs, context, variable, parameters):
+        colour_scale = context.colour_scale
+
+        # Note: depending on your data, you may want to choose a different
+        # norm and set logarithmic = False in the above. There are norms
+        # that work for diverging colour schemes which have a central
+        # value (i.e. positive and negative data) and if you don't want a
+        # logarithmic scale you don't need to supply a norm here (I think).
+        #
+        # The tricontour works well for point datasets of the form
+        # (x, y, z), so this should be a good choice for unstructured
+        # meshes where meshgrid and the usual contour functions in python
+        # can't be applied. It works by defining a triangulation from
+        # (x, y) then interpolating z.
+        contour = axs.tricontourf(
+            context.triangulation,
+            context.get_field(variable),
+            colour_scale.colour_levels,
+            norm=colour_scale.norm,
+            cmap=colour_scale.colour_map,
+        )
+
+        # Remove the lines between filled regions (we want to add our own):
+        for c in axs.collections:
+            c.set_edgecolor("face")
+
+        return contour
+
+
+class IsolineLayer:
+    """Thick and thin contour lines of the variable at the colour scale's
+    contour levels"""
+    stage = "lines"
+    coloured = True
+
+    def draw(self, axs, context, variable, parameters):
+        # Add in the contour lines (play with the alpha and colour values
+        # to get it to look good)
+        axs.tricontour(
+            context.line_triangulation,
+            context.get_field(variable),
+            context.colour_scale.thick_contour_levels,
+            alpha=0.5,
+            colors=["1."],
+            linewidths=[parameters["thick_contour_line_thickness"]],
+        )
+        axs.tricontour(
+            context.line_triangulation,
+            context.get_field(variable),
+            context.colour_scale.contour_levels,
+            alpha=0.15,
+            colors=["1."],
+            linewidths=[parameters["thin_contour_line_thickness"]],
+        )
+
+
+class QuiverLayer:
+    """Arrows of the vector variable at every arrow_sparsity-th node, coloured
+    by their length (within the colour scale limits, if there is one)"""
+    stage = "quiver"
+    coloured = False
+
+    def draw(self, axs, context, variable, parameters):
+        from matplotlib import colors
+
+        sparsity = parameters["arrow_sparsity"]
+        u, v = context.get_vector_field(variable)
+        u = u[::sparsity]
+        v = v[::sparsity]
+
+        if context.colour_scale is not None:
+            norm = colors.Normalize(vmin=context.colour_scale.colour_bar_min,
+                                    vmax=context.colour_scale.colour_bar_max)
+        else:
+            norm = None
+
+        return axs.quiver(
+            context.x[::sparsity],
+            context.y[::sparsity],
+            u,
+            v,
+            np.hypot(u, v),
+            width=parameters["arrow_width_scale"],
+            scale=parameters["arrow_inverse_scale"],
+            cmap=parameters["arrow_colour_map"] or parameters["colour_map"],
+            norm=norm,
+        )
+
+
+class StreamlineLayer:
+    """Streamlines of the vector variable, interpolated from the mesh onto a
+    regular grid of streamline_resolution points in each direction"""
+    stage = "streamlines"
+    coloured = False
+
+    def draw(self, axs, context, variable, parameters):
+        import matplotlib.tri as tri
+
+        resolution = parameters["streamline_resolution"]
+        grid_x, grid_y = np.meshgrid(np.linspace(context.x.min(), context.x.max(), resolution),
+                                     np.linspace(context.y.min(), context.y.max(), resolution))
+
+        # Points outside the (masked) mesh are masked, which ends the lines
+        u, v = context.get_vector_field(variable)
+        grid_u = tri.LinearTriInterpolator(context.triangulation, u)(grid_x, grid_y)
+        grid_v = tri.LinearTriInterpolator(context.triangulation, v)(grid_x, grid_y)
+
+        return axs.streamplot(
+            grid_x,
+            grid_y,
+            grid_u,
+            grid_v,
+            color=np.ma.hypot(grid_u, grid_v).filled(np.nan),
+            density=parameters["streamline_density"],
+            linewidth=parameters["streamline_thickness"],
+            cmap=parameters["arrow_colour_map"] or parameters["colour_map"],
+        )
+
+
+# Layers which can be listed in the "layers" parameter, in drawing order
+layer_types = {
+    "fill": FillLayer,
+    "isolines": IsolineLayer,
+    "quiver": QuiverLayer,
+    "streamlines": StreamlineLayer,
+}
 
 
 class Plot2D(BasePlot):
-    """Class for creating two-dimensional plots"""
+    """Class for creating two-dimensional plots of point data on unstructured
+    meshes, made up of the layers given by the "layers" parameter. The
+    preparation shared by the layers (triangulation, mask, fields, colour
+    scale) is done once per frame, see FrameContext."""
     def __init__(self, data):
         super().__init__(data)
+        self.colour_scales = {}
+
+        # Meshes are triangulated once for the data and its plots
+        self.triangulation_cache = getattr(self.data, "triangulation_cache", None) or TriangulationCache()
+        self.non_output_parameters |= {"num_shards", "shard", "stats_file"}
         self.set_plotting_parameters()
 
     def set_plotting_parameters(self):
-        """Set the default stream plot parameters"""
+        """Set the default two-dimensional plot parameters"""
+        from matplotlib import cm
+
         # Default parameters (alphabetical order)
+        self.parameters["arrow_colour_map"] = None  # Defaults to colour_map
+        self.parameters["arrow_inverse_scale"] = None
+        self.parameters["arrow_sparsity"] = 1
+        self.parameters["arrow_width_scale"] = None
         self.parameters["colour_bar_font_size"] = 0.75 * 32  # Should be 0.75 * font_size
         self.parameters["colour_bar_format"] = ".5f"
         self.parameters["colour_bar_location"] = "right"
         self.parameters["colour_map"] = cm.plasma
         self.parameters["colour_range"] = 1.0
+        self.parameters["decimation"] = 1  # Only every n-th node is drawn
+        self.parameters["dpi"] = None  # Defaults to the style's figure.dpi
+        self.parameters["frame_time_budget"] = None  # Seconds per frame
         self.parameters["individual_colour_bar"] = True
+        self.parameters["layers"] = []
+        self.parameters["mask_conditions"] = None
+        self.parameters["num_colour_levels"] = 200
+        self.parameters["num_contours"] = 100
+        self.parameters["num_shards"] = 1
+        self.parameters["num_thin_lines"] = 5
+        self.parameters["region"] = None  # (x_min, x_max, y_min, y_max) or polygon vertices
+        self.parameters["region_halo"] = 0.1
         self.parameters["separate_colour_bar"] = False
+        self.parameters["shard"] = 0
+        self.parameters["stats_file"] = None  # Defaults to <output>_stats.json when sharded
+        self.parameters["streamline_density"] = 1.0
+        self.parameters["streamline_resolution"] = 100
+        self.parameters["streamline_thickness"] = 1.0
         self.parameters["suppress_legend"] = True
+        self.parameters["symlognorm_linear_width"] = 1.0
+        self.parameters["thick_contour_line_thickness"] = 1.0
+        self.parameters["thin_contour_line_thickness"] = 1.0
         self.parameters["x_label"] = "$x$"
         self.parameters["y_label"] = "$y$"
 
@@ -55,134 +565,530 @@ class Plot2D(BasePlot):
         self.parameters["font_size"] = 32
         self.parameters["figure_height"] = 6.0
         self.parameters["figure_width"] = 6.0
-        
-    # SINGLE PLOT FUNCTION AND THEN DO DIFFERENT THINGS DEPENDING ON CLASS INSTANCE?
-        
+
+    def get_layers(self):
+        """Returns the layers to draw, in order"""
+        return [layer_types[layer]() for layer in self.parameters["layers"]]
+
+    def is_coloured(self):
+        """Returns True if any layer is coloured by the colour scale (so the
+        plot needs data limits and a colour bar)"""
+        return any(layer_types[layer].coloured for layer in self.parameters["layers"])
+
+    def get_region(self):
+        """Returns the bounding box (x_min, x_max, y_min, y_max) of the region
+        of interest and its polygon (None if the region is a box)"""
+        region = np.asarray(self.parameters["region"], dtype=float)
+
+        if region.ndim == 1:
+            return tuple(region), None
+
+        return (region[:, 0].min(), region[:, 0].max(), region[:, 1].min(), region[:, 1].max()), region
+
+    def get_region_nodes(self, x, y, halo=True):
+        """Returns the indices of the nodes in the region of interest and, to
+        draw, its halo (a fraction region_halo of the region's size, so that
+        contours run on to the edges of the region). The nodes are found from
+        a spatial index of the mesh, both of which are cached."""
+        from matplotlib.path import Path
+
+        (x_min, x_max, y_min, y_max), polygon = self.get_region()
+
+        if halo:
+            halo = self.parameters["region_halo"] * max(x_max - x_min, y_max - y_min)
+
+        def select_nodes():
+            grid = self.triangulation_cache.get(x, y, "spatial index", lambda: UniformGrid(x, y))
+            nodes = grid.query(x_min - halo, x_max + halo, y_min - halo, y_max + halo)
+
+            # Without a halo only the nodes inside the polygon itself are kept
+            if polygon is not None and not halo:
+                nodes = nodes[Path(polygon).contains_points(np.column_stack([x[nodes], y[nodes]]))]
+
+            return nodes
+
+        region_key = ("region", str(self.parameters["region"]), halo)
+
+        return self.triangulation_cache.get(x, y, region_key, select_nodes)
+
+    def clip_to_region(self, axs):
+        """Limit the axes to the region of interest, clipping what is drawn
+        to its polygon (if it is one)"""
+        from matplotlib.patches import Polygon
+
+        (x_min, x_max, y_min, y_max), polygon = self.get_region()
+        axs.set_xlim(x_min, x_max)
+        axs.set_ylim(y_min, y_max)
+
+        if polygon is not None:
+            clip_path = Polygon(polygon, closed=True, transform=axs.transData)
+
+            for artist in [*axs.collections, *axs.patches, *axs.lines]:
+                artist.set_clip_path(clip_path)
+
+    def get_data_limits(self, variable, timestamps):
+        """Returns the data limits of each timestamp (within the region of
+        interest, if there is one)"""
+        if self.parameters["region"] is None:
+            return self.data.get_data_limits(variable, timestamps)
+
+        return self.data.get_data_limits(variable, timestamps,
+                                         select_nodes=lambda x, y: self.get_region_nodes(x, y, halo=False))
+
+    def generate_mask(self, plotting_data, mask_conditions, triangles=None):
+        """Generate a mask for plotting data from non-convex domains"""
+        import matplotlib.tri as tri
+
+        # Create triangulation from data (unless its triangles are given)
+        triangulation = tri.Triangulation(plotting_data[0], plotting_data[1], triangles)
+
+        # The mask includes triangles or not based on their barycentre
+        if mask_conditions is not None:
+            triangulation.set_mask(get_mask(triangulation, mask_conditions))
+
+        return triangulation
+
+    def compute_levels(self, num_levels, colour_bar_min, colour_bar_max, logarithmic=False):
+        """Return an array of values scaled evenly (or logarithmically)"""
+
+        if logarithmic:
+            lev_exp = np.linspace(
+                np.log(colour_bar_min), np.log(colour_bar_max), num_levels
+            )
+            return np.power(np.exp(1), lev_exp)
+        else:
+            return np.linspace(colour_bar_min, colour_bar_max, num_levels)
+
+    def get_colour_limits(self, data_limits):
+        """Returns the colour bar limits and the norm limits (vmin, vmax) for
+        the given data limits"""
+        # The multiplication makes sure the limits show correctly
+        colour_bar_min = data_limits[0] * (1.0 - 1.0e-10)
+        colour_bar_max = data_limits[1] * (1.0 + 1.0e-10)
+        colour_bar_mid = 0.5 * (colour_bar_min + colour_bar_max)
+        vmin = colour_bar_mid - self.parameters["colour_range"] * (colour_bar_mid - colour_bar_min)
+        vmax = colour_bar_mid - self.parameters["colour_range"] * (colour_bar_mid - colour_bar_max)
+
+        return colour_bar_min, colour_bar_max, vmin, vmax
+
+    def get_frame_data_limits(self, timestamp):
+        """Returns the data limits used for colouring the given timestamp"""
+        # Default behaviour is to use the entire set of data for the colouring
+        if self.parameters["individual_colour_bar"]:
+            return self.data_limits[timestamp]
+        else:
+            return [self.total_data_min, self.total_data_max]
+
+    def get_colour_scale(self, data_limits):
+        """Returns the colour scale (levels and norm) for the given data limits.
+        Scales are kept for the series, so with global limits every frame and
+        colour bar uses the same one."""
+        key = (float(data_limits[0]), float(data_limits[1]))
+
+        if key not in self.colour_scales:
+            self.colour_scales[key] = ColourScale(self, data_limits)
+
+        return self.colour_scales[key]
+
     def plot(self, variable, timestamps, output_filename, parameters={}):
-        """Create a single or series of plot(s)"""
+        """Create a single or series of plot(s). With the "num_shards"
+        parameter above 1 only the share of the series given by "shard" is
+        drawn (see naptools.shards), so that shards can run on separate nodes."""
         self.parameters.update(parameters)
-        self.base_output_filename, self.file_extension = os.path.splitext(output_filename)
-        
-        self.data_limits = self.data.get_data_limits(variable)
+        self.series_output = outputs.get_output(output_filename)
+        self.colour_scales = {}
+        coloured = self.is_coloured()
+        global_colours = coloured and not self.parameters["individual_colour_bar"]
+        num_shards = self.parameters["num_shards"]
 
-        self.total_data_min = self.data_limits[:, 0].min()
-        self.total_data_max = self.data_limits[:, 1].max()
-        
-        # Default behaviour is to use the entire set of data for the colouring
-        # The multiplication makes sure the limits show correctly
-        if not self.parameters["individual_colour_bar"]:
-            self.colour_bar_min = self.total_data_min * (1.0 + 1.0e-10)
-            self.colour_bar_max = self.total_data_max * (1.0 - 1.0e-10)
-            self.colour_bar_centre = 0.5 * (np.mean(self.data_limits[:, 0]) + np.mean(self.data_limits[:, 1]))
-            self.vmin = self.colour_bar_centre - self.parameters["colour_range"] * (self.colour_bar_centre - self.colour_bar_min)
-            self.vmax = self.colour_bar_centre + self.parameters["colour_range"] * (self.colour_bar_centre - self.colour_bar_min)
-
-        if self.parameters["separate_colour_bar"]:
-            self.dummy_data_df = self.data.data_df_dict[timestamps[0]]
-            
-        series_counter = 0
-        
-        for timestamp in timestamps:
-            self.output_filename = self.base_output_filename + "_" + timestamp + self.file_extension
-            
-            self.fig, self.axs = plt.subplots()
-            data_df = self.data.data_df_dict[timestamp]
-            
-            if self.parameters["individual_colour_bar"]:
-                self.colour_bar_min = self.data_limits[series_counter, 0]
-                self.colour_bar_max = self.data_limits[series_counter, 1]
-                self.colour_bar_centre = np.mean(data_df[variable])
-
-            if isinstance(self, ContourPlot):
-                plot = self.plot_contour(data_df, variable)
-                
-            # Remove axis ticks
-            self.axs.tick_params(left=False,
-                                 right=False,
-                                 bottom=False,
-                                 labelleft=False,
-                                 labelbottom=False
-                                 )
-            
-            # May have to hard code these to get them to look good, or at
-            # least format them properly.
-            # xx_ticks = [float(values.min()), float(values.max())]
-            xx_ticks = [float(self.colour_bar_min), float(self.colour_bar_max)]
-            
-            c_bar_format = self.parameters["colour_bar_format"]
-            # xx_labels = [f"{float(values.min()):{c_bar_format}}",
-            #              f"{float(values.max()):{c_bar_format}}"]
-            xx_labels = [f"{float(self.colour_bar_min):{c_bar_format}}",
-                         f"{float(self.colour_bar_max):{c_bar_format}}"]
-            
-            self.make_colour_bar(self.fig, self.axs, variable, plot, xx_ticks, xx_labels)
-            self.output()
-
-            if self.parameters["separate_colour_bar"]:
-                self.make_separate_colour_bar(variable)
-
-            series_counter += 1
-        
-    def make_colour_bar(self, fig, axs, variable, plot, ticks, labels):
+        all_timestamps = list(timestamps)
+        shard_timestamps = all_timestamps
+
+        if num_shards > 1:
+            shard_timestamps = shards.split_timestamps(all_timestamps,
+                                                       self.data.get_data_files(all_timestamps),
+                                                       num_shards)[self.parameters["shard"]]
+
+        # Only frames which are not up to date are plotted (and, with lazy
+        # loading, only their data is read). Global colour limits make every
+        # frame depend on the whole series.
+        timestamps = self.get_stale_timestamps({"variable": variable},
+                                               shard_timestamps,
+                                               shared_inputs=global_colours,
+                                               all_timestamps=all_timestamps)
+
+        # The first shard draws the colour bar shared by the series, which has
+        # its own fingerprint: it shows the limits of the whole series, or of
+        # its last frame with individual colour bars
+        colour_bar_stale = False
+
+        if coloured and self.parameters["separate_colour_bar"] and self.parameters["shard"] == 0 and all_timestamps:
+            colour_bar_timestamps = all_timestamps if global_colours else all_timestamps[-1:]
+            colour_bar_stale = not self.is_up_to_date(self.series_output.with_suffix("_colour_bar"),
+                                                      self.get_input_files(colour_bar_timestamps),
+                                                      {"variable": variable,
+                                                       "timestamps": colour_bar_timestamps,
+                                                       "colour_bar": True},
+                                                      colour_bar_timestamps)
+
+        if timestamps or colour_bar_stale:
+            if coloured:
+                with self.span("limits", variable=variable):
+                    if self.parameters["individual_colour_bar"]:
+                        self.data_limits = self.get_data_limits(
+                            variable, list(dict.fromkeys(timestamps + all_timestamps[-1:] * colour_bar_stale)))
+                    elif num_shards > 1 or self.parameters["stats_file"] is not None:
+                        self.data_limits = self.get_shared_data_limits(variable, all_timestamps)
+                    else:
+                        self.data_limits = self.get_data_limits(variable, all_timestamps)
+
+                    self.total_data_min = min(limits[0] for limits in self.data_limits.values())
+                    self.total_data_max = max(limits[1] for limits in self.data_limits.values())
+
+            quality_parameters = {key: self.parameters[key] for key in QUALITY_PARAMETERS}
+
+            try:
+                if self.parameters["frame_time_budget"] is not None and timestamps:
+                    with self.span("calibrate", variable=variable):
+                        self.output_metadata = self.fit_frame_time_budget(variable, timestamps[0])
+
+                # Each frame keeps its own figure and frame context, so that frames
+                # can be drawn concurrently (or read ahead by the frame pipeline)
+                self.plot_frames(lambda timestamp: self.plot_frame(variable, timestamp),
+                                 timestamps,
+                                 prefetch_frame=lambda timestamp: self.prefetch_frame(variable, timestamp),
+                                 release_frame=self.data.release)
+
+                if colour_bar_stale:
+                    with self.span("colour bar"):
+                        self.make_separate_colour_bar(
+                            variable, self.get_colour_scale(self.get_frame_data_limits(all_timestamps[-1])))
+            finally:
+                # The budget only lowers the quality of this series
+                self.parameters.update(quality_parameters)
+                self.output_metadata = {}
+                self.colour_scales = {}
+
+        if num_shards > 1:
+            self.write_shard_manifest(variable, all_timestamps, shard_timestamps)
+
+    def preview(self, variable, timestamps, output_filename, parameters={}, step=1, num_columns=None,
+                thumbnail_size=1.0, dpi=72, max_nodes=20000, num_threads=None):
+        """Draw a contact sheet of a series: every step-th timestamp as a small
+        thumbnail, in order, in one grid image (num_columns wide, by default
+        roughly square) with a single colour bar of the limits of all of
+        them. Each thumbnail (thumbnail_size inches across
+        at dpi) is filled by interpolating the variable at its pixels on the
+        mesh, decimated to about max_nodes nodes, with weights computed once
+        per mesh, so a frame costs one sparse product. The frames are read
+        (and released) on num_threads threads, by default a few per CPU."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.parameters.update(parameters)
+        timestamps = list(timestamps)[::step]
+        output = outputs.get_output(output_filename)
+
+        if self.is_up_to_date(output,
+                              self.data.get_input_files(timestamps),
+                              {"variable": variable,
+                               "timestamps": timestamps,
+                               "preview": [num_columns, thumbnail_size, dpi, max_nodes]},
+                              timestamps):
+            return
+
+        x, y = self.data.get_coordinates(self.data.data_df_dict[timestamps[0]])
+
+        if self.parameters["region"] is None:
+            limits = (x.min(), x.max(), y.min(), y.max())
+            num_nodes = len(x)
+        else:
+            limits = self.get_region()[0]
+            num_nodes = len(self.get_region_nodes(x, y))
+
+        pixel_points, thumbnail_shape = get_pixel_points(limits, round(thumbnail_size * dpi))
+        probe_key = ("preview", pixel_points.tobytes(), self.parameters["mask_conditions"])
+
+        def read_frame(timestamp):
+            context = FrameContext(self, timestamp)
+            probe = self.triangulation_cache.get(context.x, context.y, probe_key,
+                                                 lambda: Probe(context.triangulation, pixel_points))
+            image = probe(context.get_field(variable)).reshape(thumbnail_shape)
+            data_limits = self.get_data_limits(variable, [timestamp])[timestamp]
+            self.data.release(timestamp)
+
+            return image, data_limits
+
+        decimation = self.parameters["decimation"]
+
+        try:
+            self.parameters["decimation"] = max(decimation, math.ceil(num_nodes / max_nodes))
+
+            # The first frame prepares the triangulation and pixel weights
+            # shared by the others
+            with self.span("load", variable=variable):
+                frames = [read_frame(timestamps[0])]
+
+                with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                    frames += executor.map(read_frame, timestamps[1:])
+        finally:
+            self.parameters["decimation"] = decimation
+
+        with self.span("fill", variable=variable):
+            colour_scale = self.get_colour_scale([min(frame[1][0] for frame in frames),
+                                                  max(frame[1][1] for frame in frames)])
+            thumbnails = colour_images(np.array([frame[0] for frame in frames]), colour_scale)
+
+        with self.span("colour bar", variable=variable):
+            fig = self.make_contact_sheet(thumbnails, timestamps, colour_scale, variable, num_columns, dpi)
+
+        self.save(fig, output)
+
+    def make_contact_sheet(self, thumbnails, timestamps, colour_scale, variable, num_columns, dpi):
+        """Returns a figure of the thumbnails in a grid (shown pixel for
+        pixel), with the timestamps of each row, and a colour bar to its right"""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        font_size = 6
+        label_height = round(1.5 * font_size * dpi / 72)
+        grid = assemble_grid(thumbnails, num_columns, label_height)
+        height, width = grid.shape[:2]
+        bar_width = 0.15 * dpi
+        figure_width = width + 2.0 * bar_width
+
+        fig = Figure(figsize=(figure_width / dpi, height / dpi), dpi=dpi)
+        FigureCanvasAgg(fig)
+        axs = fig.add_axes([0.0, 0.0, width / figure_width, 1.0])
+        axs.imshow(grid, interpolation="nearest")
+        axs.set_axis_off()
+
+        num_columns = get_grid_shape(len(timestamps), num_columns)[1]
+        cell_height = thumbnails.shape[1] + label_height + 2
+        cell_width = thumbnails.shape[2] + 2
+
+        # Each row is labelled by the timestamps of its first and last thumbnails
+        # (a label per thumbnail would take longer to draw than the sheet)
+        for row, first in enumerate(range(0, len(timestamps), num_columns)):
+            last = min(first + num_columns, len(timestamps)) - 1
+            axs.text(0, row * cell_height + label_height - 1, f"{timestamps[first]} to {timestamps[last]}",
+                     fontsize=font_size, verticalalignment="bottom")
+
+        cax = fig.add_axes([(width + 0.5 * bar_width) / figure_width, 0.1, bar_width / figure_width, 0.8])
+        colour_bar.make_colour_bar(fig, colour_scale, rf"${variable}$", dict(self.parameters, colour_bar_location="right"),
+                                   cax=cax)
+
+        return fig
+
+    def fit_frame_time_budget(self, variable, timestamp, min_quality=0.1):
+        """Lower the quality of the series so that a frame takes about the
+        "frame_time_budget" parameter (in seconds) to draw and save. The
+        first frame is timed at full quality and, if it is over the budget,
+        again at budget / time, and the quality q (between min_quality and
+        1) is chosen from the line through both timings. The colour and
+        contour levels are scaled by q, the nodes and arrows drawn are
+        decimated by 1 / q and the dpi is scaled by sqrt(q), so each part of
+        the drawing time is roughly proportional to q. Returns the choices,
+        which are recorded in the metadata of the outputs."""
+        budget = self.parameters["frame_time_budget"]
+        full_quality = {key: self.parameters[key] for key in QUALITY_PARAMETERS}
+
+        # The calibration frames are encoded as the frame would be, but only
+        # in memory (they are neither logged nor fingerprinted)
+        calibration_output = outputs.Output([outputs.BytesSink(target.format, target.dpi)
+                                             for target in self.get_frame_filename(timestamp).targets])
+        self.prefetch_frame(variable, timestamp)
+
+        def time_frame(quality):
+            self.set_quality(full_quality, quality)
+
+            # The (cached) triangulation is not part of the time of a frame
+            FrameContext(self, timestamp).get_triangulations()
+
+            start = time.perf_counter()
+            fig, axs = self.draw_frame(variable, timestamp)
+            self.format_figure(fig)
+            self.format_axes(axs)
+            calibration_output.save(fig)
+
+            return time.perf_counter() - start
+
+        qualities = [1.0]
+        frame_times = [time_frame(1.0)]
+        quality = 1.0
+
+        if frame_times[0] > budget:
+            qualities.append(max(min_quality, budget / frame_times[0]))
+            frame_times.append(time_frame(qualities[1]))
+            slope = (frame_times[0] - frame_times[1]) / (qualities[0] - qualities[1])
+            quality = qualities[1]
+
+            if slope > 0:
+                quality = (budget - frame_times[0] + slope) / slope
+
+            quality = min(1.0, max(min_quality, quality))
+
+        self.set_quality(full_quality, quality)
+
+        return {
+            "frame_time_budget": budget,
+            "quality": quality,
+            "calibration": [[q, t] for q, t in zip(qualities, frame_times)],
+            **{key: self.parameters[key] for key in QUALITY_PARAMETERS},
+        }
+
+    def set_quality(self, full_quality, quality):
+        """Set the parameters of the given quality (between 0 and 1) from
+        those at full quality (see fit_frame_time_budget())"""
+        self.parameters["num_colour_levels"] = max(8, round(full_quality["num_colour_levels"] * quality))
+        self.parameters["num_contours"] = max(self.parameters["num_thin_lines"],
+                                              round(full_quality["num_contours"] * quality))
+        self.parameters["decimation"] = round(full_quality["decimation"] / quality)
+        self.parameters["arrow_sparsity"] = round(full_quality["arrow_sparsity"] / quality)
+        self.colour_scales = {}
+
+        # The dpi is only set when it is lowered
+        if quality < 1.0:
+            from matplotlib import rcParams
+
+            self.parameters["dpi"] = round((full_quality["dpi"] or rcParams["figure.dpi"]) * math.sqrt(quality))
+        else:
+            self.parameters["dpi"] = full_quality["dpi"]
+
+    def get_stats_filename(self):
+        """Returns the stats file holding the data limits shared by all shards"""
+        if self.parameters["stats_file"] is not None:
+            return self.parameters["stats_file"]
+
+        return shards.get_shard_filename(self.series_output, "_stats.json")
+
+    def get_shared_data_limits(self, variable, timestamps):
+        """Returns the data limits of the whole series from the stats file,
+        which is written by the first shard to compute them. (Run a single
+        shard, or call write_stats(), first to have them computed once.)"""
+        stats_filename = self.get_stats_filename()
+        data_files = self.data.get_input_files(timestamps)
+        data_limits = shards.read_stats(stats_filename, variable, timestamps, data_files) if stats_filename else None
+
+        if data_limits is None:
+            data_limits = self.get_data_limits(variable, timestamps)
+
+            if stats_filename:
+                shards.write_stats(stats_filename, variable, timestamps, data_files, data_limits)
+
+        return data_limits
+
+    def write_stats(self, variable, timestamps, output_filename, parameters={}):
+        """Compute the data limits of a series and record them in the stats
+        file shared by the shards that draw it"""
+        self.parameters.update(parameters)
+        self.series_output = outputs.get_output(output_filename)
+        timestamps = list(timestamps)
+        shards.write_stats(self.get_stats_filename(), variable, timestamps,
+                           self.data.get_input_files(timestamps), self.get_data_limits(variable, timestamps))
+
+    def write_shard_manifest(self, variable, all_timestamps, shard_timestamps):
+        """Record the frames of this shard for merge_manifests()"""
+        manifest_filename = shards.get_manifest_filename(self.series_output, self.parameters["shard"],
+                                                         self.parameters["num_shards"])
+
+        if manifest_filename is not None:
+            shards.write_manifest(
+                manifest_filename, variable, all_timestamps, self.parameters["shard"],
+                self.parameters["num_shards"],
+                {timestamp: self.get_frame_filename(timestamp).get_filenames() for timestamp in shard_timestamps},
+            )
+
+    def prefetch_frame(self, variable, timestamp):
+        """Read the data of a frame (and evaluate the coloured variable) in advance"""
+        if self.is_coloured():
+            self.data.get_field(timestamp, variable)
+        else:
+            self.data.data_df_dict[timestamp]
+
+    def plot_frame(self, variable, timestamp, output_filename=None):
+        """Create and output the plot of a single timestamp (to its frame of
+        the series unless another output is given)"""
+        fig, axs = self.draw_frame(variable, timestamp)
+
+        if output_filename is None:
+            output_filename = self.get_frame_filename(timestamp)
+
+        self.output(fig, axs, output_filename)
+
+    def draw_frame(self, variable, timestamp):
+        """Returns a new figure and axes of a single timestamp, drawn with its
+        colour bar"""
+        fig, axs = self.new_figure()
+
+        if self.is_coloured():
+            colour_scale = self.get_colour_scale(self.get_frame_data_limits(timestamp))
+        else:
+            colour_scale = None
+
+        self.draw(axs, variable, timestamp, colour_scale)
+
+        if colour_scale is not None:
+            with self.span("colour bar", timestamp=timestamp):
+                self.make_colour_bar(fig, axs, variable, colour_scale)
+
+        return fig, axs
+
+    def draw(self, axs, variable, timestamp, colour_scale=None, triangulations=None):
+        """Draw every layer of a single timestamp on the given axes and return
+        the frame context. The masked and unmasked triangulations of the mesh
+        are prepared (once) unless passed in."""
+        context = FrameContext(self, timestamp, colour_scale, triangulations)
+
+        for layer in self.get_layers():
+            with self.span(layer.stage, timestamp=timestamp):
+                layer.draw(axs, context, variable, self.parameters)
+
+        if self.parameters["region"] is not None:
+            self.clip_to_region(axs)
+
+        # Remove axis ticks
+        axs.tick_params(left=False,
+                        right=False,
+                        bottom=False,
+                        labelleft=False,
+                        labelbottom=False
+                        )
+
+        return context
+
+    def make_colour_bar(self, fig, axs, variable, colour_scale):
         """Add and format colour bar"""
+        from mpl_toolkits.axes_grid1 import make_axes_locatable
+
         divider = make_axes_locatable(axs)
         cax = divider.append_axes(self.parameters["colour_bar_location"],
                                   size="5%",
                                   pad=0.05)
-        
-        if self.parameters["colour_bar_location"] in ["top", "bottom"]:
-            colour_bar_orientation = "horizontal"
-        else:
-            colour_bar_orientation = "vertical"
-
-        cbar = fig.colorbar(plot,
-                            cax=cax,
-                            label=rf"${variable}$",
-                            orientation=colour_bar_orientation,
-                            # spacing="proportional",
-                            )
-        cbar.set_ticks(ticks=ticks, labels=labels)  # labels=labels prevents pretty scientific notation
-        # cbar.formatter.set_powerlimits((-2, 2))
-        # cbar.formatter.set_useMathText(True)
-        cbar.ax.tick_params(labelsize=self.parameters["colour_bar_font_size"])
-                
-        if self.parameters["colour_bar_location"] in ["top", "bottom"]:
-            cbar.ax.xaxis.set_ticks_position(self.parameters["colour_bar_location"])
-            cbar.ax.get_xticklabels()[0].set_horizontalalignment("left")
-            cbar.ax.get_xticklabels()[1].set_horizontalalignment("right")
-        else:
-            cbar.ax.yaxis.set_ticks_position(self.parameters["colour_bar_location"])
-            
-    def make_separate_colour_bar(self, variable):
+
+        colour_bar.make_colour_bar(fig, colour_scale, rf"${variable}$", self.parameters, cax=cax)
+
+    def make_separate_colour_bar(self, variable, colour_scale):
         """Create colour bar as a separate figure"""
-        dummy_fig, dummy_axs = plt.subplots()  # To avoid deleting other axes
-        dummy_Xi = self.dummy_data_df["Points:0"]
-        dummy_Yi = self.dummy_data_df["Points:1"]
-        dummy_values = self.dummy_data_df[variable]
-        dummy_contour = dummy_axs.tricontourf(dummy_Xi,
-                                              dummy_Yi,
-                                              dummy_values,
-                                              self.colour_levels,
-                                              # norm=colors.LogNorm(),
-                                              cmap=self.parameters["colour_map"])
-        
-        cbar = plt.colorbar(dummy_contour,
-                            ax=dummy_axs,
-                            label=rf"${variable}$",
-                            aspect=50,
-                            location=self.parameters["colour_bar_location"])
-        cbar.ax.tick_params(labelsize=self.parameters["colour_bar_font_size"])
-        tick_locator = ticker.MaxNLocator(nbins=5)
-        cbar.locator = tick_locator
-        cbar.update_ticks()
-        dummy_axs.remove()
-        plt.savefig(self.base_output_filename + "_colour_bar" + self.file_extension)
-        
-    def output(self):
+        fig, axs = self.new_figure()  # The axes only position the colour bar
+        colour_bar.make_separate_colour_bar(fig, axs, colour_scale, rf"${variable}$", self.parameters)
+        self.save(fig, self.series_output.with_suffix("_colour_bar"))
+
+    def output(self, fig, axs, output_filename):
         """Format and output plot to file"""
-        # plt.tick_params(labelsize=self.parameters["font_size"])
-        self.fig.set_figheight(self.parameters["figure_height"])
-        self.fig.set_figwidth(self.parameters["figure_width"])
-        self.axs.axes.set_aspect("equal")
+        # axs.tick_params(labelsize=self.parameters["font_size"])
+        self.format_figure(fig)
+        super().output(fig, axs, output_filename)
+
+    def format_figure(self, fig):
+        """Set the size (and, if given, the dpi) of the figure"""
+        fig.set_figheight(self.parameters["figure_height"])
+        fig.set_figwidth(self.parameters["figure_width"])
+
+        if self.parameters["dpi"] is not None:
+            fig.set_dpi(self.parameters["dpi"])
+
+    def format_axes(self, axs):
+        """Label the axes and keep the aspect ratio of the domain"""
+        axs.axes.set_aspect("equal")
 
-        super().output()
+        super().format_axes(axs)
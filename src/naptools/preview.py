@@ -0,0 +1,57 @@
+import math
+import numpy as np
+
+
+def get_pixel_points(limits, size):
+    """Returns the centres of the pixels of a thumbnail of the box (x_min,
+    x_max, y_min, y_max), at most size pixels across, from the top row down
+    (as in an image), and the thumbnail's shape (rows, columns)"""
+    x_min, x_max, y_min, y_max = limits
+    width = x_max - x_min or 1.0
+    height = y_max - y_min or 1.0
+    scale = size / max(width, height)
+    num_columns = max(1, round(width * scale))
+    num_rows = max(1, round(height * scale))
+
+    x = x_min + (np.arange(num_columns) + 0.5) * width / num_columns
+    y = y_max - (np.arange(num_rows) + 0.5) * height / num_rows
+    x, y = np.meshgrid(x, y)
+
+    return np.column_stack([x.ravel(), y.ravel()]), (num_rows, num_columns)
+
+
+def colour_images(images, colour_scale):
+    """Returns the RGBA images (as bytes) of the given arrays of values
+    coloured by the colour scale, with NaN (outside the mesh) in white"""
+    # The norm only takes flat arrays
+    rgba = colour_scale.colour_map(colour_scale.new_norm()(images.ravel()), bytes=True)
+    rgba[np.isnan(images.ravel())] = 255
+
+    return rgba.reshape(*images.shape, 4)
+
+
+def get_grid_shape(num_thumbnails, num_columns=None):
+    """Returns the number of rows and columns of a contact sheet (by default
+    roughly square)"""
+    if num_columns is None:
+        num_columns = max(1, math.ceil(math.sqrt(num_thumbnails)))
+
+    return max(1, math.ceil(num_thumbnails / num_columns)), num_columns
+
+
+def assemble_grid(thumbnails, num_columns=None, label_height=0, gap=2):
+    """Returns one image of the thumbnails (an array of RGBA images of the
+    same shape) laid out in rows, each with label_height pixels above it for
+    its label and gap pixels around it, on white"""
+    num_rows, num_columns = get_grid_shape(len(thumbnails), num_columns)
+    height = thumbnails.shape[1] + label_height + gap
+    width = thumbnails.shape[2] + gap
+    grid = np.full((num_rows * height, num_columns * width, 4), 255, dtype=np.uint8)
+
+    for index, thumbnail in enumerate(thumbnails):
+        row, column = divmod(index, num_columns)
+        top = row * height + label_height
+        left = column * width
+        grid[top:top + thumbnail.shape[0], left:left + thumbnail.shape[1]] = thumbnail
+
+    return grid
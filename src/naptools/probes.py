@@ -0,0 +1,40 @@
+import numpy as np
+
+
+class Probe:
+    """Points located in the triangulation of a mesh. The barycentric weights
+    of each point in its triangle are kept in a sparse matrix, so a field is
+    interpolated at all the points with one matrix-vector product. Points
+    outside the mesh, or in its masked triangles, give NaN."""
+    def __init__(self, triangulation, points):
+        from scipy import sparse
+
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.x = points[:, 0]
+        self.y = points[:, 1]
+
+        triangle_indices = triangulation.get_trifinder()(self.x, self.y)
+        self.inside = triangle_indices >= 0
+
+        # Barycentric coordinates of each point in its triangle
+        triangles = triangulation.triangles[triangle_indices[self.inside]]
+        x = triangulation.x[triangles]
+        y = triangulation.y[triangles]
+        px = self.x[self.inside]
+        py = self.y[self.inside]
+
+        determinant = (y[:, 1] - y[:, 2]) * (x[:, 0] - x[:, 2]) + (x[:, 2] - x[:, 1]) * (y[:, 0] - y[:, 2])
+        weight_0 = ((y[:, 1] - y[:, 2]) * (px - x[:, 2]) + (x[:, 2] - x[:, 1]) * (py - y[:, 2])) / determinant
+        weight_1 = ((y[:, 2] - y[:, 0]) * (px - x[:, 2]) + (x[:, 0] - x[:, 2]) * (py - y[:, 2])) / determinant
+        weights = np.column_stack([weight_0, weight_1, 1.0 - weight_0 - weight_1])
+
+        rows = np.repeat(np.nonzero(self.inside)[0], 3)
+        self.weights = sparse.csr_matrix((weights.ravel(), (rows, triangles.ravel())),
+                                         shape=(len(self.x), len(triangulation.x)))
+
+    def __call__(self, values):
+        """Returns the values of a nodal field interpolated at the points"""
+        probe_values = self.weights @ np.asarray(values, dtype=float)
+        probe_values[~self.inside] = np.nan
+
+        return probe_values
@@ -0,0 +1,172 @@
+import json
+import os
+
+
+def get_file_size(data_file):
+    """Returns the size of a data file (1 for data not read from a file)"""
+    try:
+        return os.path.getsize(data_file)
+    except (OSError, TypeError):
+        return 1
+
+
+def split_timestamps(timestamps, data_files, num_shards):
+    """Split a series into num_shards lists of timestamps with roughly equal
+    total data file size. The split only depends on the timestamps and file
+    sizes, so every shard computes the same one: the largest files are given
+    first to the least loaded shard (the lowest index on ties), and each
+    shard keeps the order of the series."""
+    sizes = [get_file_size(data_file) for data_file in data_files]
+    loads = [0] * num_shards
+    shard_indices = [0] * len(timestamps)
+
+    for index in sorted(range(len(timestamps)), key=lambda index: (-sizes[index], index)):
+        shard = min(range(num_shards), key=lambda shard: (loads[shard], shard))
+        shard_indices[index] = shard
+        loads[shard] += sizes[index]
+
+    return [[timestamp for timestamp, timestamp_shard in zip(timestamps, shard_indices)
+             if timestamp_shard == shard]
+            for shard in range(num_shards)]
+
+
+def write_json(filename, contents):
+    """Write a JSON file atomically, so that other shards never read it half
+    written"""
+    if os.path.dirname(filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+    temporary_filename = f"{filename}.{os.getpid()}.tmp"
+
+    with open(temporary_filename, "w") as json_file:
+        json.dump(contents, json_file, indent=1)
+
+    os.replace(temporary_filename, filename)
+
+
+def read_json(filename):
+    """Returns the contents of a JSON file, or None if it cannot be read"""
+    try:
+        with open(filename) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+def get_shard_filename(output, suffix):
+    """Returns the name of a file kept next to the (first file of the) output,
+    or None if the output has no files"""
+    filenames = output.get_filenames()
+
+    if not filenames:
+        return None
+
+    return os.path.splitext(filenames[0])[0] + suffix
+
+
+def describe_data_files(data_files):
+    """Returns the size and modification time of each data file"""
+    descriptions = []
+
+    for data_file in data_files:
+        try:
+            stat = os.stat(data_file)
+            descriptions.append([os.fspath(data_file), stat.st_size, stat.st_mtime])
+        except (OSError, TypeError):
+            descriptions.append(None)
+
+    return descriptions
+
+
+def read_stats(stats_filename, variable, timestamps, data_files):
+    """Returns the data limits of each timestamp recorded in a stats file, or
+    None if there is no stats file for this variable and series (or its data
+    files have changed since)"""
+    stats = read_json(stats_filename)
+
+    if (stats is None
+            or stats.get("variable") != variable
+            or stats.get("timestamps") != list(timestamps)
+            or stats.get("data_files") != describe_data_files(data_files)):
+        return None
+
+    return stats["data_limits"]
+
+
+def write_stats(stats_filename, variable, timestamps, data_files, data_limits):
+    """Record the data limits of each timestamp of a series, for all shards"""
+    write_json(stats_filename, {
+        "variable": variable,
+        "timestamps": list(timestamps),
+        "data_files": describe_data_files(data_files),
+        "data_limits": {timestamp: [float(limits[0]), float(limits[1])]
+                        for timestamp, limits in data_limits.items()},
+    })
+
+
+def get_manifest_filename(output, shard, num_shards):
+    return get_shard_filename(output, f"_shard_{shard}_of_{num_shards}.json")
+
+
+def write_manifest(manifest_filename, variable, timestamps, shard, num_shards, frame_outputs):
+    """Record the frames of a series drawn by one shard (frame_outputs maps
+    each of its timestamps to the output files of the frame)"""
+    write_json(manifest_filename, {
+        "variable": variable,
+        "series": list(timestamps),
+        "shard": shard,
+        "num_shards": num_shards,
+        "frames": frame_outputs,
+    })
+
+
+def merge_manifests(output_filename, num_shards):
+    """Check that the shards of a series have drawn every frame exactly once
+    and that their output files exist, and write a merged manifest next to
+    the output. Returns the merged manifest, or raises ValueError listing
+    the missing shards and frames."""
+    from naptools import outputs
+
+    output = outputs.get_output(output_filename)
+    manifests = []
+    problems = []
+
+    for shard in range(num_shards):
+        manifest = read_json(get_manifest_filename(output, shard, num_shards))
+
+        if manifest is None:
+            problems.append(f"shard {shard} of {num_shards} has no manifest")
+        else:
+            manifests.append(manifest)
+
+    frames = {}
+
+    for manifest in manifests:
+        if manifest["series"] != manifests[0]["series"] or manifest["variable"] != manifests[0]["variable"]:
+            problems.append(f"shard {manifest['shard']} drew a different series")
+
+        for timestamp, frame_outputs in manifest["frames"].items():
+            if timestamp in frames:
+                problems.append(f"frame {timestamp} was drawn by more than one shard")
+
+            frames[timestamp] = frame_outputs
+
+    if manifests:
+        for timestamp in manifests[0]["series"]:
+            if timestamp not in frames:
+                problems.append(f"frame {timestamp} is missing")
+            elif not all(os.path.exists(filename) for filename in frames[timestamp]):
+                problems.append(f"frame {timestamp} has missing output files")
+
+    if problems:
+        raise ValueError("Incomplete sharded series " + str(output) + ":\n  " + "\n  ".join(problems))
+
+    merged_manifest = {
+        "variable": manifests[0]["variable"],
+        "series": manifests[0]["series"],
+        "num_shards": num_shards,
+        "frames": {timestamp: frames[timestamp] for timestamp in manifests[0]["series"]},
+    }
+    write_json(get_shard_filename(output, "_manifest.json"), merged_manifest)
+
+    return merged_manifest
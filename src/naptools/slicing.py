@@ -0,0 +1,260 @@
+import hashlib
+from collections.abc import Mapping
+import numpy as np
+from naptools.frame import Frame
+from naptools.plot_2d import Data2D, TriangulationCache
+
+# The six edges of a tetrahedron, as pairs of its (local) vertices
+tetrahedron_edges = np.array([[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]])
+
+
+def edge_index(vertex_0, vertex_1):
+    """Returns the index in tetrahedron_edges of the edge between two vertices"""
+    return [tuple(edge) for edge in tetrahedron_edges].index(tuple(sorted((vertex_0, vertex_1))))
+
+
+def build_case_table():
+    """Returns the cut edges of a tetrahedron for each of the 16 cases of its
+    vertices above the plane (bit i set if vertex i is above), as two
+    triangles of edge indices (-1 where there is no triangle)"""
+    table = np.full((16, 2, 3), -1)
+
+    for case in range(16):
+        above = [vertex for vertex in range(4) if case >> vertex & 1]
+        below = [vertex for vertex in range(4) if not case >> vertex & 1]
+
+        if len(above) in (1, 3):
+            # A single vertex is cut off by a triangle on its three edges
+            vertex = above[0] if len(above) == 1 else below[0]
+            table[case, 0] = [edge_index(vertex, other) for other in range(4) if other != vertex]
+
+        elif len(above) == 2:
+            # Two vertices are cut off by a quadrilateral, split in two
+            (i, j), (k, l) = above, below
+            quadrilateral = [edge_index(i, k), edge_index(i, l), edge_index(j, l), edge_index(j, k)]
+            table[case, 0] = quadrilateral[:3]
+            table[case, 1] = [quadrilateral[0], quadrilateral[2], quadrilateral[3]]
+
+    return table
+
+
+case_table = build_case_table()
+
+
+def get_plane_axes(normal, x_axis=None):
+    """Returns orthonormal in-plane x and y directions and the unit normal of
+    a plane. The x direction is x_axis projected onto the plane, by default
+    the coordinate axis least aligned with the normal (so a plane normal to
+    z keeps x and y)."""
+    normal = np.asarray(normal, dtype=float)
+    normal = normal / np.linalg.norm(normal)
+
+    if x_axis is None:
+        x_axis = np.eye(3)[np.argmin(np.abs(normal))]
+
+    x_axis = np.asarray(x_axis, dtype=float)
+    x_axis = x_axis - np.dot(x_axis, normal) * normal
+    x_axis = x_axis / np.linalg.norm(x_axis)
+
+    return x_axis, np.cross(normal, x_axis), normal
+
+
+class PlaneSlice:
+    """The cut of a tetrahedral mesh by a plane: the nodes where the plane
+    crosses the edges of the mesh, in in-plane coordinates (x, y), and the
+    triangles joining them (one or two in each cut tetrahedron). Fields are
+    interpolated linearly along the cut edges, with a sparse matrix, so a
+    slice is only computed once for each mesh and plane and then applied to
+    every field and timestamp. Nodes of the mesh lying on the plane are
+    shared by all their edges."""
+    def __init__(self, points, tetrahedra, origin, normal, x_axis=None):
+        from scipy import sparse
+
+        points = np.asarray(points, dtype=float)
+        tetrahedra = np.asarray(tetrahedra)
+        self.origin = np.asarray(origin, dtype=float)
+        self.axes = get_plane_axes(normal, x_axis)
+        self.num_points = len(points)
+
+        # Signed distance of each node from the plane
+        distances = (points - self.origin) @ self.axes[2]
+        above = distances > 0.0
+        cases = (above[tetrahedra] * np.array([1, 2, 4, 8])).sum(axis=1)
+        cut = (cases != 0) & (cases != 15)
+        cut_tetrahedra = tetrahedra[cut]
+        cut_cases = cases[cut]
+
+        # Edge indices of the (up to two) triangles of each cut tetrahedron
+        triangle_edges = case_table[cut_cases].reshape(-1, 3)
+        tetrahedron_indices = np.repeat(np.arange(len(cut_tetrahedra)), 2)
+        has_triangle = triangle_edges[:, 0] >= 0
+        triangle_edges = triangle_edges[has_triangle]
+        tetrahedron_indices = tetrahedron_indices[has_triangle]
+
+        # The mesh nodes at the ends of each edge of every triangle
+        local_edges = tetrahedron_edges[triangle_edges]
+        ends = np.take_along_axis(cut_tetrahedra[tetrahedron_indices][:, None, :].repeat(3, axis=1),
+                                  local_edges, axis=2)
+        node_0, node_1 = np.sort(ends, axis=2).transpose(2, 0, 1)
+
+        # Where the plane crosses the edge, from node_0 (0) to node_1 (1)
+        distance_0 = distances[node_0]
+        distance_1 = distances[node_1]
+        fraction = distance_0 / (distance_0 - distance_1)
+
+        # An edge crossed at one of its nodes is the node itself
+        at_node_0 = distance_0 == 0.0
+        at_node_1 = distance_1 == 0.0
+        node_0 = np.where(at_node_1, node_1, node_0)
+        node_1 = np.where(at_node_0, node_0, node_1)
+        fraction = np.where(at_node_0 | at_node_1, 0.0, fraction)
+
+        # Each crossed edge (or node) is one node of the slice
+        keys, key_indices = np.unique(node_0.astype(np.int64) * self.num_points + node_1, return_inverse=True)
+        self.triangles = key_indices.reshape(-1, 3)
+        first = np.unique(key_indices.ravel(), return_index=True)[1]
+        slice_node_0 = node_0.ravel()[first]
+        slice_node_1 = node_1.ravel()[first]
+        slice_fraction = fraction.ravel()[first]
+
+        # Triangles collapsed by the plane passing through their nodes are dropped
+        self.triangles = self.triangles[(self.triangles[:, 0] != self.triangles[:, 1])
+                                        & (self.triangles[:, 1] != self.triangles[:, 2])
+                                        & (self.triangles[:, 0] != self.triangles[:, 2])]
+
+        rows = np.repeat(np.arange(len(keys)), 2)
+        self.weights = sparse.csr_matrix(
+            (np.column_stack([1.0 - slice_fraction, slice_fraction]).ravel(),
+             (rows, np.column_stack([slice_node_0, slice_node_1]).ravel())),
+            shape=(len(keys), self.num_points),
+        )
+
+        in_plane = self.interpolate(points - self.origin) @ np.column_stack(self.axes[:2])
+        self.x = in_plane[:, 0]
+        self.y = in_plane[:, 1]
+
+    def interpolate(self, values):
+        """Returns a nodal field of the mesh (an array of N values, or N rows
+        of components) at the nodes of the slice"""
+        return self.weights @ np.asarray(values, dtype=float)
+
+    def project(self, vectors):
+        """Returns the in-plane x and y and the normal components of 3D
+        vectors at the nodes of the slice"""
+        return self.interpolate(vectors) @ np.column_stack(self.axes)
+
+
+class SliceFrames(Mapping):
+    """The sliced frames of each timestamp of SlicedData, each computed on
+    first use and kept until it is released"""
+    def __init__(self, sliced_data):
+        self.sliced_data = sliced_data
+        self.frames = {}
+
+    def __getitem__(self, timestamp):
+        source_df = self.sliced_data.data_3d.data_df_dict[timestamp]
+        frame = self.frames.get(timestamp)
+
+        # The slice is kept alongside the frame it was computed from
+        if frame is None or frame[0] is not source_df:
+            frame = (source_df, self.sliced_data.slice_data_frame(source_df))
+            self.frames[timestamp] = frame
+
+        return frame[1]
+
+    def __iter__(self):
+        return iter(self.sliced_data.data_3d.data_df_dict)
+
+    def __len__(self):
+        return len(self.sliced_data.data_3d.data_df_dict)
+
+
+class SlicedData(Data2D):
+    """Two-dimensional data on the plane through origin with the given normal,
+    sliced from the 3D data of a tetrahedral mesh (e.g. BaseData of files
+    with the columns "Points:0", "Points:1" and "Points:2"), whose
+    tetrahedra are given as an (M, 4) array of node indices. Any Plot2D
+    draws it like other data, on the triangles of the slice.
+
+    Every column is interpolated onto the slice. The columns "Points:*" are
+    the in-plane coordinates (see get_plane_axes() for their directions), and
+    3D vectors ("name:0", "name:1" and "name:2") are given as their in-plane
+    x and y and normal components. The slice is computed once for each mesh
+    and reused by every timestamp on it (and the slices of several planes can
+    share a slice_cache)."""
+    def __init__(self, data_3d, tetrahedra, origin, normal, x_axis=None, slice_cache=None):
+        super().__init__()
+        self.data_3d = data_3d
+        self.tetrahedra = np.asarray(tetrahedra)
+        self.origin = tuple(float(value) for value in origin)
+        self.normal = tuple(float(value) for value in normal)
+        self.x_axis = None if x_axis is None else tuple(float(value) for value in x_axis)
+        self.slice_cache = slice_cache if slice_cache is not None else TriangulationCache()
+        self.data_df_dict = SliceFrames(self)
+
+        # The tetrahedra are not read from the input files, so are fingerprinted
+        self.tetrahedra_digest = hashlib.sha256(np.ascontiguousarray(self.tetrahedra).tobytes()).hexdigest()
+
+    def get_slice(self, source_df):
+        """Returns the PlaneSlice of the mesh of a 3D frame, computed once for
+        each mesh (the nodes and tetrahedra) and plane"""
+        points = source_df.coordinates[:, :3]
+
+        return self.slice_cache.get(
+            points, self.tetrahedra, ("slice", self.origin, self.normal, self.x_axis),
+            lambda: PlaneSlice(points, self.tetrahedra, self.origin, self.normal, self.x_axis),
+        )
+
+    def slice_data_frame(self, source_df):
+        """Returns the frame of the slice of a 3D frame"""
+        plane_slice = self.get_slice(source_df)
+        columns = {}
+        vectors = {name[:-2] for name in source_df.columns
+                   if name.endswith(":2") and name[:-2] + ":0" in source_df and name[:-2] + ":1" in source_df}
+
+        for name in source_df.columns:
+            vector, _, component = name.rpartition(":")
+
+            if vector in vectors:
+                if name not in columns:
+                    offset = plane_slice.origin if vector == "Points" else 0.0
+                    values = plane_slice.project(np.column_stack([source_df[f"{vector}:{index}"]
+                                                                  for index in range(3)]) - offset)
+
+                    for index in range(3):
+                        columns[f"{vector}:{index}"] = values[:, index]
+
+            elif np.issubdtype(source_df[name].dtype, np.number):
+                columns[name] = plane_slice.interpolate(source_df[name])
+
+        return Frame.from_columns(columns)
+
+    def get_triangles(self, data_df):
+        """Returns the triangles of the slice of a sliced frame"""
+        for source_df, sliced_df in self.data_df_dict.frames.values():
+            if sliced_df is data_df:
+                return self.get_slice(source_df).triangles
+
+        return None
+
+    def get_data_files(self, data_df_ids=None):
+        return self.data_3d.get_data_files(data_df_ids)
+
+    def get_input_files(self, data_df_ids=None):
+        return self.data_3d.get_input_files(data_df_ids)
+
+    def get_fingerprint_arguments(self, data_df_ids=None):
+        """Returns the plane and tetrahedra of the slice (and the settings of
+        the 3D data)"""
+        return {
+            "origin": self.origin,
+            "normal": self.normal,
+            "x_axis": self.x_axis,
+            "tetrahedra": self.tetrahedra_digest,
+            "data_3d": self.data_3d.get_fingerprint_arguments(data_df_ids),
+        }
+
+    def release(self, data_df_id):
+        """Free the memory held for the frame (see BaseData.release())"""
+        self.data_3d.release(data_df_id)
+        self.data_df_dict.frames.pop(data_df_id, None)
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class UniformGrid:
+    """Uniform grid of cells over the nodes of a mesh. The nodes are sorted by
+    cell, so the nodes in a box are found from the cells it covers without
+    testing every node of the mesh."""
+    def __init__(self, x, y, nodes_per_cell=16):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.x_min, self.x_max = self.x.min(), self.x.max()
+        self.y_min, self.y_max = self.y.min(), self.y.max()
+
+        # Roughly nodes_per_cell nodes in each cell of a square grid
+        self.num_cells = max(1, int(np.sqrt(len(self.x) / nodes_per_cell)))
+        self.cell_width = (self.x_max - self.x_min) / self.num_cells or 1.0
+        self.cell_height = (self.y_max - self.y_min) / self.num_cells or 1.0
+
+        cells = (self.get_row(self.y) * self.num_cells + self.get_column(self.x))
+        self.order = np.argsort(cells, kind="stable")
+
+        # The nodes of cell i are order[cell_starts[i]:cell_starts[i + 1]]
+        self.cell_starts = np.searchsorted(cells[self.order], np.arange(self.num_cells**2 + 1))
+
+    def get_column(self, x):
+        return np.clip(((x - self.x_min) / self.cell_width).astype(int), 0, self.num_cells - 1)
+
+    def get_row(self, y):
+        return np.clip(((y - self.y_min) / self.cell_height).astype(int), 0, self.num_cells - 1)
+
+    def query(self, x_min, x_max, y_min, y_max):
+        """Returns the indices (in increasing order) of the nodes in the box"""
+        if x_max < self.x_min or x_min > self.x_max or y_max < self.y_min or y_min > self.y_max:
+            return np.empty(0, dtype=int)
+
+        first_column, last_column = self.get_column(np.array([x_min, x_max]))
+        first_row, last_row = self.get_row(np.array([y_min, y_max]))
+
+        # The cells of a row of the box are contiguous in the sorted nodes
+        candidates = np.concatenate([
+            self.order[self.cell_starts[row * self.num_cells + first_column]:
+                       self.cell_starts[row * self.num_cells + last_column + 1]]
+            for row in range(first_row, last_row + 1)
+        ])
+
+        x = self.x[candidates]
+        y = self.y[candidates]
+        inside = (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+
+        return np.sort(candidates[inside])
@@ -0,0 +1,166 @@
+from collections.abc import Mapping
+import numpy as np
+from naptools.plot_2d import Data2D
+
+
+class InterpolatedFrames(Mapping):
+    """The frames of data behind each frame of InterpolatedData: those of the
+    snapshot starting its interval, which give the (shared) mesh"""
+    def __init__(self, interpolated_data):
+        self.interpolated_data = interpolated_data
+
+    def __getitem__(self, frame):
+        return self.interpolated_data.data.data_df_dict[self.interpolated_data.intervals[frame][0]]
+
+    def __iter__(self):
+        return iter(self.interpolated_data.intervals)
+
+    def __len__(self):
+        return len(self.interpolated_data.intervals)
+
+
+class InterpolatedData(Data2D):
+    """Frames interpolated linearly in time between the snapshots of 2D data
+    (e.g. for an animation at a higher frame rate than the data was written
+    at). Neighbouring snapshots must share a mesh, so each field of a frame
+    is a single blend of the fields of its two snapshots, drawn with their
+    cached triangulation.
+
+    The snapshots are the given timestamps of data (by default all of them,
+    in order) at snapshot_times (by default the timestamps as numbers, or
+    their positions). The frames are at the given times, or else
+    frames_per_interval evenly spaced frames from each snapshot to the next
+    (and the last snapshot). They are named "0000", "0001", ... in order,
+    and their times are kept in frame_times."""
+    def __init__(self, data, frames_per_interval=1, times=None, timestamps=None, snapshot_times=None):
+        super().__init__()
+
+        if timestamps is None:
+            timestamps = list(data.data_df_dict.keys())
+
+        if snapshot_times is None:
+            try:
+                snapshot_times = [float(timestamp) for timestamp in timestamps]
+            except (TypeError, ValueError):
+                snapshot_times = list(range(len(timestamps)))
+
+        snapshot_times = np.asarray(snapshot_times, dtype=float)
+
+        if len(timestamps) < 2 or np.any(np.diff(snapshot_times) <= 0.0):
+            raise ValueError("Interpolation in time needs two or more snapshots at increasing times")
+
+        if times is None:
+            fractions = np.arange(frames_per_interval) / frames_per_interval
+            times = np.append((snapshot_times[:-1, None] + np.diff(snapshot_times)[:, None] * fractions).ravel(),
+                              snapshot_times[-1])
+
+        times = np.asarray(times, dtype=float)
+
+        if np.any(times < snapshot_times[0]) or np.any(times > snapshot_times[-1]):
+            raise ValueError(f"Frame times must be between the first and last snapshot "
+                             f"({snapshot_times[0]:g} and {snapshot_times[-1]:g})")
+
+        self.data = data
+        self.timestamps = list(timestamps)
+
+        # The interval of each frame, and its position in the interval
+        intervals = np.clip(np.searchsorted(snapshot_times, times, side="right") - 1, 0, len(timestamps) - 2)
+        weights = (times - snapshot_times[intervals]) / (snapshot_times[intervals + 1] - snapshot_times[intervals])
+        width = max(4, len(str(len(times) - 1)))
+        frames = [f"{index:0{width}d}" for index in range(len(times))]
+
+        self.frame_times = dict(zip(frames, times.tolist()))
+        self.intervals = {}
+
+        for frame, interval, weight in zip(frames, intervals, weights):
+            if weight < 1.0:
+                self.intervals[frame] = (self.timestamps[interval], self.timestamps[interval + 1], float(weight))
+            else:
+                # A frame at the end of its interval is the next snapshot
+                self.intervals[frame] = (self.timestamps[interval + 1], self.timestamps[interval + 1], 0.0)
+
+        self.data_df_dict = InterpolatedFrames(self)
+        self.fields = {}
+
+        # The last frame using each snapshot (after which it can be released)
+        self.last_frames = {}
+
+        for frame, (timestamp_0, timestamp_1, weight) in self.intervals.items():
+            self.last_frames[timestamp_0] = frame
+
+            if weight > 0.0:
+                self.last_frames[timestamp_1] = frame
+
+    def get_snapshots(self, frame):
+        """Returns the timestamps of the snapshots a frame is interpolated from"""
+        timestamp_0, timestamp_1, weight = self.intervals[frame]
+
+        return [timestamp_0, timestamp_1] if weight > 0.0 else [timestamp_0]
+
+    def get_data_files(self, data_df_ids=None):
+        """Returns the file of the snapshot starting each frame's interval"""
+        if data_df_ids is None:
+            data_df_ids = self.intervals.keys()
+
+        return self.data.get_data_files([self.intervals[data_df_id][0] for data_df_id in data_df_ids])
+
+    def get_input_files(self, data_df_ids=None):
+        """Returns the files of the snapshots of the frames"""
+        if data_df_ids is None:
+            data_df_ids = self.intervals.keys()
+
+        return self.data.get_input_files([timestamp for data_df_id in data_df_ids
+                                          for timestamp in self.get_snapshots(data_df_id)])
+
+    def get_fingerprint_arguments(self, data_df_ids=None):
+        """Returns the times of the frames and the snapshots and weights they
+        are blended from (and the settings of the data)"""
+        if data_df_ids is None:
+            data_df_ids = self.intervals.keys()
+
+        return {
+            "frame_times": [self.frame_times[data_df_id] for data_df_id in data_df_ids],
+            "intervals": [list(self.intervals[data_df_id]) for data_df_id in data_df_ids],
+            "data": self.data.get_fingerprint_arguments([timestamp for data_df_id in data_df_ids
+                                                         for timestamp in self.get_snapshots(data_df_id)]),
+        }
+
+    def get_field(self, data_df_id, variable):
+        """Returns a column or derived field of a frame, blended from its
+        snapshots. Each is computed at most once."""
+        timestamp_0, timestamp_1, weight = self.intervals[data_df_id]
+        values_0 = self.data.get_field(timestamp_0, variable)
+
+        if weight == 0.0:
+            return values_0
+
+        cached = self.fields.get((data_df_id, variable))
+
+        if cached is None:
+            data_df_0 = self.data.data_df_dict[timestamp_0]
+            data_df_1 = self.data.data_df_dict[timestamp_1]
+
+            if not all(np.array_equal(coordinates_0, coordinates_1) for coordinates_0, coordinates_1
+                       in zip(self.data.get_coordinates(data_df_0), self.data.get_coordinates(data_df_1))):
+                raise ValueError(f"Snapshots {timestamp_0} and {timestamp_1} are not on the same mesh")
+
+            values_1 = self.data.get_field(timestamp_1, variable)
+            cached = self.fields[(data_df_id, variable)] = values_0 + weight * (values_1 - values_0)
+
+        return cached
+
+    def get_column_stats(self, data_df_id, variable):
+        """Interpolated frames are blended from the fields of their snapshots,
+        so have no statistics of their own (and their data limits are those
+        of the blended fields)"""
+        return None
+
+    def release(self, data_df_id):
+        """Free the memory held for the frame, and for its snapshots once no
+        later frame uses them (see BaseData.release())"""
+        for key in [key for key in self.fields if key[0] == data_df_id]:
+            del self.fields[key]
+
+        for timestamp in self.get_snapshots(data_df_id):
+            if self.last_frames[timestamp] == data_df_id:
+                self.data.release(timestamp)
@@ -1,5 +1,8 @@
+import logging
 import naptools as nap
 
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 # ============================================================================
 #
 # Get data
@@ -56,3 +59,290 @@ contour_plot.plot("u",
                   "./results/u_contour.pdf",
                   parameters=series_plotting_params,
                   )
+
+# Derived fields, evaluated on the mesh
+contour_plot.plot("grad_magnitude(u)",
+                  ["0002"],
+                  "./results/u_gradient.pdf",
+                  parameters={"colour_bar_format": ".2f"},
+                  )
+
+# The mesh is triangulated once, for both the derived fields and the drawing
+from naptools.plot_2d import FrameContext
+
+frame_context = FrameContext(contour_plot, "0002")
+assert frame_context.line_triangulation is contour_data.get_triangulation(contour_data.data_df_dict["0002"])
+
+# Zoomed view of a corner of the domain
+contour_plot.plot("u",
+                  ["0002"],
+                  "./results/u_region.pdf",
+                  parameters={"region": [(-1.0, -1.0), (0.0, -1.0), (-1.0, 0.0)]},
+                  )
+
+# Profile along the diagonal of the domain
+profile_df = contour_data.probe_line("0002", "u", (-1.0, -1.0), (1.0, 1.0), num_points=50)
+print(profile_df)
+nap.BasePlot(profile_df).plot("distance", "u", "./results/u_profile.pdf")
+
+# Time history at two points
+history_df = nap.ContourData(data_files, lazy=True).get_time_history("u", [(0.5, 0.5), (-0.5, 0.5)])
+print(history_df)
+nap.BasePlot(history_df).plot("time", list(history_df.columns[1:]), "./results/u_history.pdf")
+
+# Probes in the holes of a mask give NaN, as plots with the same mask draw nothing there
+import numpy as np
+
+hole_conditions = "((2.0 * x)**2 + (y)**2 > 0.5)"
+masked_probe_df = contour_data.probe("0002", "u", [(0.0, 0.0), (0.9, 0.9)], mask_conditions=hole_conditions)
+assert np.isnan(masked_probe_df["u"][0]) and not np.isnan(masked_probe_df["u"][1])
+
+# Frames handed over in memory, as from a running simulation
+points = contour_data.data_df_dict["0002"].coordinates[:, :2]
+
+with nap.InSituRenderer(nap.ContourPlot(nap.ContourData()), "u", "./results/u_in_situ.pdf",
+                        background=True) as render_frame:
+    for timestamp in data_files:
+        render_frame(timestamp, points, {"u": contour_data.data_df_dict[timestamp]["u"]})
+
+# The error of a frame rendered in the background is raised by the next call,
+# which gives back its place in the queue, so later frames are not blocked
+from concurrent.futures import wait
+
+failing_renderer = nap.InSituRenderer(nap.ContourPlot(nap.ContourData()), "missing", "./results/u_in_situ.pdf",
+                                      background=True, max_pending=1)
+num_errors = 0
+
+for timestamp in ["0002", "0005", "0002", "0005", "0002"]:
+    wait(failing_renderer.futures)
+
+    try:
+        failing_renderer(timestamp, points, {"u": contour_data.data_df_dict[timestamp]["u"]})
+    except KeyError:
+        num_errors += 1
+
+try:
+    failing_renderer.close()
+except KeyError:
+    num_errors += 1
+
+assert num_errors == 3
+
+# PDF and PNG files and in-memory PNG bytes from a single draw
+png_sink = nap.BytesSink("png")
+nap.ContourPlot(contour_data).plot("u",
+                                   ["0002"],
+                                   ["./results/u_targets.pdf", {"filename": "./results/u_targets.png", "dpi": 100},
+                                    png_sink],
+                                   )
+print(f"{len(png_sink.getvalue())} bytes of PNG in memory")
+
+# A series drawn as two shards (as on separate nodes) and merged
+from naptools import shards
+
+for shard in range(2):
+    nap.ContourPlot(nap.ContourData(data_files, lazy=True)).plot(
+        "u",
+        list(data_files.keys()),
+        "./results/u_sharded.pdf",
+        parameters={"individual_colour_bar": False, "shard": shard, "num_shards": 2},
+    )
+
+print(shards.merge_manifests("./results/u_sharded.pdf", 2))
+
+# Change between the two timestamps, and relative error against the data on
+# a coarser mesh (remapped onto the mesh of contour_data)
+change_data = contour_data.compare(contour_data, pairs={"change": ("0005", "0002")})
+nap.ContourPlot(change_data).plot("u", ["change"], "./results/u_change.pdf")
+
+coarse_data = nap.ContourData()
+
+for timestamp in data_files:
+    coarse_data.add_frame(timestamp, contour_data.get_data_frame(timestamp).iloc[::3])
+
+error_data = contour_data.compare(coarse_data, mode="relative_error")
+nap.ContourPlot(error_data).plot("u", list(data_files.keys()), "./results/u_coarse_error.pdf")
+
+# Comparing in another mode redraws the frames (the mode is in their fingerprint)
+from naptools import fingerprint
+
+ratio_data = contour_data.compare(contour_data, mode="ratio", pairs={"change": ("0005", "0002")})
+nap.ContourPlot(ratio_data).plot("u", ["change"], "./results/u_change.pdf")
+assert fingerprint.read_fingerprint("./results/u_change_change.pdf")["arguments"]["data"]["mode"] == "ratio"
+nap.ContourPlot(change_data).plot("u", ["change"], "./results/u_change.pdf")
+assert fingerprint.read_fingerprint("./results/u_change_change.pdf")["arguments"]["data"]["mode"] == "difference"
+
+# Files read in chunks, keeping every other node on disk (as for files larger
+# than memory), with the limits found while reading
+from naptools.chunked import ChunkedReader
+
+chunked_data = nap.ContourData(data_files,
+                               reader=ChunkedReader(columns=["u", "Points:0", "Points:1"], decimation=2,
+                                                    chunk_rows=1000, memmap_dir="./results/memmap"))
+print(chunked_data.data_df_dict["0002"].attrs["stats"]["u"])
+nap.ContourPlot(chunked_data).plot("u", ["0002"], "./results/u_chunked.pdf")
+
+# Reading with other settings redraws the plots (the reader's settings are in
+# their fingerprint)
+assert fingerprint.read_fingerprint("./results/u_chunked_0002.pdf")["arguments"]["data"]["reader"]["decimation"] == 2
+nap.ContourPlot(nap.ContourData(data_files, reader=ChunkedReader(decimation=8))).plot("u", ["0002"],
+                                                                                        "./results/u_chunked.pdf")
+assert fingerprint.read_fingerprint("./results/u_chunked_0002.pdf")["arguments"]["data"]["reader"]["decimation"] == 8
+nap.ContourPlot(chunked_data).plot("u", ["0002"], "./results/u_chunked.pdf")
+
+# The time history of data not yet read is read through the reader (here
+# keeping every other node), as is data read in full
+history_points = [(0.5, 0.5), (-0.5, 0.5)]
+lazy_history_df = nap.ContourData(data_files, lazy=True,
+                                  reader=ChunkedReader(decimation=2)).get_time_history("u", history_points)
+eager_history_df = nap.ContourData(data_files, reader=ChunkedReader(decimation=2)).get_time_history("u", history_points)
+assert np.array_equal(lazy_history_df.to_numpy(), eager_history_df.to_numpy(), equal_nan=True)
+
+# The coordinates read are mapped from disk too, as one array of the reader's dtype
+single_data = nap.ContourData(data_files, reader=ChunkedReader(dtype="float32", memmap_dir="./results/memmap"))
+assert isinstance(chunked_data.data_df_dict["0002"].coordinates, np.memmap)
+assert single_data.data_df_dict["0002"].coordinates.dtype == np.float32
+nap.ContourPlot(single_data).plot("u", ["0002"], "./results/u_chunked_single.pdf")
+
+# Files of the same name in different directories are kept apart on disk, and
+# reading a file again does not change the data of an earlier read
+import os
+import shutil
+
+for directory, data_file in [("a", data_files["0002"]), ("b", data_files["0005"])]:
+    os.makedirs(f"./results/same_name/{directory}", exist_ok=True)
+    shutil.copy(data_file, f"./results/same_name/{directory}/u.csv")
+
+same_name_data = nap.ContourData({"a": "./results/same_name/a/u.csv", "b": "./results/same_name/b/u.csv"}, lazy=True,
+                                 reader=ChunkedReader(memmap_dir="./results/memmap"))
+first_read = same_name_data.data_df_dict["a"]
+first_values = np.array(first_read["u"])
+assert not np.array_equal(first_values, same_name_data.data_df_dict["b"]["u"])
+assert np.array_equal(first_read["u"], first_values)
+same_name_data.release("a")
+assert np.array_equal(same_name_data.data_df_dict["a"]["u"], first_values)
+
+# The limits of a comparison are those of the compared field, not the
+# statistics of the columns read
+chunked_change = chunked_data.compare(chunked_data, pairs={"change": ("0005", "0002")})
+change_values = chunked_change.get_field("change", "u")
+assert chunked_change.get_data_limits("u")["change"] == [np.nanmin(change_values), np.nanmax(change_values)]
+
+# Smooth animation with three frames interpolated between the snapshots
+interpolated_data = nap.ContourData(data_files, lazy=True).interpolate_in_time(frames_per_interval=4)
+print(interpolated_data.frame_times)
+middle_values = interpolated_data.get_field("0002", "u")
+assert interpolated_data.get_data_limits("u", ["0002"])["0002"] == [np.nanmin(middle_values), np.nanmax(middle_values)]
+nap.ContourPlot(interpolated_data).plot("u",
+                                        list(interpolated_data.data_df_dict.keys()),
+                                        "./results/u_interpolated.png",
+                                        parameters={"individual_colour_bar": False},
+                                        )
+
+# Interpolating at other times redraws the frames (their times are in their fingerprint)
+halves_data = nap.ContourData(data_files, lazy=True).interpolate_in_time(frames_per_interval=2)
+nap.ContourPlot(halves_data).plot("u", ["0001"], "./results/u_interpolated.png",
+                                  parameters={"individual_colour_bar": False})
+assert fingerprint.read_fingerprint("./results/u_interpolated_0001.png")["arguments"]["data"]["frame_times"] == [3.5]
+
+# Contact sheet of the interpolated series
+nap.ContourPlot(interpolated_data).preview("u", list(interpolated_data.data_df_dict.keys()), "./results/u_preview.png")
+
+# Slice of 3D data on a tetrahedral mesh (here the Delaunay tetrahedra of
+# random points in a cube, with a linear field)
+import pandas as pd
+from scipy.spatial import Delaunay
+
+points_3d = np.random.default_rng(0).uniform(-1.0, 1.0, (5000, 3))
+data_3d = nap.BaseData.from_data_frames({
+    "0002": pd.DataFrame({"p": points_3d @ [1.0, 2.0, 3.0],
+                          "Points:0": points_3d[:, 0],
+                          "Points:1": points_3d[:, 1],
+                          "Points:2": points_3d[:, 2]}),
+})
+tetrahedra = Delaunay(points_3d).simplices
+sliced_data = nap.SlicedData(data_3d, tetrahedra, (0.0, 0.0, 0.25), (1.0, 1.0, 1.0))
+nap.ContourPlot(sliced_data).plot("p", ["0002"], "./results/p_slice.pdf")
+
+# Moving the plane changes the fingerprint of the slice
+moved_data = nap.SlicedData(data_3d, tetrahedra, (0.0, 0.0, 0.5), (1.0, 1.0, 1.0))
+assert moved_data.get_fingerprint_arguments() != sliced_data.get_fingerprint_arguments()
+
+# A series drawn within a time budget per frame (the choices made are kept in
+# the fingerprint of each frame)
+nap.ContourPlot(contour_data).plot("u",
+                                   list(data_files.keys()),
+                                   "./results/u_budget.png",
+                                   parameters={"frame_time_budget": 0.25, "force": True},
+                                   )
+print(fingerprint.read_fingerprint("./results/u_budget_0002.png")["metadata"])
+
+# A budget met at full quality leaves the parameters (including the dpi) as they are
+nap.ContourPlot(contour_data).plot("u", ["0002"], "./results/u_budget_met.png",
+                                   parameters={"frame_time_budget": 100.0, "force": True})
+assert fingerprint.read_fingerprint("./results/u_budget_met_0002.png")["metadata"]["dpi"] is None
+
+# A missing or changed colour bar of an up-to-date series is redrawn on its own
+colour_bar_params = {"separate_colour_bar": True, "individual_colour_bar": False}
+nap.ContourPlot(contour_data).plot("u", list(data_files.keys()), "./results/u_bar.png", parameters=colour_bar_params)
+os.remove("./results/u_bar_colour_bar.png")
+frame_mtime = os.path.getmtime("./results/u_bar_0002.png")
+nap.ContourPlot(contour_data).plot("u", list(data_files.keys()), "./results/u_bar.png", parameters=colour_bar_params)
+assert os.path.exists("./results/u_bar_colour_bar.png")
+assert os.path.getmtime("./results/u_bar_0002.png") == frame_mtime
+
+# Stage timings (and peak memory) of a forced redraw
+from naptools import instrumentation
+
+profile = instrumentation.enable([instrumentation.LoggingSink(logging.INFO)], track_memory=True)
+contour_plot.plot("u",
+                  list(data_files.keys()),
+                  "./results/u_contour.pdf",
+                  parameters=dict(series_plotting_params, force=True),
+                  )
+instrumentation.disable()
+print(profile.format_summary())
+
+# Memory is no longer traced once instrumentation is disabled
+import tracemalloc
+
+assert not tracemalloc.is_tracing()
+
+# The (process-wide) peak memory is not measured by a span opened while a
+# span of another thread is open
+import threading
+
+def worker_stage():
+    with instrumentation.span("worker"):
+        pass
+
+
+span_records = []
+instrumentation.enable([span_records.append], track_memory=True)
+
+with instrumentation.span("outer"):
+    worker = threading.Thread(target=worker_stage)
+    worker.start()
+    worker.join()
+
+instrumentation.disable()
+assert [("peak_memory" in record) for record in span_records] == [False, True]
+
+# Side-by-side comparison of two frames, sharing a mesh and colour bar, with
+# one figure saved per frame
+multi_plot = nap.MultiPlot(1, 2)
+multi_plot.add_plot(0, 0, nap.ContourPlot, contour_data, "u", title="$t_1$")
+multi_plot.add_plot(0, 1, nap.ContourPlot, contour_data, "u",
+                    keys=list(reversed(data_files.keys())),
+                    parameters={"mask_conditions": mask_conditions},
+                    title="$t_2$")
+multi_plot.plot(list(data_files.keys()),
+                "./results/u_multi_plot.pdf",
+                parameters={"individual_colour_bar": False})
+
+# Changing the parameters of a panel changes its colour scale in the next plot
+multi_plot.panels[0]["plot"].parameters["num_colour_levels"] = 7
+multi_plot.plot(list(data_files.keys()),
+                "./results/u_multi_plot.pdf",
+                parameters={"individual_colour_bar": False})
+assert [len(colour_scale.colour_levels) for colour_scale in multi_plot.panels[0]["plot"].colour_scales.values()] == [7]
@@ -1,5 +1,8 @@
+import logging
 import naptools as nap
 
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 # Here I should run check the functions perform as expected on some test data
 
 test_data_files = {
@@ -46,3 +49,50 @@ error_plots.plot(["n", "psi"],
                  "./results/error_plot_n_psi.pdf",
                  parameters=plotting_params)
 error_plots.plot("n", ["p1", "p2", "p3", "p4"], "./results/error_plot_n.pdf")
+
+# Long-format error data (one row per degree and h in a single file)
+long_error_data = nap.ErrorData.from_long_format("./data/errors_long.csv",
+                                                 degree_columns="degree",
+                                                 degree_id_format="p{}")
+long_error_data.update_norms(error_norms_dict)
+long_error_data.print_degree("p2")
+
+long_error_plots = nap.ErrorPlot(long_error_data)
+long_error_plots.plot("n", ["p1", "p2", "p3", "p4"], "./results/error_plot_n_long.pdf")
+
+# Dropping a column the error tables do not have is an error
+try:
+    error_plots.plot("n", "p1", "./results/error_plot_bad_drop.pdf", parameters={"drop": ["n L3"], "force": True})
+except ValueError as error:
+    print(error)
+else:
+    raise AssertionError("Dropping an unknown column should raise ValueError")
+
+# A batch plot missing its output fails on its own, without stopping the others
+from naptools import batch
+
+batch_results = batch.run_batch({
+    "base_dir": ".",
+    "data": {"errors": {"class": "ErrorData", "files": test_data_files, "lazy": False}},
+    "plots": [{"class": "ErrorPlot", "data": "errors", "variable": "n", "timestamps": "p1"},
+              {"class": "ErrorPlot", "data": "errors", "variable": "n", "timestamps": "p1",
+               "output": "./results/error_plot_batch.pdf"}],
+}, workers=1, force=True)
+batch_errors = [plot_result["error"] for plot_result in batch_results[0]["plots"]]
+print(batch_errors[0].splitlines()[-1])
+assert batch_errors[0] is not None and batch_errors[1] is None
+
+# So does a plot of an unknown data source, and merging skips a series with no output
+batch_results = batch.run_batch({
+    "base_dir": ".",
+    "data": {"errors": {"class": "ErrorData", "files": test_data_files, "lazy": False}},
+    "plots": [{"class": "ErrorPlot", "data": "missing", "variable": "n", "timestamps": "p1",
+               "output": "./results/error_plot_missing.pdf"},
+              {"class": "ErrorPlot", "data": "errors", "variable": "n", "timestamps": "p1",
+               "output": "./results/error_plot_batch.pdf"}],
+}, workers=1, force=True)
+batch_errors = {plot_result["index"]: plot_result["error"]
+                for job_result in batch_results for plot_result in job_result["plots"]}
+print(batch_errors[0].splitlines()[-1])
+assert batch_errors[0] is not None and batch_errors[1] is None
+print(batch.merge_batch({"base_dir": ".", "data": {}, "plots": [{"class": "ContourPlot", "data": "u"}]}, 2))